@@ -19,8 +19,22 @@ import json
 import signal
 import argparse
 import platform
+import random
+import errno
+import os
+import threading
+import collections
+import math
+import struct
+import multiprocessing
+import queue
 
-from scapy.all import conf, get_if_list, sendp, send, Ether, IP, IPv6, TCP, AsyncSniffer
+from scapy.all import conf, get_if_list, raw, Ether, IP, IPv6, TCP
+
+from packet_templates import SynTemplate, open_raw_sender, checksum_adjust
+from pcap_io import PcapReader, ip_offset, LINKTYPE_ETHERNET
+from net_common import resolve_targets, grow_rcvbuf, ether_tcp_segment, parse_tcp_reply
+from send_log import NdjsonLogWriter, BinaryLogWriter, part_path, reply_path
 
 # Mover conf.use_pcap para apenas sistemas que precisam (Windows)
 if platform.system().lower() == 'windows':
@@ -48,114 +62,1345 @@ except Exception:
         RESET_ALL = ''
 
 
-def enviar_syn(destino_ip, destino_porta, intervalo=0, count=0, duration=0,
-               origem_ip=None, iface=None, logfile=None, capture=False, capture_iface=None):
-    """Envia pacotes SYN TCP.
+# ---------------------------------------------------------------------------
+# Backends de transmissão: um socket aberto para o envio inteiro
+# ---------------------------------------------------------------------------
+# Todos expõem `layer` (2 = quadro Ethernet, 3 = pacote IP / segmento TCP no
+# IPv6), `send_batch(pacotes)` e `close()`. `sendp()`/`send()` do Scapy abrem
+# e fecham um socket por chamada, o que limita o envio a poucas centenas de pps.
 
-    Args:
-        destino_ip:     IP ou hostname de destino.
-        destino_porta:  Porta TCP de destino.
-        intervalo:      Segundos entre pacotes (0 = sem pausa).
-        count:          Número de pacotes a enviar (0 = contínuo até Ctrl+C).
-        duration:       Duração total em segundos (0 = sem limite de tempo).
-        origem_ip:      IP de origem (None = automático).
-        iface:          Interface de rede (None = padrão do Scapy).
-        logfile:        Caminho para salvar log JSON.
-        capture:        Se True, ativa sniffer para contar SYNs enviados/capturados.
-        capture_iface:  Interface para captura (None = usa mesma de envio).
+class SocketBackend:
+    """Socket persistente, um send() por pacote."""
+    name = 'socket'
+
+    def __init__(self, sock, layer):
+        self.sock = sock
+        self.layer = layer
+
+    def send_batch(self, packets):
+        for pkt in packets:
+            self.sock.send(pkt)
+        return len(packets)
+
+    def close(self):
+        self.sock.close()
+
+
+class SendmmsgBackend(SocketBackend):
+    """Lote inteiro em uma syscall sendmmsg(2) (Linux, via ctypes).
+    O socket precisa estar ligado à interface (AF_PACKET) ou conectado ao
+    destino (raw L3), pois as mensagens vão sem endereço. Os buffers são
+    alocados uma vez (`max_batch` slots de `slot` bytes) e reaproveitados.
     """
-    # Resolve destino: suporta IPv4, IPv6 e hostnames
-    resolved_ip = destino_ip
-    family = None
+    name = 'sendmmsg'
+
+    def __init__(self, sock, layer, max_batch=1024, slot=2048):
+        import ctypes
+        super().__init__(sock, layer)
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._sendmmsg = libc.sendmmsg          # AttributeError sem sendmmsg (não-Linux)
+
+        class iovec(ctypes.Structure):
+            _fields_ = [('iov_base', ctypes.c_void_p), ('iov_len', ctypes.c_size_t)]
+
+        class msghdr(ctypes.Structure):
+            _fields_ = [('msg_name', ctypes.c_void_p), ('msg_namelen', ctypes.c_uint32),
+                        ('msg_iov', ctypes.POINTER(iovec)), ('msg_iovlen', ctypes.c_size_t),
+                        ('msg_control', ctypes.c_void_p), ('msg_controllen', ctypes.c_size_t),
+                        ('msg_flags', ctypes.c_int)]
+
+        class mmsghdr(ctypes.Structure):
+            _fields_ = [('msg_hdr', msghdr), ('msg_len', ctypes.c_uint)]
+
+        self._ctypes = ctypes
+        self.max_batch = int(max_batch)
+        self.slot = int(slot)
+        self._buf = ctypes.create_string_buffer(self.max_batch * self.slot)
+        self._base = ctypes.addressof(self._buf)
+        self._iov = (iovec * self.max_batch)()
+        self._msgs = (mmsghdr * self.max_batch)()
+        self._msg_size = ctypes.sizeof(mmsghdr)
+        for i in range(self.max_batch):
+            self._iov[i].iov_base = self._base + i * self.slot
+            self._msgs[i].msg_hdr.msg_iov = ctypes.pointer(self._iov[i])
+            self._msgs[i].msg_hdr.msg_iovlen = 1
+
+    def send_batch(self, packets):
+        # Quadros maiores que um slot não cabem no buffer: saem por send()
+        # avulso, na mesma posição da sequência
+        total = 0
+        n = 0
+        for pkt in packets:
+            size = len(pkt)
+            if size > self.slot:
+                total += self._flush(n)
+                n = 0
+                total += super().send_batch([pkt])
+                continue
+            self._ctypes.memmove(self._base + n * self.slot, bytes(pkt), size)
+            self._iov[n].iov_len = size
+            n += 1
+            if n == self.max_batch:
+                total += self._flush(n)
+                n = 0
+        return total + self._flush(n)
+
+    def _flush(self, count):
+        """Envia os `count` primeiros slots (repete até o kernel aceitar todos)."""
+        done = 0
+        while done < count:
+            addr = self._ctypes.addressof(self._msgs) + done * self._msg_size
+            n = self._sendmmsg(self.sock.fileno(), self._ctypes.c_void_p(addr), count - done, 0)
+            if n < 0:
+                err = self._ctypes.get_errno()
+                if err in (errno.ENOBUFS, errno.EAGAIN, errno.EINTR):
+                    time.sleep(0.0005)     # fila da NIC cheia: espera esvaziar
+                    continue
+                raise OSError(err, os.strerror(err))
+            done += n
+        return done
+
+
+class ScapyL2Backend:
+    """Fallback portátil (Windows/Npcap): um `conf.L2socket` reaproveitado."""
+    name = 'scapy-l2'
+    layer = 2
+
+    def __init__(self, iface):
+        self.sock = conf.L2socket(iface=iface)
+
+    def send_batch(self, packets):
+        for pkt in packets:
+            self.sock.send(bytes(pkt))
+        return len(packets)
+
+    def close(self):
+        self.sock.close()
+
+
+def abrir_backend(iface, resolved_ip, is_ipv6, preferido='auto', max_batch=1024):
+    """Abre o backend de transmissão para o envio inteiro.
+    Com interface: AF_PACKET ligado a ela (L2); sem interface: raw socket L3
+    conectado ao destino. `preferido`: auto (sendmmsg → socket → Scapy),
+    sendmmsg, socket ou scapy.
+    """
+    if preferido == 'scapy':
+        return ScapyL2Backend(iface)
     try:
-        infos = socket.getaddrinfo(destino_ip, None)
-        if infos:
-            family = infos[0][0]
-            resolved_ip = infos[0][4][0]
-    except Exception:
+        if iface:
+            ifname = iface if isinstance(iface, str) else getattr(iface, 'name', str(iface))
+            sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW)
+            sock.bind((ifname, 0))
+            layer = 2
+        else:
+            sock = open_raw_sender(socket.AF_INET6 if is_ipv6 else socket.AF_INET)
+            sock.connect((resolved_ip, 0, 0, 0) if is_ipv6 else (resolved_ip, 0))
+            layer = 3
+    except (AttributeError, OSError) as e:
+        if not iface or preferido != 'auto':
+            raise
+        print(Fore.YELLOW + f'[!] Raw socket indisponível ({e}); usando conf.L2socket do Scapy.' + Style.RESET_ALL)
+        return ScapyL2Backend(iface)
+    if preferido in ('auto', 'sendmmsg'):
         try:
-            socket.inet_pton(socket.AF_INET6, destino_ip)
-            family = socket.AF_INET6
+            return SendmmsgBackend(sock, layer, max_batch=max_batch)
+        except (AttributeError, OSError):
+            if preferido == 'sendmmsg':
+                sock.close()
+                raise
+    return SocketBackend(sock, layer)
+
+
+def _preparar_modo_rapido(ip_layer, tcp, resolved_ip, is_ipv6, layer):
+    """Setup do modo rápido: o Scapy monta o pacote uma única vez (resolve MAC e
+    IP de origem) e daí em diante só o SynTemplate em bytes é usado: com
+    cabeçalho Ethernet para backends L2; sem ele para raw socket L3 (no IPv6,
+    só o segmento TCP).
+    """
+    family = socket.AF_INET6 if is_ipv6 else socket.AF_INET
+    if layer == 2:
+        link = raw(Ether() / ip_layer / tcp)[:14]
+        return SynTemplate(ip_layer.src, resolved_ip, tcp.sport, tcp.dport, 0, family,
+                           window=tcp.window, link=link)
+    return SynTemplate(ip_layer.src, resolved_ip, tcp.sport, tcp.dport, 0, family,
+                       window=tcp.window, ip_header=not is_ipv6)
+
+
+# ---------------------------------------------------------------------------
+# Pacing por deadline (--pps)
+# ---------------------------------------------------------------------------
+
+class DeadlineScheduler:
+    """Pacing por deadlines absolutos no relógio monotônico.
+
+    O pacote k tem horário fixo (k / pps desde o início, ou a curva de rampa),
+    então o custo do envio/print não se acumula como no `sleep(intervalo)`
+    após cada pacote. Atrasado, `wait()` libera rajadas de até `max_burst`
+    pacotes para alcançar o cronograma; adiantado, dorme até perto do deadline
+    e gira (spin) os últimos `spin` segundos, já que o sleep do SO erra por
+    ~0,1-1 ms.
+
+    Rampas (`ramp` segundos até a taxa cheia): 'linear' (a taxa cresce
+    linearmente) ou 'step' (4 degraus de 25%).
+    """
+    PROFILES = ('linear', 'step')
+
+    def __init__(self, pps, max_burst=1, ramp=0.0, profile='linear', spin=0.001,
+                 clock=time.perf_counter, sleep=time.sleep):
+        if pps <= 0:
+            raise ValueError('pps deve ser > 0')
+        if profile not in self.PROFILES:
+            raise ValueError(f'perfil de rampa inválido: {profile}')
+        self.pps = float(pps)
+        self.max_burst = max(1, int(max_burst))
+        self.ramp = max(0.0, float(ramp))
+        self.profile = profile
+        self.spin = spin
+        self._clock = clock
+        self._sleep = sleep
+        self._start = None
+        # Estatísticas (Welford nos intervalos entre pacotes, sem guardar tudo)
+        self.sent = 0
+        self._last = None
+        self._first = None
+        self._n_gaps = 0
+        self._gap_mean = 0.0
+        self._gap_m2 = 0.0
+        self.max_late = 0.0
+
+    # --- curva alvo: pacotes devidos até t, e o inverso ---
+    def _ramp_total(self):
+        """Pacotes enviados durante a rampa (área sob a curva de taxa)."""
+        return self.pps * self.ramp * (0.5 if self.profile == 'linear' else 0.625)
+
+    def _due_at(self, t):
+        r, p = self.ramp, self.pps
+        if t <= 0:
+            return 0.0
+        if t >= r:
+            return self._ramp_total() + p * (t - r)
+        if self.profile == 'linear':
+            return p * t * t / (2 * r)
+        step = r / 4
+        full = int(t // step)
+        return sum(p * (i + 1) / 4 * step for i in range(full)) + p * (full + 1) / 4 * (t - full * step)
+
+    def deadline(self, k):
+        """Segundos desde o início em que o pacote k (0-based) deve sair."""
+        r, p = self.ramp, self.pps
+        if k >= self._ramp_total():
+            return r + (k - self._ramp_total()) / p
+        if self.profile == 'linear':
+            return (2 * r * k / p) ** 0.5
+        step, acc = r / 4, 0.0
+        for i in range(4):
+            seg = p * (i + 1) / 4 * step
+            if k < acc + seg:
+                return i * step + (k - acc) / (p * (i + 1) / 4)
+            acc += seg
+        return r
+
+    def wait(self, limit=None):
+        """Bloqueia até o próximo deadline e devolve quantos pacotes podem sair
+        agora (>= 1; > 1 só quando atrasado, até `max_burst` e `limit`)."""
+        if self._start is None:
+            self._start = self._clock()
+        target = self._start + self.deadline(self.sent)
+        while True:
+            now = self._clock()
+            remaining = target - now
+            if remaining <= 0:
+                break
+            if remaining > self.spin:
+                self._sleep(remaining - self.spin)
+        self.max_late = max(self.max_late, now - target)
+        behind = int(self._due_at(now - self._start)) - self.sent
+        n = max(1, min(self.max_burst, behind))
+        return min(n, limit) if limit else n
+
+    def record(self, n, ts=None):
+        """Registra `n` pacotes enviados no instante `ts` (relógio do scheduler)."""
+        ts = self._clock() if ts is None else ts
+        if self._first is None:
+            self._first = ts
+        for _ in range(n):
+            if self._last is not None:
+                gap = ts - self._last
+                self._n_gaps += 1
+                delta = gap - self._gap_mean
+                self._gap_mean += delta / self._n_gaps
+                self._gap_m2 += delta * (gap - self._gap_mean)
+            self._last = ts
+        self.sent += n
+
+    def stats(self):
+        """Taxa alvo, taxa alcançada e jitter (desvio-padrão dos intervalos)."""
+        span = (self._last - self._first) if self._last is not None else 0.0
+        achieved = (self.sent - 1) / span if span > 0 and self.sent > 1 else 0.0
+        jitter = (self._gap_m2 / (self._n_gaps - 1)) ** 0.5 if self._n_gaps > 1 else 0.0
+        return {
+            'target_pps': self.pps,
+            'achieved_pps': round(achieved, 3),
+            'mean_gap_ms': round(self._gap_mean * 1000, 6),
+            'jitter_ms': round(jitter * 1000, 6),
+            'max_late_ms': round(self.max_late * 1000, 6),
+            'ramp': self.ramp,
+            'profile': self.profile if self.ramp > 0 else None,
+        }
+
+
+def _pacote_scapy(ip_layer, tcp, is_ipv6, layer):
+    """Bytes de um SYN montado pelo Scapy (modo normal) na camada do backend."""
+    if layer == 2:
+        return raw(Ether() / ip_layer / tcp)
+    data = raw(ip_layer / tcp)
+    return data[40:] if is_ipv6 else data
+
+
+# ---------------------------------------------------------------------------
+# Destinos, portas e porta de origem
+# ---------------------------------------------------------------------------
+
+SPORT_MODES = ('fixed', 'seq', 'random')
+SPORT_MIN = 1024
+
+
+def parse_port_spec(spec):
+    """Portas de destino: 80, '80,443', '8000-8010' ou combinações.
+    Levanta ValueError para porta fora de 1-65535 ou intervalo invertido.
+    """
+    if isinstance(spec, int):
+        spec = str(spec)
+    ports = []
+    for item in str(spec).split(','):
+        item = item.strip()
+        if not item:
+            continue
+        if '-' in item:
+            first, last = (int(x) for x in item.split('-', 1))
+            if first > last:
+                raise ValueError(f'Intervalo de portas inválido: {item}')
+            ports.extend(range(first, last + 1))
+        else:
+            ports.append(int(item))
+    if not ports or any(not 1 <= p <= 65535 for p in ports):
+        raise ValueError(f'Porta(s) inválida(s): {spec}')
+    return ports
+
+
+def resolver_destinos(spec):
+    """[(label, ip, is_ipv6)] a partir de IP/hostname, lista, intervalo ou CIDR
+    (mesma sintaxe de alvos do scan_ports, via net_common). Levanta ValueError/OSError se
+    algum alvo não resolver.
+    """
+    return [(label, ip, family == socket.AF_INET6)
+            for label, ip, family in resolve_targets([spec])]
+
+
+def _camada_ip(resolved_ip, is_ipv6, origem_ip=None):
+    ip_layer = IPv6(dst=resolved_ip) if is_ipv6 else IP(dst=resolved_ip)
+    if origem_ip:
+        try:
+            ip_layer.src = origem_ip
         except Exception:
-            family = socket.AF_INET
+            pass
+    return ip_layer
+
+
+def _fmt_alvo(ip, port):
+    return f'[{ip}]:{port}' if ':' in ip else f'{ip}:{port}'
+
+
+class GeradorSyn:
+    """Monta o k-ésimo SYN do envio.
+
+    Destinos intercalados a cada porta (k → destino k % D, porta (k // D) % P,
+    como o `interleave_targets` do net_common) e porta de origem fixa,
+    sequencial (a partir de `sport`, voltando a 1024 depois de 65535) ou
+    aleatória. Com `fast`, um SynTemplate por destino; senão o Scapy monta cada
+    pacote (cacheado por fluxo quando a porta de origem é fixa). `seq_unico`
+    dá a cada SYN do modo normal um seq próprio (sem cache), para que as
+    respostas possam ser casadas por (sport, seq) mesmo com sport fixo.
+    """
+    def __init__(self, destinos, portas, layer, fast=False, origem_ip=None,
+                 sport=12345, sport_mode='fixed', seed=None, seq_unico=False):
+        if sport_mode not in SPORT_MODES:
+            raise ValueError(f'modo de porta de origem inválido: {sport_mode}')
+        self.destinos = destinos
+        self.portas = portas
+        self.layer = layer
+        self.sport = sport
+        self.sport_mode = sport_mode
+        self.seq_unico = seq_unico
+        self._rng = random.Random(seed)
+        self._seq_base = self._rng.randrange(1 << 32)
+        self._ip_layers = [_camada_ip(ip, v6, origem_ip) for _, ip, v6 in destinos]
+        self._cache = {}
+        self.templates = None
+        if fast:
+            self.templates = [
+                _preparar_modo_rapido(ip_layer, TCP(dport=portas[0], sport=sport, flags='S'), ip, v6, layer)
+                for ip_layer, (_, ip, v6) in zip(self._ip_layers, destinos)
+            ]
+
+    def fluxo(self, k):
+        """(índice do destino, porta de destino, porta de origem) do pacote k."""
+        d = len(self.destinos)
+        dport = self.portas[(k // d) % len(self.portas)]
+        if self.sport_mode == 'seq':
+            sport = SPORT_MIN + (self.sport - SPORT_MIN + k) % (65536 - SPORT_MIN)
+        elif self.sport_mode == 'random':
+            sport = self._rng.randrange(SPORT_MIN, 65536)
+        else:
+            sport = self.sport
+        return k % d, dport, sport
+
+    def pacote(self, k):
+        """(bytes, índice do destino, porta de destino, porta de origem, seq) do pacote k."""
+        idx, dport, sport = self.fluxo(k)
+        if self.templates is not None:
+            # Cada SYN com seq/IP ID próprios; checksums ajustados no lugar
+            seq = (self._seq_base + k) & 0xFFFFFFFF
+            buf = self.templates[idx].patch(dport=dport, sport=sport, seq=seq, ident=k)
+            return bytes(buf), idx, dport, sport, seq
+        if self.seq_unico:
+            seq = (self._seq_base + k) & 0xFFFFFFFF
+            data = _pacote_scapy(self._ip_layers[idx], TCP(dport=dport, sport=sport, seq=seq, flags='S'),
+                                 self.destinos[idx][2], self.layer)
+            return data, idx, dport, sport, seq
+        key = (idx, dport, sport)
+        data = self._cache.get(key)
+        if data is None:
+            data = _pacote_scapy(self._ip_layers[idx], TCP(dport=dport, sport=sport, flags='S'),
+                                 self.destinos[idx][2], self.layer)
+            if self.sport_mode == 'fixed':
+                self._cache[key] = data
+        return data, idx, dport, sport, 0
+
+
+# ---------------------------------------------------------------------------
+# Métricas ao vivo (contadores compartilhados + linha de status)
+# ---------------------------------------------------------------------------
+
+class MetricasEnvio:
+    """Contadores do envio em memória compartilhada, um slot por worker.
 
-    is_ipv6 = (family == socket.AF_INET6)
-    if is_ipv6:
-        ip_layer = IPv6(dst=resolved_ip)
-        if origem_ip:
+    O loop de envio só soma inteiros no próprio slot (sem lock, sem I/O); o
+    `RelatorioStatus` no processo pai lê os slots e deriva taxas. Funciona
+    igual com um worker no mesmo processo ou vários processos filhos.
+    """
+    CAMPOS = ('sent', 'bytes', 'batches')
+
+    def __init__(self, workers=1):
+        self.workers = max(1, int(workers))
+        self.array = multiprocessing.RawArray('Q', self.workers * len(self.CAMPOS))
+
+    def add(self, wid, sent, nbytes):
+        base = wid * len(self.CAMPOS)
+        arr = self.array
+        arr[base] += sent
+        arr[base + 1] += nbytes
+        arr[base + 2] += 1
+
+    def por_worker(self):
+        k = len(self.CAMPOS)
+        values = self.array[:]
+        return [dict(zip(self.CAMPOS, values[i * k:(i + 1) * k])) for i in range(self.workers)]
+
+    def totais(self):
+        tot = dict.fromkeys(self.CAMPOS, 0)
+        for w in self.por_worker():
+            for key in self.CAMPOS:
+                tot[key] += w[key]
+        return tot
+
+
+class RelatorioStatus:
+    """Atualiza uma linha de status a cada `interval` segundos (thread) e,
+    opcionalmente, um arquivo de estatísticas: 'jsonl' acrescenta um snapshot
+    por intervalo; 'prom' reescreve o arquivo no formato texto do Prometheus
+    (atômico, para o textfile collector do node_exporter). `extra()` devolve
+    contadores adicionais (ex.: SYNs capturados) incluídos em ambos.
+    """
+    def __init__(self, metricas, interval=1.0, stats_file=None, stats_format='jsonl',
+                 extra=None, console=True):
+        self.metricas = metricas
+        self.interval = interval
+        self.stats_file = stats_file
+        self.stats_format = stats_format
+        self.extra = extra
+        self.console = console and interval > 0
+        self._start = self._last_t = time.monotonic()
+        self._last_sent = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._tty = sys.stdout.isatty()
+        self._printed = False
+
+    def start(self):
+        if self.interval > 0:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.tick()
+
+    def snapshot(self):
+        now = time.monotonic()
+        tot = self.metricas.totais()
+        dt = now - self._last_t
+        rate = (tot['sent'] - self._last_sent) / dt if dt > 0 else 0.0
+        self._last_t, self._last_sent = now, tot['sent']
+        elapsed = now - self._start
+        snap = {
+            'ts': time.time(),
+            'elapsed': round(elapsed, 3),
+            'sent': tot['sent'],
+            'bytes': tot['bytes'],
+            'batches': tot['batches'],
+            'pps': round(rate, 1),
+            'avg_pps': round(tot['sent'] / elapsed, 1) if elapsed > 0 else 0.0,
+            'workers': self.metricas.por_worker() if self.metricas.workers > 1 else None,
+        }
+        if self.extra:
+            snap.update(self.extra())
+        return snap
+
+    def tick(self):
+        snap = self.snapshot()
+        if self.console:
+            line = (f'[*] {snap["sent"]} enviados | {snap["pps"]:.0f} pps (média {snap["avg_pps"]:.0f}) | '
+                    f'{snap["bytes"] * 8 / max(snap["elapsed"], 1e-9) / 1e6:.2f} Mbit/s | {snap["elapsed"]:.1f}s')
+            if 'captured' in snap:
+                line += f' | capturados {snap["captured"]}'
+            if 'answered' in snap:
+                line += f' | respostas {snap["answered"]}'
+            print(Fore.CYAN + line + Style.RESET_ALL, end='\r' if self._tty else '\n', flush=True)
+            self._printed = True
+        if self.stats_file:
             try:
-                ip_layer.src = origem_ip
-            except Exception:
-                pass
+                self._write_stats(snap)
+            except OSError as e:
+                print(Fore.YELLOW + f'[!] Falha ao gravar estatísticas: {e}' + Style.RESET_ALL)
+                self.stats_file = None
+
+    def _write_stats(self, snap):
+        if self.stats_format == 'prom':
+            tmp = self.stats_file + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(formatar_prometheus(snap))
+            os.replace(tmp, self.stats_file)
+        else:
+            with open(self.stats_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(snap, separators=(',', ':')) + '\n')
+
+    def stop(self):
+        """Para a thread e emite o snapshot final."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.interval > 0 or self.stats_file:
+            self.tick()
+        if self._printed and self._tty:
+            print()
+
+
+def formatar_prometheus(snap):
+    """Snapshot do RelatorioStatus no formato texto de exposição do Prometheus."""
+    lines = []
+
+    def metric(name, kind, help_text, value, labels=None):
+        lines.append(f'# HELP packetsend_{name} {help_text}')
+        lines.append(f'# TYPE packetsend_{name} {kind}')
+        if isinstance(value, list):
+            for lbl, v in value:
+                lines.append(f'packetsend_{name}{{{lbl}}} {v}')
+        else:
+            lines.append(f'packetsend_{name} {value}')
+
+    workers = snap.get('workers')
+    if workers:
+        metric('packets_sent_total', 'counter', 'SYNs enviados',
+               [(f'worker="{i}"', w['sent']) for i, w in enumerate(workers)])
+        metric('bytes_sent_total', 'counter', 'Bytes enviados',
+               [(f'worker="{i}"', w['bytes']) for i, w in enumerate(workers)])
     else:
-        ip_layer = IP(dst=resolved_ip)
-        if origem_ip:
-            try:
-                ip_layer.src = origem_ip
-            except Exception:
-                pass
+        metric('packets_sent_total', 'counter', 'SYNs enviados', snap['sent'])
+        metric('bytes_sent_total', 'counter', 'Bytes enviados', snap['bytes'])
+    metric('send_rate_pps', 'gauge', 'Taxa de envio no último intervalo', snap['pps'])
+    metric('elapsed_seconds', 'gauge', 'Tempo desde o início do envio', snap['elapsed'])
+    if 'captured' in snap:
+        metric('captured_syns_total', 'counter', 'SYNs vistos pela captura', snap['captured'])
+    if 'answered' in snap:
+        metric('answered_syns_total', 'counter', 'SYNs com resposta (SYN-ACK/RST)', snap['answered'])
+    return '\n'.join(lines) + '\n'
 
-    tcp = TCP(dport=destino_porta, flags='S', sport=12345)
 
-    # Interface de envio
-    if iface is None:
+# ---------------------------------------------------------------------------
+# Captura e correlação de respostas (--capture)
+# ---------------------------------------------------------------------------
+
+class HistogramaLatencia:
+    """Histograma log-linear no estilo HDR: valores inteiros (µs) abaixo de
+    2^`bits` têm bucket exato; acima, cada potência de 2 é dividida em
+    2^(bits-1) sub-buckets (erro relativo <= 1/2^(bits-1), ~1,6% com bits=7).
+    Memória constante (algumas centenas de contadores) para qualquer volume.
+    """
+    def __init__(self, bits=7):
+        self.bits = bits
+        self._half = 1 << (bits - 1)
+        self.counts = collections.Counter()
+        self.total = 0
+        self.max = 0
+
+    def _index(self, v):
+        if v < (1 << self.bits):
+            return v
+        e = v.bit_length() - self.bits
+        return e * self._half + (v >> e)
+
+    def _lower(self, idx):
+        """Menor valor do bucket `idx`."""
+        if idx < (1 << self.bits):
+            return idx
+        e = idx // self._half - 1
+        return (idx - e * self._half) << e
+
+    def _upper(self, idx):
+        return self._lower(idx + 1) - 1 if idx + 1 >= (1 << self.bits) else idx
+
+    def record(self, value):
+        v = max(0, int(value))
+        self.counts[self._index(v)] += 1
+        self.total += 1
+        if v > self.max:
+            self.max = v
+
+    def percentile(self, p):
+        """Valor (limite superior do bucket, sem passar do máximo) no percentil p."""
+        if not self.total:
+            return 0
+        rank = max(1, int(math.ceil(p / 100.0 * self.total)))
+        acc = 0
+        for idx in sorted(self.counts):
+            acc += self.counts[idx]
+            if acc >= rank:
+                return min(self._upper(idx), self.max)
+        return self.max
+
+    def buckets(self):
+        """[[menor valor, contagem], ...] dos buckets não vazios."""
+        return [[self._lower(i), self.counts[i]] for i in sorted(self.counts)]
+
+
+class CorrelacaoRespostas:
+    """Casa SYN-ACK/RST com o SYN que respondem.
+
+    SYNs de saída (destino em `alvos`) entram em um índice hash
+    (sport, seq) → instantes de captura; a resposta traz dport = nosso sport
+    e ack = seq + 1, então a busca é O(1) por pacote. Chaves repetidas (seq
+    reaproveitado depois de 2^32 pacotes) ficam em fila e casam em ordem.
+    `saida` diz se o quadro foi enviado por esta máquina (PACKET_OUTGOING):
+    SYNs só contam na saída e respostas só na entrada, senão na loopback, que
+    entrega cada quadro duas vezes, tudo contaria em dobro. SYNs sem
+    resposta após `timeout` segundos contam como perdidos. O RTT usa os
+    instantes da própria captura (fio a fio) e vai para um HistogramaLatencia;
+    `on_reply(registro)` recebe cada resposta casada.
+    """
+    SYN, RST, ACK = 0x02, 0x04, 0x10
+
+    def __init__(self, alvos, timeout=1.0, on_reply=None):
+        self.alvos = set(alvos)
+        self.timeout = timeout
+        self.on_reply = on_reply
+        self.pending = {}
+        self._order = collections.deque()
+        self.histograma = HistogramaLatencia()
+        self.syns = 0
+        self.synack = 0
+        self.rst = 0
+        self.expired = 0
+        self.unmatched = 0
+
+    def on_segment(self, src, dst, segment, ts, saida=None):
+        """Processa um segmento TCP capturado (src/dst em bytes, ts em segundos;
+        `saida` None = direção desconhecida, aceita os dois papéis)."""
+        hdr = parse_tcp_reply(segment)
+        if hdr is None:
+            return
+        sport, dport, seq, ack, flags = hdr
+        if saida is not False and dst in self.alvos and flags & self.SYN and not flags & self.ACK:
+            self.syns += 1
+            key = (sport, seq)
+            q = self.pending.get(key)
+            if q is None:
+                q = self.pending[key] = collections.deque()
+            q.append(ts)
+            self._order.append((ts, key))
+            self.expire(ts)
+        elif saida is not True and src in self.alvos and (flags & (self.SYN | self.ACK) == self.SYN | self.ACK or flags & self.RST):
+            key = (dport, (ack - 1) & 0xFFFFFFFF)
+            q = self.pending.get(key)
+            if not q:
+                self.unmatched += 1
+                return
+            sent_ts = q.popleft()
+            if not q:
+                del self.pending[key]
+            rtt_us = (ts - sent_ts) * 1e6
+            self.histograma.record(rtt_us)
+            kind = 'rst' if flags & self.RST else 'synack'
+            if kind == 'rst':
+                self.rst += 1
+            else:
+                self.synack += 1
+            if self.on_reply:
+                self.on_reply({'ts': ts, 'src': _ip_texto(src), 'sport': key[0], 'dport': sport, 'seq': key[1],
+                               'reply': kind, 'rtt_ms': round(rtt_us / 1000, 6)})
+
+    def expire(self, now):
+        """Conta como perdidos os SYNs pendentes há mais de `timeout` segundos."""
+        limit = now - self.timeout
+        order, pending = self._order, self.pending
+        while order and order[0][0] < limit:
+            ts, key = order.popleft()
+            q = pending.get(key)
+            if q and q[0] == ts:        # senão já foi respondido
+                q.popleft()
+                if not q:
+                    del pending[key]
+                self.expired += 1
+
+    @property
+    def answered(self):
+        return self.synack + self.rst
+
+    def stats(self):
+        """Contadores, taxa de perda, percentis de RTT (ms) e buckets (µs)."""
+        lost = self.syns - self.answered
+        h = self.histograma
+        return {
+            'syns': self.syns,
+            'answered': self.answered,
+            'synack': self.synack,
+            'rst': self.rst,
+            'lost': lost,
+            'loss_rate': round(lost / self.syns, 6) if self.syns else None,
+            'unmatched_replies': self.unmatched,
+            'rtt_ms': {p: round(h.percentile(float(p[1:])) / 1000, 3)
+                       for p in ('p50', 'p90', 'p99', 'p99.9')} if h.total else None,
+            'rtt_max_ms': round(h.max / 1000, 3) if h.total else None,
+            'histogram_us': h.buckets(),
+        }
+
+
+def _ip_texto(addr):
+    return socket.inet_ntop(socket.AF_INET6 if len(addr) == 16 else socket.AF_INET, addr)
+
+
+PACKET_OUTGOING = getattr(socket, 'PACKET_OUTGOING', 4)
+
+
+class CapturaRespostas:
+    """Thread de captura L2 (quadros crus, parse por bytes) que alimenta um
+    CorrelacaoRespostas, como a captura do SYN scan do scan_ports: dissecar
+    cada pacote com o Scapy não acompanha o envio em taxas altas.
+    """
+    def __init__(self, iface, dst_ips, correlacao):
+        self.iface = iface
+        self.correlacao = correlacao
+        hosts = ' or '.join(f'host {ip}' for ip in sorted(dst_ips))
+        bpf = f'tcp and ({hosts})' if 0 < len(dst_ips) <= 16 else 'tcp'
         try:
-            iface = conf.iface or (get_if_list()[0] if get_if_list() else None)
+            self.listen = conf.L2listen(iface=iface, filter=bpf)
         except Exception:
-            iface = None
+            # Sem libpcap o Scapy não compila BPF: captura tudo e filtra em Python
+            self.listen = conf.L2listen(iface=iface)
+        if hasattr(self.listen, 'ins'):
+            grow_rcvbuf(self.listen.ins)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
 
-    sent = 0
-    start_time = time.time()
-    log_entries = []
-    captured = {'syns': 0}
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _recv(self):
+        """(classe, quadro, ts, saída?) do próximo quadro. O recv_raw do Scapy
+        descarta o tipo do pacote; no Linux lê pelo _recv_raw, que o mantém."""
+        listen = self.listen
+        if hasattr(listen, '_recv_raw') and hasattr(listen, 'ins'):
+            frame, sa_ll, ts = listen._recv_raw(listen.ins, 65535)
+            pkttype = sa_ll[2] if sa_ll and len(sa_ll) > 2 else None
+            return listen.LL, frame, ts, None if pkttype is None else pkttype == PACKET_OUTGOING
+        cls, frame, ts = listen.recv_raw()
+        return cls, frame, ts, None
+
+    def _run(self):
+        listen, handle = self.listen, self.correlacao.on_segment
+        while not self._stop.is_set():
+            try:
+                if not listen.select([listen], 0.05):
+                    self.correlacao.expire(time.time())
+                    continue
+                cls, frame, ts, saida = self._recv()
+            except Exception:
+                continue
+            if not frame:
+                continue
+            if cls is Ether:
+                found = ether_tcp_segment(frame)
+            else:
+                pkt = cls(frame) if cls else None
+                found = None
+                if pkt is not None and TCP in pkt and (IP in pkt or IPv6 in pkt):
+                    ip = pkt[IPv6] if IPv6 in pkt else pkt[IP]
+                    fam = socket.AF_INET6 if IPv6 in pkt else socket.AF_INET
+                    found = (fam, socket.inet_pton(fam, ip.src), socket.inet_pton(fam, ip.dst), bytes(pkt[TCP]))
+            if found:
+                handle(found[1], found[2], found[3], ts or time.time(), saida)
 
-    # --- Sniffer (opcional) ---
-    def _handle_capture(pkt):
+    def drain(self, timeout):
+        """Espera respostas atrasadas: até não haver SYN pendente ou `timeout` segundos."""
+        deadline = time.monotonic() + timeout
+        time.sleep(min(0.1, timeout))      # SYNs ainda na fila do socket de captura
+        while self.correlacao.pending and time.monotonic() < deadline:
+            time.sleep(0.02)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=1.0)
         try:
-            if TCP in pkt:
-                flags = pkt[TCP].flags
-                if (flags & 0x02) and not (flags & 0x10):
-                    dst_match = (
-                        (IPv6 in pkt and getattr(pkt[IPv6], 'dst', None) == resolved_ip) or
-                        (IP in pkt and getattr(pkt[IP], 'dst', None) == resolved_ip)
-                    )
-                    if dst_match:
-                        captured['syns'] += 1
+            self.listen.close()
         except Exception:
             pass
 
-    sniffer = None
-    if capture:
-        cap_iface = capture_iface or iface
+
+# ---------------------------------------------------------------------------
+# Replay de pcap (--replay)
+# ---------------------------------------------------------------------------
+
+class FonteReplay:
+    """Quadros L2 prontos para o backend, lidos de um pcap/pcapng em streaming
+    (pcap_io.PcapReader, sem dissecar com o Scapy).
+
+    Sem `destino`, quadros Ethernet saem como foram capturados. Com `destino`
+    (ip, is_ipv6), o IP de destino é reescrito (e a porta TCP/UDP, se `porta`)
+    com IP/TCP/UDP checksums ajustados de forma incremental (RFC 1624), e o
+    cabeçalho Ethernet é trocado pelo do próximo salto até o novo destino,
+    resolvido uma vez pelo Scapy e cacheado. Capturas sem Ethernet (IP cru,
+    Linux SLL, loopback) ganham o mesmo cabeçalho montado.
+
+    Pacotes que não podem ser enviados fielmente (truncados pelo snaplen,
+    não-IP ou de outra família com reescrita, IPv6 com cabeçalhos de extensão
+    com reescrita) são pulados e contados em `skipped`.
+    """
+    def __init__(self, path, destino=None, porta=None):
+        self.reader = PcapReader(path)
+        self.destino = destino
+        self.porta = porta
+        self._novo_dst = None
+        if destino is not None:
+            ip, v6 = destino
+            self._novo_dst = socket.inet_pton(socket.AF_INET6 if v6 else socket.AF_INET, ip)
+        self._links = {}
+        if destino is not None:
+            self._link(destino[0], 6 if destino[1] else 4)     # ARP/NDP antes do cronograma
+        self._nomes = {}
+        self.read = 0
+        self.skipped = collections.Counter()
+
+    def _link(self, dst_text, version):
+        """Cabeçalho Ethernet até `dst_text` (MAC do próximo salto via Scapy)."""
+        link = self._links.get(dst_text)
+        if link is None:
+            ip = IPv6(dst=dst_text) if version == 6 else IP(dst=dst_text)
+            link = self._links[dst_text] = raw(Ether() / ip)[:14]
+        return link
+
+    def _nome(self, addr):
+        name = self._nomes.get(addr)
+        if name is None:
+            name = self._nomes[addr] = socket.inet_ntop(
+                socket.AF_INET6 if len(addr) == 16 else socket.AF_INET, addr)
+        return name
+
+    def __iter__(self):
+        """(ts do pcap, quadro, dst, proto, sport, dport, seq, flags TCP, versão IP)."""
+        novo_dst, porta = self._novo_dst, self.porta
+        for ts, frame, origlen, linktype in self.reader:
+            self.read += 1
+            if len(frame) < origlen:
+                self.skipped['truncated'] += 1
+                continue
+            found = ip_offset(frame, linktype)
+            if found is None:
+                if novo_dst is None and linktype == LINKTYPE_ETHERNET:
+                    yield ts, bytes(frame), None, 0, 0, 0, 0, 0, 0     # ARP etc., como veio
+                else:
+                    self.skipped['non_ip'] += 1
+                continue
+            off, version = found
+            if version == 4:
+                ihl = (frame[off] & 0x0F) * 4
+                proto = frame[off + 9]
+                first = not struct.unpack_from('!H', frame, off + 6)[0] & 0x1FFF
+                dst_off, alen = off + 16, 4
+                l4 = off + ihl if first else None
+            else:
+                proto = frame[off + 6]
+                dst_off, alen = off + 24, 16
+                l4 = off + 40
+            if proto not in (socket.IPPROTO_TCP, socket.IPPROTO_UDP):
+                l4 = None
+            if novo_dst is not None and (len(novo_dst) != alen or (version == 6 and l4 is None)):
+                self.skipped['family' if len(novo_dst) != alen else 'ipv6_ext'] += 1
+                continue
+            sport = dport = seq = flags = 0
+            if l4 is not None:
+                if proto == socket.IPPROTO_TCP and len(frame) >= l4 + 20:
+                    sport, dport, seq = struct.unpack_from('!HHI', frame, l4)
+                    flags = frame[l4 + 13]
+                    csum_off = l4 + 16
+                elif proto == socket.IPPROTO_UDP and len(frame) >= l4 + 8:
+                    sport, dport, csum = struct.unpack_from('!HH2xH', frame, l4)
+                    csum_off = l4 + 6 if csum or version == 6 else None
+                else:
+                    l4 = csum_off = None
+            if novo_dst is None:
+                dst = self._nome(bytes(frame[dst_off:dst_off + alen]))
+                if linktype == LINKTYPE_ETHERNET:
+                    yield ts, bytes(frame), dst, proto, sport, dport, seq, flags, version
+                else:
+                    yield ts, self._link(dst, version) + bytes(frame[off:]), dst, proto, sport, dport, seq, flags, version
+                continue
+
+            # Reescrita: endereço (16 bits por vez) e porta, ajustando os checksums
+            pkt = bytearray(frame[off:])
+            base = off
+            csums = [10] if version == 4 else []
+            if l4 is not None and csum_off is not None:
+                csums.append(csum_off - base)
+            old = bytes(pkt[dst_off - base:dst_off - base + alen])
+            pkt[dst_off - base:dst_off - base + alen] = novo_dst
+            for i in range(0, alen, 2):
+                o = (old[i] << 8) | old[i + 1]
+                n = (novo_dst[i] << 8) | novo_dst[i + 1]
+                for c in csums:
+                    _ajustar_checksum(pkt, c, o, n)
+            if porta and l4 is not None:
+                struct.pack_into('!H', pkt, l4 - base + 2, porta)
+                if csum_off is not None:
+                    _ajustar_checksum(pkt, csum_off - base, dport, porta)
+                dport = porta
+            dst = self.destino[0]
+            yield ts, self._link(dst, version) + bytes(pkt), dst, proto, sport, dport, seq, flags, version
+
+    def close(self):
+        self.reader.close()
+
+
+def _ajustar_checksum(buf, csum_off, old, new):
+    """Checksum em `buf[csum_off]` ajustado para uma palavra que mudou de old para new."""
+    csum = struct.unpack_from('!H', buf, csum_off)[0]
+    struct.pack_into('!H', buf, csum_off, checksum_adjust(csum, old, new))
+
+
+# ---------------------------------------------------------------------------
+# Loop de envio (um por worker)
+# ---------------------------------------------------------------------------
+
+def _cota(total, wid, n_workers):
+    """Parte de `total` que cabe ao worker `wid` (divisão o mais igual possível)."""
+    return total // n_workers + (1 if wid < total % n_workers else 0)
+
+
+def _executar_envio(wid, cfg, verbose=True, log=None, metricas=None):
+    """Loop de envio do worker `wid` de `cfg['workers']`. O worker envia os
+    pacotes k = wid, wid + N, wid + 2N..., com `count` e taxa divididos entre
+    os N workers. Cada pacote vira um registro em `log` (NdjsonLogWriter); sem
+    `log` e com `cfg['log']`, o worker grava a própria parte do log. Cada lote
+    soma no slot do worker em `metricas` (MetricasEnvio); com `cfg['verbose']`
+    imprime uma linha por pacote. Devolve os contadores (enviados, bytes,
+    tempo, pacing, por alvo).
+    """
+    n_workers = cfg['workers']
+    ifaces = cfg['ifaces']
+    iface = ifaces[wid % len(ifaces)] if ifaces else None
+    iface_name = iface if isinstance(iface, str) else getattr(iface, 'name', str(iface))
+    destinos = cfg['destinos']
+    counters = {'worker': wid, 'iface': iface_name, 'cpu': None, 'backend': None,
+                'sent': 0, 'bytes': 0, 'elapsed': 0.0, 'pacing': None, 'per_target': {}}
+
+    if cfg.get('pin') and hasattr(os, 'sched_setaffinity'):
+        cpus = sorted(os.sched_getaffinity(0))
+        counters['cpu'] = cpus[wid % len(cpus)]
+        os.sched_setaffinity(0, {counters['cpu']})
+
+    if iface is None and len(destinos) > 1:
+        raise ValueError('Vários destinos exigem uma interface (envio L2)')
+    _, first_ip, first_v6 = destinos[0]
+    tx = abrir_backend(iface, first_ip, first_v6, cfg['backend'], max_batch=max(1, cfg['lote']))
+    counters['backend'] = tx.name
+    if verbose:
+        print(Fore.CYAN + f'[*] Backend de envio: {tx.name} (L{tx.layer})' + Style.RESET_ALL)
+
+    gerador = None
+    if cfg['fast']:
         try:
-            bpf = (f'ip6 and tcp and dst host {resolved_ip}' if is_ipv6
-                   else f'tcp and dst host {resolved_ip}')
-            sniffer = AsyncSniffer(iface=cap_iface, filter=bpf, prn=_handle_capture)
-            sniffer.start()
-            print(Fore.CYAN + f'[*] Sniffer iniciado em {cap_iface}' + Style.RESET_ALL)
+            gerador = GeradorSyn(destinos, cfg['portas'], tx.layer, True, cfg['origem_ip'],
+                                 cfg['sport'], cfg['sport_mode'])
+            if verbose:
+                print(Fore.CYAN + '[*] Modo rápido: template em bytes' + Style.RESET_ALL)
         except Exception as e:
-            print(Fore.YELLOW + f'[!] Falha ao iniciar sniffer: {e}' + Style.RESET_ALL)
+            print(Fore.YELLOW + f'[!] Modo rápido indisponível ({e}); usando Scapy por pacote.' + Style.RESET_ALL)
+    if gerador is None:
+        # Com --capture, seq por pacote: senão todos os SYNs de um fluxo com
+        # sport fixo teriam a chave (sport, 0) e as respostas não se distinguem
+        gerador = GeradorSyn(destinos, cfg['portas'], tx.layer, False, cfg['origem_ip'],
+                             cfg['sport'], cfg['sport_mode'], seq_unico=cfg.get('capture', False))
+
+    # Pacing: --pps (rajadas de até `lote` para recuperar atraso) ou --interval
+    # (deadline a cada `intervalo`, um pacote por vez); sem nenhum, lotes cheios.
+    # A taxa pedida é a agregada: cada worker fica com 1/N dela.
+    count = _cota(cfg['count'], wid, n_workers) if cfg['count'] > 0 else 0
+    batch_size = max(1, cfg['lote'])
+    pacer = None
+    if cfg['pps'] > 0:
+        pacer = DeadlineScheduler(cfg['pps'] / n_workers, max_burst=batch_size,
+                                  ramp=cfg['ramp'], profile=cfg['ramp_profile'])
+    elif cfg['intervalo'] > 0:
+        pacer = DeadlineScheduler(1.0 / cfg['intervalo'] / n_workers, max_burst=1)
+        batch_size = 1
+
+    own_log = None
+    if log is None and cfg.get('log'):
+        opts = dict(cfg['log'])
+        writer = BinaryLogWriter if opts.pop('binary') else NdjsonLogWriter
+        path, header = opts.pop('path'), opts.pop('header')
+        own_log = log = writer(part_path(path, wid), header=dict(header, worker=wid, iface=iface_name), **opts)
+    binary_log = isinstance(log, BinaryLogWriter)
+
+    # Campos constantes por destino, serializados uma vez (o registro por pacote
+    # é montado por formatação de string, sem json.dumps)
+    src = cfg['origem_ip'] or 'default'
+    campos = [
+        f'"src":{json.dumps(src)},"dst":{json.dumps(label)},"iface":{json.dumps(iface_name)},'
+        f'"ip_version":{6 if v6 else 4}'
+        for label, _, v6 in destinos
+    ]
+    per_target = collections.Counter()
+    por_pacote = verbose and cfg.get('verbose')
+    sent = 0
+    start = time.time()
+    try:
+        if count > 0 or cfg['count'] <= 0:
+            while True:
+                if count > 0 and sent >= count:
+                    break
+                if cfg['duration'] > 0 and (time.time() - cfg['start_time']) >= cfg['duration']:
+                    break
+
+                n = batch_size if count <= 0 else min(batch_size, count - sent)
+                if pacer is not None:
+                    n = pacer.wait(limit=n)
+                lote = [gerador.pacote(wid + (sent + i) * n_workers) for i in range(n)]
+                tx.send_batch([p[0] for p in lote])
+
+                sent += n
+                if pacer is not None:
+                    pacer.record(n)
+                ts = time.time()
+                lote_bytes = 0
+                for data, idx, dport, sport, seq in lote:
+                    lote_bytes += len(data)
+                    per_target[(idx, dport)] += 1
+                    if binary_log:
+                        log.write_packet(ts, idx, sport, dport, seq)
+                    elif log is not None:
+                        log.write_line(f'{{"ts":{ts!r},{campos[idx]},"dport":{dport},"sport":{sport},"seq":{seq}}}')
+                counters['bytes'] += lote_bytes
+                if metricas is not None:
+                    metricas.add(wid, n, lote_bytes)
+                if por_pacote:
+                    for i, (_, idx, dport, sport, _) in enumerate(lote, sent - n + 1):
+                        print(Fore.GREEN + f'[{i}] SYN → {_fmt_alvo(destinos[idx][0], dport)} '
+                              f'(sport={sport}, iface={iface_name})' + Style.RESET_ALL)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        counters['elapsed'] = time.time() - start
+        tx.close()
+
+    counters['sent'] = sent
+    counters['pacing'] = pacer.stats() if pacer else None
+    counters['per_target'] = {_fmt_alvo(destinos[idx][1], port): c for (idx, port), c in per_target.items()}
+    if own_log is not None:
+        own_log.close(summary=counters)
+    elif log is not None:
+        log.flush()
+    return counters
+
+
+def _executar_replay(wid, cfg, verbose=True, log=None, metricas=None):
+    """Loop do --replay: lê o pcap em streaming (FonteReplay) e envia pelo
+    mesmo backend/lotes/log/métricas do envio de SYNs. Com `speed` > 0, o
+    pacote i sai em (ts_i - ts_0) / speed desde o início (mesmo sleep + spin
+    do DeadlineScheduler; pacotes já vencidos saem juntos em lotes de até
+    `lote`); com `speed` = 0, o mais rápido possível. Devolve os mesmos
+    contadores do _executar_envio, com as estatísticas do replay em 'replay'.
+    """
+    rp = cfg['replay']
+    ifaces = cfg['ifaces']
+    iface = ifaces[wid % len(ifaces)] if ifaces else None
+    iface_name = iface if isinstance(iface, str) else getattr(iface, 'name', str(iface))
+    counters = {'worker': wid, 'iface': iface_name, 'cpu': None, 'backend': None,
+                'sent': 0, 'bytes': 0, 'elapsed': 0.0, 'pacing': None, 'per_target': {}}
+    if iface is None:
+        raise ValueError('--replay exige uma interface (envio L2)')
+    destino = cfg['destinos'][0] if cfg['destinos'] else None
+    fonte = FonteReplay(rp['path'], destino=destino[1:] if destino else None,
+                        porta=cfg['portas'][0] if cfg['portas'] else None)
+    tx = abrir_backend(iface, None, False, cfg['backend'], max_batch=max(1, cfg['lote']))
+    counters['backend'] = tx.name
+    if verbose:
+        print(Fore.CYAN + f'[*] Replay de {rp["path"]} ({fonte.reader.format}, linktype '
+              f'{fonte.reader.linktype}) via {tx.name}, velocidade '
+              f'{rp["speed"] if rp["speed"] > 0 else "máxima"}' + Style.RESET_ALL)
+
+    speed = rp['speed']
+    count = cfg['count']
+    batch_size = max(1, cfg['lote'])
+    alvos = cfg.get('alvos')             # CorrelacaoRespostas.alvos (--capture sem --dst)
+    spin = 0.001
+    clock = time.perf_counter
+    per_target = collections.Counter()
+    por_pacote = verbose and cfg.get('verbose')
+    late_max = late_sum = 0.0
+    t_first = t_last = None
+    sent = 0
+    batch = []
+
+    def _flush():
+        nonlocal sent
+        tx.send_batch([p[1] for p in batch])
+        ts = time.time()
+        lote_bytes = 0
+        for i, (_, data, dst, proto, sport, dport, seq, flags, version) in enumerate(batch, sent + 1):
+            lote_bytes += len(data)
+            per_target[(dst, dport)] += 1
+            if log is not None:
+                log.write_line(f'{{"ts":{ts!r},"dst":{json.dumps(dst)},"iface":{json.dumps(iface_name)},'
+                               f'"ip_version":{version},"proto":{proto},"dport":{dport},"sport":{sport},'
+                               f'"seq":{seq},"flags":{flags}}}')
+            if por_pacote:
+                print(Fore.GREEN + f'[{i}] {_fmt_alvo(dst, dport) if dst else "não-IP"} '
+                      f'(proto={proto}, flags=0x{flags:02x}, {len(data)} bytes)' + Style.RESET_ALL)
+        sent += len(batch)
+        counters['bytes'] += lote_bytes
+        if metricas is not None:
+            metricas.add(wid, len(batch), lote_bytes)
+        batch.clear()
+
+    start = time.time()
+    t0 = clock()
+    try:
+        for item in fonte:
+            if count > 0 and sent + len(batch) >= count:
+                break
+            if cfg['duration'] > 0 and (time.time() - cfg['start_time']) >= cfg['duration']:
+                break
+            if t_first is None:
+                t_first = item[0]
+            t_last = item[0]
+            if speed > 0:
+                target = t0 + (item[0] - t_first) / speed
+                if batch and target > clock():
+                    _flush()                     # o que já venceu sai antes de esperar
+                while True:
+                    remaining = target - clock()
+                    if remaining <= 0:
+                        break
+                    if remaining > spin:
+                        time.sleep(remaining - spin)
+                late = -remaining
+                late_sum += late
+                late_max = max(late_max, late)
+            if alvos is not None and item[7] & 0x02 and item[2]:
+                alvos.add(socket.inet_pton(socket.AF_INET6 if item[8] == 6 else socket.AF_INET, item[2]))
+            batch.append(item)
+            if len(batch) >= batch_size:
+                _flush()
+        if batch:
+            _flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        counters['elapsed'] = time.time() - start
+        tx.close()
+        fonte.close()
+
+    counters['sent'] = sent
+    counters['per_target'] = {(_fmt_alvo(dst, port) if dst else 'non-ip'): c
+                              for (dst, port), c in per_target.items()}
+    counters['replay'] = {
+        'file': rp['path'], 'speed': speed, 'read': fonte.read, 'skipped': dict(fonte.skipped),
+        'pcap_span_s': round(t_last - t_first, 6) if t_first is not None else 0.0,
+        'max_late_ms': round(late_max * 1000, 6) if speed > 0 else None,
+        'mean_late_ms': round(late_sum / max(sent, 1) * 1000, 6) if speed > 0 else None,
+    }
+    if log is not None:
+        log.flush()
+    return counters
+
 
-    # --- Salvar log (única função, chamada no finally) ---
-    def _save_log_once():
-        if not logfile:
+def _worker_processo(wid, cfg, result_queue, metricas):
+    """Processo filho: roda o loop de envio e manda os contadores ao pai."""
+    try:
+        result_queue.put(('done', wid, _executar_envio(wid, cfg, verbose=False, metricas=metricas)))
+    except BaseException as e:
+        result_queue.put(('error', wid, repr(e)))
+
+
+def _executar_workers(cfg, metricas=None):
+    """Roda `cfg['workers']` processos de envio e devolve (contadores, erros)."""
+    ctx = multiprocessing.get_context()
+    result_queue = ctx.Queue()
+    procs = [ctx.Process(target=_worker_processo, args=(i, cfg, result_queue, metricas), daemon=True)
+             for i in range(cfg['workers'])]
+    for proc in procs:
+        proc.start()
+    results, errors = [], []
+    pending = set(range(len(procs)))
+    while pending:
+        try:
+            kind, wid, payload = result_queue.get(timeout=0.5)
+        except KeyboardInterrupt:
+            continue            # Ctrl+C chega também aos filhos; espera os contadores
+        except queue.Empty:
+            for i in list(pending):
+                if not procs[i].is_alive() and procs[i].exitcode not in (None, 0):
+                    pending.discard(i)
+                    errors.append((i, f'processo terminou com código {procs[i].exitcode}'))
+            continue
+        pending.discard(wid)
+        if kind == 'done':
+            results.append(payload)
+        else:
+            errors.append((wid, payload))
+    for proc in procs:
+        proc.join(timeout=1.0)
+        if proc.is_alive():
+            proc.terminate()
+    return sorted(results, key=lambda c: c['worker']), errors
+
+
+def enviar_syn(destino_ip, destino_porta, intervalo=0, count=0, duration=0,
+               origem_ip=None, iface=None, logfile=None, capture=False, capture_iface=None,
+               fast=False, backend='auto', lote=64, pps=0, ramp=0, ramp_profile='linear',
+               sport=12345, sport_mode='fixed', workers=1, pin=False,
+               log_flush=1000, log_flush_ms=200, log_max_mb=0, log_format='auto',
+               verbose=False, status_interval=1.0, stats_file=None, stats_format='auto',
+               reply_timeout=1.0, replay=None, replay_speed=1.0):
+    """Envia pacotes SYN TCP.
+
+    Args:
+        destino_ip:     IP/hostname de destino; aceita lista, intervalo e CIDR
+                        (10.0.0.1,10.0.0.5 / 10.0.0.1-20 / 10.0.0.0/28).
+        destino_porta:  Porta(s) TCP de destino: 80, '80,443' ou '8000-8010'.
+        intervalo:      Segundos entre pacotes (0 = sem pausa).
+        count:          Número de pacotes a enviar (0 = contínuo até Ctrl+C).
+        duration:       Duração total em segundos (0 = sem limite de tempo).
+        origem_ip:      IP de origem (None = automático).
+        iface:          Interface de rede (None = padrão do Scapy); com vírgulas,
+                        os workers são distribuídos entre as interfaces.
+        logfile:        Log em streaming (send_log.py); None = sem log.
+        capture:        Se True, captura os SYNs enviados e casa as respostas
+                        (SYN-ACK/RST) por (sport, seq): RTT, perda e histograma.
+        capture_iface:  Interface para captura (None = usa mesma de envio).
+        fast:           Modo rápido: SYN pré-montado em bytes (packet_templates),
+                        só portas/seq/IP ID reescritos por pacote.
+        backend:        Transmissão (socket aberto uma vez): auto, sendmmsg, socket, scapy.
+        lote:           Pacotes por flush quando intervalo = 0 (com intervalo > 0, 1).
+        pps:            Taxa alvo com pacing por deadline (sobrepõe `intervalo`);
+                        atrasado, envia rajadas de até `lote` pacotes.
+        ramp:           Segundos de rampa até `pps` (0 = taxa cheia desde o início).
+        ramp_profile:   Forma da rampa: 'linear' ou 'step'.
+        sport:          Porta de origem (fixa) ou inicial (sport_mode='seq').
+        sport_mode:     'fixed', 'seq' ou 'random'.
+        workers:        Processos de envio; `count` e a taxa são divididos entre eles.
+        pin:            Fixa cada worker em um núcleo de CPU (Linux).
+        log_flush:      Registros por escrita no log.
+        log_flush_ms:   Intervalo máximo (ms) entre escritas no log.
+        log_max_mb:     Rotaciona o log ao passar deste tamanho (0 = sem rotação).
+        log_format:     'ndjson', 'binary' (.pslog, 16 bytes por pacote) ou
+                        'auto' (binário se o arquivo terminar em .pslog).
+        verbose:        Uma linha por pacote (senão, só a linha de status).
+        status_interval: Segundos entre atualizações da linha de status (0 = sem).
+        stats_file:     Arquivo de estatísticas atualizado a cada intervalo.
+        stats_format:   'jsonl' (um snapshot por linha), 'prom' (Prometheus,
+                        reescrito) ou 'auto' (prom se terminar em .prom).
+        reply_timeout:  Segundos sem resposta para um SYN contar como perdido.
+        replay:         Pcap/pcapng a reproduzir no lugar dos SYNs gerados; com
+                        destino_ip/destino_porta, reescreve destino e porta.
+        replay_speed:   Fator sobre o tempo original do pcap (1 = original,
+                        2 = duas vezes mais rápido, 0 = o mais rápido possível).
+    """
+    try:
+        destinos = resolver_destinos(destino_ip) if destino_ip or not replay else []
+        portas = parse_port_spec(destino_porta) if destino_porta or not replay else []
+    except (ValueError, OSError) as e:
+        print(Fore.RED + f'[!] Destino inválido: {e}' + Style.RESET_ALL)
+        return
+    if replay:
+        if len(destinos) > 1 or len(portas) > 1:
+            print(Fore.RED + '[!] --replay reescreve para um único destino e porta' + Style.RESET_ALL)
             return
-        data = {
-            'target': destino_ip,
-            'resolved_ip': resolved_ip,
-            'port': destino_porta,
-            'ip_version': 6 if is_ipv6 else 4,
-            'sent': sent,
-            'entries': log_entries,
-        }
-        if capture:
-            data['captured'] = {'syns': captured.get('syns', 0)}
+        if logfile and (log_format == 'binary' or (log_format == 'auto' and logfile.lower().endswith('.pslog'))):
+            print(Fore.RED + '[!] --replay grava só log NDJSON (o .pslog indexa destinos fixos)' + Style.RESET_ALL)
+            return
+        if not os.path.isfile(replay):
+            print(Fore.RED + f'[!] Arquivo de replay não encontrado: {replay}' + Style.RESET_ALL)
+            return
+        if workers > 1:
+            print(Fore.YELLOW + '[!] --replay usa um worker (ordem e tempos do pcap)' + Style.RESET_ALL)
+            workers = 1
+
+    # Interface(s) de envio
+    if iface is None:
         try:
-            with open(logfile, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2)
-            print(Fore.GREEN + f'[+] Log salvo em {logfile}' + Style.RESET_ALL)
+            iface = conf.iface or (get_if_list()[0] if get_if_list() else None)
+        except Exception:
+            iface = None
+    if isinstance(iface, str) and ',' in iface:
+        ifaces = [i.strip() for i in iface.split(',') if i.strip()]
+    else:
+        ifaces = [iface] if iface is not None else []
+
+    workers = max(1, int(workers))
+    start_time = time.time()
+    dst_ips = {ip for _, ip, _ in destinos}
+
+    # --- Captura (opcional): SYNs de saída + respostas casadas por (sport, seq) ---
+    correlacao = captura = replies = None
+    if capture:
+        cap_iface = capture_iface or (ifaces[0] if ifaces else None)
+        if logfile:
+            try:
+                replies = NdjsonLogWriter(reply_path(logfile), header={
+                    'target': destino_ip, 'started': start_time, 'reply_timeout': reply_timeout})
+            except OSError as e:
+                print(Fore.YELLOW + f'[!] Falha ao abrir log de respostas: {e}' + Style.RESET_ALL)
+        alvos = {socket.inet_pton(socket.AF_INET6 if v6 else socket.AF_INET, ip) for _, ip, v6 in destinos}
+        correlacao = CorrelacaoRespostas(alvos, timeout=reply_timeout,
+                                         on_reply=replies.write if replies else None)
+        try:
+            captura = CapturaRespostas(cap_iface, dst_ips, correlacao).start()
+            print(Fore.CYAN + f'[*] Captura iniciada em {cap_iface}' + Style.RESET_ALL)
         except Exception as e:
-            print(Fore.RED + f'[!] Falha ao salvar log: {e}' + Style.RESET_ALL)
+            print(Fore.YELLOW + f'[!] Falha ao iniciar captura: {e}' + Style.RESET_ALL)
 
     # --- Ctrl+C handler ---
     def _signal_handler(sig, frame):
@@ -164,50 +1409,163 @@ def enviar_syn(destino_ip, destino_porta, intervalo=0, count=0, duration=0,
 
     signal.signal(signal.SIGINT, _signal_handler)
 
-    # --- Loop de envio ---
-    try:
-        while True:
-            if count > 0 and sent >= count:
-                break
-            if duration > 0 and (time.time() - start_time) >= duration:
-                break
+    cfg = {
+        'destinos': destinos, 'portas': portas, 'ifaces': ifaces, 'origem_ip': origem_ip,
+        'fast': fast, 'backend': backend, 'lote': lote, 'count': count, 'duration': duration,
+        'start_time': start_time, 'pps': pps, 'intervalo': intervalo, 'ramp': ramp,
+        'ramp_profile': ramp_profile, 'sport': sport, 'sport_mode': sport_mode,
+        'workers': workers, 'pin': pin, 'verbose': verbose, 'capture': bool(capture),
+    }
+    if replay:
+        cfg['replay'] = {'path': replay, 'speed': max(0.0, float(replay_speed))}
+        if correlacao is not None and not destinos:
+            # Sem reescrita os destinos só aparecem no pcap: o replay (mesmo
+            # processo) registra cada um antes de enviar o SYN
+            cfg['alvos'] = correlacao.alvos
+    # --- Log em streaming: header agora, um registro por pacote, summary no fim ---
+    log = None
+    if logfile:
+        first_label, first_ip, first_v6 = destinos[0] if destinos else (None, None, False)
+        header = {
+            'target': destino_ip,
+            'resolved_ip': first_ip,
+            'port': portas[0] if portas else None,
+            'ip_version': 6 if first_v6 else 4,
+            'targets': [ip for _, ip, _ in destinos],
+            'ports': portas,
+            'started': start_time,
+            'workers': workers,
+            'labels': [label for label, _, _ in destinos],
+            'ip_versions': [6 if v6 else 4 for _, _, v6 in destinos],
+            'src': origem_ip or 'default',
+        }
+        if replay:
+            header.update(replay=replay, replay_speed=cfg['replay']['speed'])
+        binary = log_format == 'binary' or (log_format == 'auto' and logfile.lower().endswith('.pslog'))
+        writer = BinaryLogWriter if binary else NdjsonLogWriter
+        log_opts = {'flush_records': log_flush, 'flush_ms': log_flush_ms,
+                    'max_bytes': int(log_max_mb * (1 << 20))}
+        try:
+            if ifaces:
+                iface0 = ifaces[0]
+                header['iface'] = iface0 if isinstance(iface0, str) else getattr(iface0, 'name', str(iface0))
+            log = writer(logfile, header=header, **log_opts)
+            if workers > 1:
+                cfg['log'] = dict(log_opts, path=logfile, header=header, binary=binary)
+        except OSError as e:
+            print(Fore.RED + f'[!] Falha ao abrir log: {e}' + Style.RESET_ALL)
 
-            if iface:
-                pacote = Ether() / ip_layer / tcp
-                sendp(pacote, iface=iface, verbose=False)
-            else:
-                pacote = ip_layer / tcp
-                send(pacote, verbose=False)
-
-            sent += 1
-            ts = time.time()
-            iface_name = iface if isinstance(iface, str) else getattr(iface, 'name', str(iface))
-            log_entries.append({
-                'ts': ts,
-                'src': origem_ip or 'default',
-                'dst': destino_ip,
-                'dport': destino_porta,
-                'iface': iface_name,
-                'ip_version': 6 if is_ipv6 else 4,
-            })
-            print(Fore.GREEN + f'[{sent}] SYN → {destino_ip}:{destino_porta}  (iface={iface_name})' + Style.RESET_ALL)
-
-            if intervalo > 0:
-                time.sleep(intervalo)
+    if not replay and (len(destinos) * len(portas) > 1 or workers > 1):
+        print(Fore.CYAN + f'[*] {len(destinos)} destino(s) × {len(portas)} porta(s), '
+              f'{workers} worker(s), porta de origem: {sport_mode}' + Style.RESET_ALL)
 
-    except KeyboardInterrupt:
-        pass
+    # --- Métricas ao vivo ---
+    metricas = MetricasEnvio(workers)
+    if stats_format == 'auto':
+        stats_format = 'prom' if stats_file and stats_file.endswith('.prom') else 'jsonl'
+    status = RelatorioStatus(
+        metricas, interval=status_interval, stats_file=stats_file, stats_format=stats_format,
+        extra=(lambda: {'captured': correlacao.syns, 'answered': correlacao.answered}) if captura else None,
+        console=not verbose,
+    ).start()
+
+    results, errors = [], []
+    try:
+        if workers == 1:
+            try:
+                executar = _executar_replay if replay else _executar_envio
+                results = [executar(0, cfg, log=log, metricas=metricas)]
+            except Exception as e:
+                errors = [(0, repr(e))]
+        else:
+            results, errors = _executar_workers(cfg, metricas)
     finally:
-        if sniffer:
+        status.stop()
+        if captura:
             try:
-                sniffer.stop()
-            except Exception:
+                captura.drain(reply_timeout)
+            except KeyboardInterrupt:
                 pass
-        _save_log_once()
+            captura.stop()
+            correlacao.expire(float('inf'))
+    reply_stats = correlacao.stats() if captura else None
+    if replies is not None:
+        replies.close(summary=reply_stats)
+
+    for wid, message in errors:
+        print(Fore.RED + f'[!] Worker {wid} falhou: {message}' + Style.RESET_ALL)
+
+    sent = sum(c['sent'] for c in results)
+    sent_bytes = sum(c['bytes'] for c in results)
+    elapsed = max((c['elapsed'] for c in results), default=0.0)
+    per_target = collections.Counter()
+    for c in results:
+        per_target.update(c['per_target'])
+
+    # --- Fechar log (summary) ---
+    if log is not None:
+        summary = {
+            'sent': sent,
+            'backend': results[0]['backend'] if results else None,
+            'elapsed': round(elapsed, 6),
+            'pacing': results[0]['pacing'] if len(results) == 1 else None,
+            'per_target': dict(per_target),
+            'workers': results,
+        }
+        if replay and results:
+            summary['replay'] = results[0]['replay']
+        if workers > 1:
+            summary['parts'] = [os.path.basename(part_path(logfile, w)) for w in range(workers)]
+        if reply_stats is not None:
+            summary['captured'] = dict(reply_stats)
+            if replies is not None:
+                summary['captured']['replies'] = os.path.basename(replies.path)
+        try:
+            log.close(summary=summary)
+            print(Fore.GREEN + f'[+] Log salvo em {logfile}' + Style.RESET_ALL)
+        except Exception as e:
+            print(Fore.RED + f'[!] Falha ao salvar log: {e}' + Style.RESET_ALL)
 
     print(Fore.CYAN + f'\n[*] Total enviado: {sent} pacotes' + Style.RESET_ALL)
-    if capture:
-        print(Fore.CYAN + f'[*] SYNs capturados pelo sniffer: {captured["syns"]}' + Style.RESET_ALL)
+    if len(results) > 1:
+        for c in results:
+            pps_w = c['sent'] / c['elapsed'] if c['elapsed'] > 0 else 0
+            pin_str = f', cpu {c["cpu"]}' if c['cpu'] is not None else ''
+            print(Fore.CYAN + f'    worker {c["worker"]}: {c["sent"]} pacotes, {pps_w:.0f} pps '
+                  f'({c["iface"]}{pin_str}, {c["backend"]})' + Style.RESET_ALL)
+    if len(per_target) > 1:
+        print(Fore.CYAN + f'[*] Por alvo: {len(per_target)} fluxos, '
+              f'mín {min(per_target.values())} / máx {max(per_target.values())} pacotes' + Style.RESET_ALL)
+    if elapsed > 0:
+        backends = ','.join(sorted({c['backend'] for c in results}))
+        print(Fore.CYAN + f'[*] Throughput: {sent / elapsed:.0f} pps, {sent_bytes * 8 / elapsed / 1e6:.2f} Mbit/s '
+              f'em {elapsed:.2f}s (backend={backends}, lote={max(1, lote)}, workers={len(results)})' + Style.RESET_ALL)
+    for c in results:
+        st = c['pacing']
+        if st is None:
+            continue
+        who = f' (worker {c["worker"]})' if len(results) > 1 else ''
+        print(Fore.CYAN + f'[*] Pacing{who}: alvo {st["target_pps"]:.0f} pps, alcançado {st["achieved_pps"]:.1f} pps, '
+              f'jitter {st["jitter_ms"]:.3f} ms (intervalo médio {st["mean_gap_ms"]:.3f} ms, '
+              f'atraso máx {st["max_late_ms"]:.3f} ms)' + Style.RESET_ALL)
+    for c in results:
+        rp = c.get('replay')
+        if rp is None:
+            continue
+        skipped = sum(rp['skipped'].values())
+        timing = (f'velocidade {rp["speed"]}x, atraso médio {rp["mean_late_ms"]:.3f} ms, máx {rp["max_late_ms"]:.3f} ms'
+                  if rp['speed'] > 0 else 'velocidade máxima')
+        print(Fore.CYAN + f'[*] Replay: {rp["read"]} pacotes lidos, {skipped} pulados '
+              f'({", ".join(f"{k} {v}" for k, v in rp["skipped"].items()) or "-"}); pcap de {rp["pcap_span_s"]:.3f}s '
+              f'reproduzido em {c["elapsed"]:.3f}s ({timing})' + Style.RESET_ALL)
+    if reply_stats is not None:
+        rs = reply_stats
+        loss = f'{rs["loss_rate"] * 100:.2f}%' if rs['loss_rate'] is not None else '-'
+        print(Fore.CYAN + f'[*] Captura: {rs["syns"]} SYNs vistos; respostas: {rs["synack"]} SYN-ACK, '
+              f'{rs["rst"]} RST, {rs["lost"]} sem resposta (perda {loss})' + Style.RESET_ALL)
+        if rs['rtt_ms']:
+            print(Fore.CYAN + '[*] RTT (ms): ' + ', '.join(f'{k} {v:.3f}' for k, v in rs['rtt_ms'].items())
+                  + f', máx {rs["rtt_max_ms"]:.3f}' + Style.RESET_ALL)
 
 
 # ---------------------------------------------------------------------------
@@ -222,23 +1580,68 @@ def _build_parser():
             'Exemplos:\n'
             '  python PacketSend.py --dst 192.168.0.1 --port 80 --count 10\n'
             '  python PacketSend.py --dst 192.168.0.1 --port 443 --count 0 --interval 0.5\n'
+            '  python PacketSend.py --replay trafego.pcap --dst 10.0.0.5 --replay-speed 2\n'
             '  python PacketSend.py  # modo interativo\n'
         )
     )
-    p.add_argument('--dst', metavar='IP', help='IP ou hostname de destino')
-    p.add_argument('--port', type=int, metavar='N', help='Porta TCP de destino')
-    p.add_argument('--count', type=int, default=10,
-                   help='Número de pacotes (0 = contínuo até Ctrl+C, default: 10)')
+    p.add_argument('--dst', metavar='IP',
+                   help='IP ou hostname de destino; aceita lista, intervalo e CIDR (10.0.0.1-20, 10.0.0.0/28)')
+    p.add_argument('--port', metavar='N', help='Porta(s) TCP de destino: 80, 80,443 ou 8000-8010')
+    p.add_argument('--count', type=int, default=None,
+                   help='Número de pacotes (0 = contínuo até Ctrl+C, default: 10; com --replay, o pcap inteiro)')
     p.add_argument('--interval', type=float, default=0.01,
                    help='Intervalo entre pacotes em segundos (default: 0.01 = 100 pps)')
     p.add_argument('--duration', type=float, default=0,
                    help='Duração máxima em segundos (0 = sem limite, default: 0)')
     p.add_argument('--src', metavar='IP', help='IP de origem (opcional, default: automático)')
-    p.add_argument('--iface', metavar='IFACE', help='Interface de rede (opcional)')
-    p.add_argument('--logfile', default='open_send_log.json',
-                   help='Arquivo de log JSON (default: open_send_log.json)')
+    p.add_argument('--iface', metavar='IFACE',
+                   help='Interface de rede (opcional); eth0,eth1 distribui os workers entre elas')
+    p.add_argument('--logfile', default='open_send_log.ndjson',
+                   help='Log NDJSON em streaming (default: open_send_log.ndjson; "" = sem log)')
+    p.add_argument('--log-flush', type=int, default=1000,
+                   help='Registros por escrita no log (default: 1000)')
+    p.add_argument('--log-flush-ms', type=float, default=200,
+                   help='Intervalo máximo entre escritas no log, em ms (default: 200)')
+    p.add_argument('--log-max-mb', type=float, default=0,
+                   help='Rotaciona o log a cada N MB: nome.1.ndjson, nome.2.ndjson... (default: 0 = sem rotação)')
+    p.add_argument('--log-format', choices=['auto', 'ndjson', 'binary'], default='auto',
+                   help='Formato do log; auto = binário (.pslog) pela extensão do --logfile (default: auto)')
+    p.add_argument('-v', '--verbose', action='store_true',
+                   help='Uma linha por pacote enviado (lento em taxas altas)')
+    p.add_argument('--status-interval', type=float, default=1.0,
+                   help='Segundos entre atualizações da linha de status (0 = desativada, default: 1)')
+    p.add_argument('--stats-file', metavar='ARQ',
+                   help='Arquivo de estatísticas reescrito a cada intervalo (JSON lines ou Prometheus)')
+    p.add_argument('--stats-format', choices=['auto', 'jsonl', 'prom'], default='auto',
+                   help='Formato do --stats-file; auto = prom se terminar em .prom (default: auto)')
     p.add_argument('--capture', action='store_true',
-                   help='Ativar sniffer para verificar pacotes enviados')
+                   help='Capturar os SYNs enviados e casar as respostas (SYN-ACK/RST): RTT, perda e histograma')
+    p.add_argument('--reply-timeout', type=float, default=1.0,
+                   help='Segundos sem resposta para um SYN contar como perdido (default: 1)')
+    p.add_argument('--fast', action='store_true',
+                   help='Modo rápido: SYN pré-montado em bytes, sem montar camadas do Scapy por pacote')
+    p.add_argument('--backend', choices=['auto', 'sendmmsg', 'socket', 'scapy'], default='auto',
+                   help='Transmissão por socket persistente (default: auto = sendmmsg → socket → Scapy L2)')
+    p.add_argument('--batch', type=int, default=64,
+                   help='Pacotes por flush quando --interval 0 (default: 64)')
+    p.add_argument('--pps', type=float, default=0,
+                   help='Taxa alvo com pacing por deadline (sobrepõe --interval; default: desativado)')
+    p.add_argument('--ramp', type=float, default=0,
+                   help='Segundos de rampa até --pps (default: 0)')
+    p.add_argument('--ramp-profile', choices=DeadlineScheduler.PROFILES, default='linear',
+                   help='Forma da rampa: linear ou step (4 degraus de 25%%) (default: linear)')
+    p.add_argument('--sport', type=int, default=12345,
+                   help='Porta de origem (fixa) ou inicial com --sport-mode seq (default: 12345)')
+    p.add_argument('--sport-mode', choices=SPORT_MODES, default='fixed',
+                   help='Porta de origem: fixed, seq (incrementa por pacote) ou random (default: fixed)')
+    p.add_argument('--workers', type=int, default=1,
+                   help='Processos de envio; --count e a taxa são divididos entre eles (default: 1)')
+    p.add_argument('--replay', metavar='PCAP',
+                   help='Reproduz um pcap/pcapng (streaming) em vez de gerar SYNs; --dst/--port reescrevem o destino')
+    p.add_argument('--replay-speed', type=float, default=1.0,
+                   help='Tempo do replay: 1 = original, 2 = 2x mais rápido, 0 = o mais rápido possível (default: 1)')
+    p.add_argument('--pin', action='store_true',
+                   help='Fixa cada worker em um núcleo de CPU (Linux)')
     return p
 
 
@@ -294,8 +1697,9 @@ def _modo_interativo():
     print('\n' + Fore.YELLOW + '[*] Opções avançadas:' + Style.RESET_ALL)
     ip_origem = input(Fore.CYAN + '→ IP de origem (Enter = automático): ' + Style.RESET_ALL).strip() or None
     iface = input(Fore.CYAN + '→ Interface (Enter = padrão): ' + Style.RESET_ALL).strip() or None
-    logfile = input(Fore.CYAN + '→ Arquivo de log (Enter = open_send_log.json): ' + Style.RESET_ALL).strip() or 'open_send_log.json'
+    logfile = input(Fore.CYAN + '→ Arquivo de log (Enter = open_send_log.ndjson): ' + Style.RESET_ALL).strip() or 'open_send_log.ndjson'
     use_capture = input(Fore.CYAN + '→ Ativar sniffer de captura? (s/n, default=n): ' + Style.RESET_ALL).strip().lower() == 's'
+    use_fast = input(Fore.CYAN + '→ Modo rápido (template em bytes)? (s/n, default=n): ' + Style.RESET_ALL).strip().lower() == 's'
 
     # Resumo
     count_str = str(count) if count > 0 else '∞ (contínuo)'
@@ -308,6 +1712,7 @@ def _modo_interativo():
     print(f'  Interface: {Fore.GREEN}{iface or "padrão"}{Style.RESET_ALL}')
     print(f'  Log:       {Fore.GREEN}{logfile}{Style.RESET_ALL}')
     print(f'  Sniffer:   {Fore.GREEN if use_capture else Fore.RED}{"Ativo" if use_capture else "Desativado"}{Style.RESET_ALL}')
+    print(f'  Rápido:    {Fore.GREEN if use_fast else Fore.RED}{"Sim" if use_fast else "Não"}{Style.RESET_ALL}')
     print(Fore.CYAN + Style.BRIGHT + '-' * 60 + Style.RESET_ALL + '\n')
 
     print(Fore.CYAN + '[*] Iniciando envio de SYNs... (Ctrl+C para parar)' + Style.RESET_ALL + '\n')
@@ -315,7 +1720,7 @@ def _modo_interativo():
         ip_destino, porta_destino,
         intervalo=intervalo, count=count, duration=0,
         origem_ip=ip_origem, iface=iface, logfile=logfile,
-        capture=use_capture,
+        capture=use_capture, fast=use_fast, verbose=True,
     )
 
 
@@ -324,9 +1729,15 @@ if __name__ == '__main__':
     parser = _build_parser()
     args, unknown = parser.parse_known_args()
 
-    if args.dst and args.port:
+    if args.replay or (args.dst and args.port):
         # Modo CLI
-        print(Fore.CYAN + f'[*] Enviando {args.count or "∞"} pacotes SYN para {args.dst}:{args.port}...' + Style.RESET_ALL)
+        if args.count is None:
+            args.count = 0 if args.replay else 10
+        if args.replay:
+            alvo = f' → {args.dst}' + (f':{args.port}' if args.port else '') if args.dst else ''
+            print(Fore.CYAN + f'[*] Reproduzindo {args.replay}{alvo}...' + Style.RESET_ALL)
+        else:
+            print(Fore.CYAN + f'[*] Enviando {args.count or "∞"} pacotes SYN para {args.dst}:{args.port}...' + Style.RESET_ALL)
         enviar_syn(
             args.dst, args.port,
             intervalo=args.interval,
@@ -336,6 +1747,27 @@ if __name__ == '__main__':
             iface=args.iface,
             logfile=args.logfile,
             capture=args.capture,
+            reply_timeout=args.reply_timeout,
+            fast=args.fast,
+            backend=args.backend,
+            lote=args.batch,
+            pps=args.pps,
+            ramp=args.ramp,
+            ramp_profile=args.ramp_profile,
+            sport=args.sport,
+            sport_mode=args.sport_mode,
+            workers=args.workers,
+            pin=args.pin,
+            log_flush=args.log_flush,
+            log_flush_ms=args.log_flush_ms,
+            log_max_mb=args.log_max_mb,
+            log_format=args.log_format,
+            verbose=args.verbose,
+            status_interval=args.status_interval,
+            stats_file=args.stats_file,
+            stats_format=args.stats_format,
+            replay=args.replay,
+            replay_speed=args.replay_speed,
         )
     else:
         # Modo interativo (foco principal)
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+neighbor_cache.py
+Resolução IP → MAC (ARP para IPv4, NDP para IPv6) compartilhada pelo
+scan_ports.py (--mac) e pelo verify_capture.py (--mac).
+
+Ordem de consulta de `NeighborCache.lookup`:
+  1. cache em memória do processo, com TTL (também guarda as faltas, por
+     `negative_ttl`, para não sondar de novo um host mudo);
+  2. cache em disco opcional (JSON), com o mesmo TTL;
+  3. tabela de vizinhos do kernel, lida inteira de uma vez: dump
+     RTM_GETNEIGH por rtnetlink (IPv4 e IPv6) no Linux, /proc/net/arp se o
+     netlink falhar, `arp -a`/netsh no Windows. Todas as entradas vão para o
+     cache: com muitos hosts, um dump serve a todos;
+  4. só em falta: sonda ativa. Um datagrama UDP para a porta discard (9) faz o
+     próprio kernel enviar o ARP who-has / NDP neighbor solicitation (sem root
+     nem Scapy), e a tabela é relida até a entrada aparecer ou `timeout`.
+
+Destinos fora do enlace (com gateway na rota) não são sondados: o vizinho
+seria o gateway, e o MAC dele não é o do destino.
+"""
+import ipaddress
+import json
+import os
+import platform
+import re
+import select
+import socket
+import struct
+import subprocess
+import sys
+import time
+
+NETLINK_ROUTE = 0
+RTM_NEWNEIGH, RTM_GETNEIGH = 28, 30
+NLMSG_ERROR, NLMSG_DONE = 2, 3
+NLM_F_REQUEST, NLM_F_DUMP = 0x01, 0x300
+NLMSGHDR = struct.Struct('=IHHII')          # len, type, flags, seq, pid
+NDMSG = struct.Struct('=BxxxiHBB')          # family, ifindex, state, flags, type
+RTATTR = struct.Struct('=HH')
+NDA_DST, NDA_LLADDR = 1, 2
+NUD_INCOMPLETE, NUD_FAILED, NUD_NOARP = 0x01, 0x20, 0x40
+ATF_COM = 0x02                              # /proc/net/arp: entrada completa
+DISCARD_PORT = 9
+
+_MAC_RE = re.compile(r'([0-9a-fA-F]{2}(?:[:\-][0-9a-fA-F]{2}){5})')
+
+
+def normalize_mac(mac):
+    """'01-23-45-67-89-AB' → '01:23:45:67:89:ab'; None para vazio/zeros/broadcast."""
+    mac = mac.replace('-', ':').lower()
+    if mac in ('00:00:00:00:00:00', 'ff:ff:ff:ff:ff:ff'):
+        return None
+    return mac
+
+
+def read_proc_arp(path='/proc/net/arp'):
+    """{IP: MAC} das entradas completas de /proc/net/arp (só IPv4)."""
+    table = {}
+    try:
+        with open(path) as f:
+            next(f, None)                                   # cabeçalho
+            for line in f:
+                fields = line.split()
+                if len(fields) < 4 or not int(fields[2], 16) & ATF_COM:
+                    continue
+                mac = normalize_mac(fields[3])
+                if mac:
+                    table[fields[0]] = mac
+    except (OSError, ValueError):
+        pass
+    return table
+
+
+def parse_neigh_messages(data):
+    """Mensagens RTM_NEWNEIGH de um buffer netlink → [(IP, MAC, estado)],
+    mais True se o dump terminou (NLMSG_DONE). Levanta OSError em NLMSG_ERROR."""
+    out, done, off = [], False, 0
+    while off + NLMSGHDR.size <= len(data):
+        length, mtype, _, _, _ = NLMSGHDR.unpack_from(data, off)
+        if length < NLMSGHDR.size:
+            break
+        body, end = off + NLMSGHDR.size, off + length
+        if mtype == NLMSG_DONE:
+            done = True
+        elif mtype == NLMSG_ERROR:
+            err = struct.unpack_from('=i', data, body)[0]
+            if err:
+                raise OSError(-err, os.strerror(-err))
+        elif mtype == RTM_NEWNEIGH and end >= body + NDMSG.size:
+            family, _, state, _, _ = NDMSG.unpack_from(data, body)
+            dst = lladdr = None
+            a = body + NDMSG.size
+            while a + RTATTR.size <= end:
+                alen, atype = RTATTR.unpack_from(data, a)
+                if alen < RTATTR.size:
+                    break
+                value = data[a + RTATTR.size:a + alen]
+                if atype == NDA_DST:
+                    dst = value
+                elif atype == NDA_LLADDR:
+                    lladdr = value
+                a += (alen + 3) & ~3
+            if (dst is not None and lladdr is not None and len(lladdr) == 6
+                    and family in (socket.AF_INET, socket.AF_INET6)):
+                mac = normalize_mac(':'.join(f'{b:02x}' for b in lladdr))
+                if mac:
+                    out.append((socket.inet_ntop(family, dst), mac, state))
+        off += (length + 3) & ~3
+    return out, done
+
+
+def netlink_neighbors(family=socket.AF_UNSPEC, timeout=1.0):
+    """{IP: MAC} da tabela de vizinhos do kernel (um dump RTM_GETNEIGH),
+    sem entradas incompletas/falhas nem NOARP (multicast). Levanta OSError
+    se o netlink não existir."""
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+    try:
+        sock.bind((0, 0))
+        req = NDMSG.pack(family, 0, 0, 0, 0)
+        sock.send(NLMSGHDR.pack(NLMSGHDR.size + len(req), RTM_GETNEIGH,
+                                NLM_F_REQUEST | NLM_F_DUMP, 1, 0) + req)
+        table = {}
+        deadline = time.monotonic() + timeout
+        while True:
+            if not select.select([sock], [], [], max(0.0, deadline - time.monotonic()))[0]:
+                raise OSError('netlink: dump de vizinhos sem resposta')
+            entries, done = parse_neigh_messages(sock.recv(1 << 16))
+            for ip, mac, state in entries:
+                if not state & (NUD_INCOMPLETE | NUD_FAILED | NUD_NOARP):
+                    table[ip] = mac
+            if done:
+                return table
+    finally:
+        sock.close()
+
+
+def windows_neighbors():
+    """{IP: MAC} de `arp -a` e `netsh interface ipv6 show neighbors`."""
+    table = {}
+    for cmd in (['arp', '-a'], ['netsh', 'interface', 'ipv6', 'show', 'neighbors']):
+        try:
+            out = subprocess.check_output(cmd, encoding='utf-8', errors='ignore', timeout=5)
+        except (OSError, subprocess.SubprocessError):
+            continue
+        for line in out.splitlines():
+            fields = line.split()
+            m = _MAC_RE.search(line)
+            if len(fields) >= 2 and m:
+                mac = normalize_mac(m.group(1))
+                # Multicast IPv4 (01:00:5e) não é vizinho
+                if mac and not mac.startswith('01:00:5e') and not mac.startswith('33:33'):
+                    table[fields[0]] = mac
+    return table
+
+
+def kernel_neighbors():
+    """Tabela de vizinhos do sistema ({IP: MAC}), pela fonte mais barata disponível."""
+    if sys.platform.startswith('linux'):
+        try:
+            return netlink_neighbors()
+        except OSError:
+            return read_proc_arp()
+    if platform.system().lower() == 'windows':
+        return windows_neighbors()
+    return {}
+
+
+def is_on_link(ip):
+    """False se a rota para `ip` passa por um gateway (Scapy, se disponível);
+    sem tabela de rotas conhecida, True (deixa a sonda decidir)."""
+    try:
+        from scapy.all import conf
+        if ':' in ip:
+            _, _, gw = conf.route6.route(ip)
+            return gw in ('::', None)
+        _, _, gw = conf.route.route(ip)
+        return gw in ('0.0.0.0', None)
+    except Exception:
+        return True
+
+
+def solicit(ip, family=None):
+    """Faz o kernel resolver `ip` (ARP/NDP) enviando um datagrama UDP vazio para
+    a porta discard; a resposta do vizinho entra na tabela do kernel."""
+    family = family or (socket.AF_INET6 if ':' in ip else socket.AF_INET)
+    try:
+        with socket.socket(family, socket.SOCK_DGRAM) as s:
+            s.sendto(b'', (ip, DISCARD_PORT))
+    except OSError:
+        pass
+
+
+class NeighborCache:
+    """Cache IP → MAC com TTL em memória e, com `path`, em disco (JSON).
+
+    `lookup()` consulta memória, disco e a tabela do kernel (relida no máximo a
+    cada `table_ttl` s) e só sonda em falta, se `probe`. `table` e `prober`
+    permitem trocar a fonte da tabela e a sonda (testes). `clock` é o relógio
+    de parede dos TTLs (epoch, para valer também no disco).
+    """
+    def __init__(self, ttl=300.0, negative_ttl=10.0, path=None, probe=True, table_ttl=1.0,
+                 table=kernel_neighbors, prober=solicit, clock=time.time):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.path = path
+        self.probe = probe
+        self.table_ttl = table_ttl
+        self._table = table
+        self._prober = prober
+        self._clock = clock
+        self._entries = {}                 # IP → (MAC ou None, validade)
+        self._table_at = None
+        self._dirty = False
+        self.stats = {'hits': 0, 'table_reads': 0, 'probes': 0}
+        if path:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = self._clock()
+        for ip, (mac, seen) in saved.items():
+            if mac and now - seen < self.ttl:
+                self._entries[ip] = (mac, seen + self.ttl)
+
+    def save(self):
+        """Grava as entradas positivas ainda válidas no cache em disco (atômico)."""
+        if not self.path:
+            return
+        now = self._clock()
+        data = {ip: [mac, expires - self.ttl] for ip, (mac, expires) in self._entries.items()
+                if mac and expires > now}
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+    def _read_table(self, force=False):
+        now = self._clock()
+        if not force and self._table_at is not None and now - self._table_at < self.table_ttl:
+            return
+        self._table_at = now
+        self.stats['table_reads'] += 1
+        for ip, mac in self._table().items():
+            self._entries[ip] = (mac, now + self.ttl)
+            self._dirty = True
+
+    def _cached(self, ip):
+        entry = self._entries.get(ip)
+        if entry is not None and entry[1] > self._clock():
+            return entry
+        return None
+
+    def lookup(self, ip, family=None, timeout=0.5):
+        """MAC (texto 'aa:bb:...') do vizinho `ip`, ou None (também se `ip`
+        não for um endereço IP, ex.: hostname que não resolveu)."""
+        try:
+            addr = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        if addr.is_loopback or addr.is_multicast or addr.is_unspecified:
+            return None
+        ip = str(addr)
+        entry = self._cached(ip)
+        if entry is None:
+            self._read_table()
+            entry = self._cached(ip)
+        if entry is not None:
+            self.stats['hits'] += 1
+            if self._dirty and entry[0] and self.path:
+                self.save()
+            return entry[0]
+        mac = None
+        if self.probe and is_on_link(ip):
+            self.stats['probes'] += 1
+            self._prober(ip, family)
+            deadline = time.monotonic() + timeout
+            while mac is None and time.monotonic() < deadline:
+                time.sleep(0.01)
+                self._read_table(force=True)
+                entry = self._cached(ip)
+                mac = entry[0] if entry else None
+        if mac is None:
+            self._entries[ip] = (None, self._clock() + self.negative_ttl)
+        elif self.path:
+            self.save()
+        return mac
+
+    def lookup_many(self, ips, timeout=0.5):
+        """{IP: MAC ou None}: um dump da tabela para todos, sondas só para os que faltarem."""
+        return {ip: self.lookup(ip, timeout=timeout) for ip in ips}
+
+
+_default = None
+
+
+def default_cache(path=None):
+    """Cache compartilhado do processo; `path` liga (ou troca) o cache em disco."""
+    global _default
+    if _default is None or (path and _default.path != path):
+        _default = NeighborCache(path=path)
+    return _default
+
+
+def lookup(ip, family=None, timeout=0.5, path=None):
+    """Atalho para default_cache(path).lookup(ip, family, timeout)."""
+    return default_cache(path).lookup(ip, family, timeout)
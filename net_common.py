@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+net_common.py
+Auxiliares de rede comuns ao scan_ports.py e ao PacketSend.py, sem Scapy:
+
+  - alvos: IP, hostname, CIDR, intervalos, listas e arquivo de alvos, com a
+    mesma sintaxe nas duas ferramentas (`resolve_targets`);
+  - respostas TCP lidas por bytes (`ether_tcp_segment`, `parse_tcp_reply`),
+    sem dissecar cada quadro com o Scapy;
+  - buffer de recepção grande para capturas abertas o tempo todo (`grow_rcvbuf`).
+"""
+import ipaddress
+import socket
+import struct
+import sys
+
+
+# ---------------------------------------------------------------------------
+# Alvos: múltiplos hosts, CIDR, intervalos e arquivo de alvos
+# ---------------------------------------------------------------------------
+
+MAX_TARGET_HOSTS = 1 << 20      # ~ um /12 IPv4; um /64 IPv6 não cabe na memória
+
+
+def expand_target_spec(spec):
+    """Expande um alvo em uma lista de hosts (strings).
+    Aceita: IP, hostname, CIDR (10.0.0.0/24), intervalo curto (10.0.0.1-50),
+    intervalo completo (10.0.0.1-10.0.0.50) e listas separadas por vírgula.
+    Levanta ValueError para CIDR/intervalo malformado ou se o alvo passar de
+    MAX_TARGET_HOSTS hosts (checado antes de expandir).
+    """
+    out = []
+
+    def _check(item, n):
+        if len(out) + n > MAX_TARGET_HOSTS:
+            raise ValueError(f'Alvo grande demais: {item} ({n} hosts; máximo {MAX_TARGET_HOSTS} por alvo)')
+
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        if '/' in item:
+            net = ipaddress.ip_network(item, strict=False)
+            _check(item, net.num_addresses)
+            out.extend(str(h) for h in net.hosts())
+            continue
+        if '-' in item:
+            first, last = item.rsplit('-', 1)
+            try:
+                start_ip = ipaddress.ip_address(first)
+            except ValueError:
+                out.append(item)  # hostname com hífen (ex.: my-host)
+                continue
+            if last.isdigit() and start_ip.version == 4:
+                prefix = first.rsplit('.', 1)[0]
+                end_ip = ipaddress.ip_address(f'{prefix}.{last}')
+            else:
+                end_ip = ipaddress.ip_address(last)
+            if end_ip.version != start_ip.version or end_ip < start_ip:
+                raise ValueError(f'Intervalo inválido: {item}')
+            _check(item, int(end_ip) - int(start_ip) + 1)
+            out.extend(str(ipaddress.ip_address(i)) for i in range(int(start_ip), int(end_ip) + 1))
+            continue
+        out.append(item)
+    return out
+
+
+def load_targets_file(path):
+    """Lê um arquivo de alvos (um ou mais por linha; '#' inicia comentário)."""
+    specs = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                specs.extend(line.replace(',', ' ').split())
+    return specs
+
+
+def resolve_targets(specs, on_error=None):
+    """Expande e resolve alvos. Retorna lista [(label, ip, family)] sem duplicatas.
+    IPs literais não passam pelo DNS; hostnames usam o primeiro resultado do
+    getaddrinfo (como no modo de um único alvo). Falhas chamam `on_error(spec, exc)`
+    e o alvo é ignorado (sem `on_error`, a exceção é propagada).
+    """
+    hosts = []
+    seen = set()
+    for spec in specs:
+        try:
+            names = expand_target_spec(spec)
+        except ValueError as e:
+            if on_error is None:
+                raise
+            on_error(spec, e)
+            continue
+        for name in names:
+            try:
+                ip = ipaddress.ip_address(name)
+                family = socket.AF_INET6 if ip.version == 6 else socket.AF_INET
+                ip_str = str(ip)
+            except ValueError:
+                try:
+                    addrinfos = socket.getaddrinfo(name, None)
+                    family = addrinfos[0][0]
+                    ip_str = addrinfos[0][4][0]
+                except Exception as e:
+                    if on_error is None:
+                        raise
+                    on_error(name, e)
+                    continue
+            if ip_str not in seen:
+                seen.add(ip_str)
+                hosts.append((name, ip_str, family))
+    return hosts
+
+
+def interleave_targets(hosts, ports):
+    """Gera tarefas (ip, port, family) intercalando hosts a cada porta.
+    Com a janela de tarefas em voo distribuída entre todos os hosts, um host
+    lento/filtrado ocupa no máximo 1/N dos slots e não trava o pool.
+    """
+    for port in ports:
+        for _, ip, family in hosts:
+            yield ip, port, family
+
+
+# ---------------------------------------------------------------------------
+# Captura: respostas TCP por bytes e buffer de recepção
+# ---------------------------------------------------------------------------
+
+def parse_tcp_reply(segment):
+    """Extrai (sport, dport, seq, ack, flags) de um segmento TCP; None se curto demais."""
+    if len(segment) < 14:
+        return None
+    return struct.unpack_from('!HHIIxB', segment)
+
+
+def ether_tcp_segment(frame):
+    """Extrai (família, ip_origem, ip_destino, segmento_tcp) de um quadro Ethernet
+    (com ou sem tag 802.1Q). IPs em bytes (formato inet_pton); None se não for TCP.
+    """
+    off = 12
+    ethertype = struct.unpack_from('!H', frame, off)[0] if len(frame) >= 14 else 0
+    while ethertype in (0x8100, 0x88A8) and len(frame) >= off + 6:
+        off += 4
+        ethertype = struct.unpack_from('!H', frame, off)[0]
+    off += 2
+    if ethertype == 0x0800 and len(frame) >= off + 20:
+        ihl = (frame[off] & 0x0F) * 4
+        if frame[off + 9] != socket.IPPROTO_TCP:
+            return None
+        total = struct.unpack_from('!H', frame, off + 2)[0]
+        return (socket.AF_INET, frame[off + 12:off + 16], frame[off + 16:off + 20],
+                frame[off + ihl:off + max(total, ihl)])
+    if ethertype == 0x86DD and len(frame) >= off + 40:
+        if frame[off + 6] != socket.IPPROTO_TCP:
+            return None
+        plen = struct.unpack_from('!H', frame, off + 4)[0]
+        return (socket.AF_INET6, frame[off + 8:off + 24], frame[off + 24:off + 40],
+                frame[off + 40:off + 40 + plen])
+    return None
+
+
+def grow_rcvbuf(sock, size=16 << 20):
+    """Buffer de recepção grande para absorver rajadas de respostas
+    (SO_RCVBUFFORCE ignora rmem_max como root; senão tenta SO_RCVBUF)."""
+    # O módulo socket não exporta SO_RCVBUFFORCE; no Linux o valor é 33
+    force = getattr(socket, 'SO_RCVBUFFORCE', 33 if sys.platform.startswith('linux') else None)
+    for opt in (force, socket.SO_RCVBUF):
+        if opt is None:
+            continue
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, opt, size)
+            return True
+        except OSError:
+            pass
+    return False
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+packet_templates.py
+Templates de SYN TCP em bytes crus (IPv4/IPv6, com Ethernet opcional).
+
+O pacote é montado uma única vez em um `bytearray`; a cada envio só dport,
+sport, seq (e o IP ID no IPv4) são reescritos no lugar e os checksums são
+ajustados de forma incremental (RFC 1624), sem recalcular o pacote inteiro
+nem montar camadas do Scapy. O Scapy fica só para o setup (MAC, rota) e para
+dissecar respostas.
+
+Usado pelo SYN scan (scan_ports.py) e pelo modo --fast do PacketSend.py.
+"""
+import socket
+import struct
+
+TCP_SYN = 0x02
+ETH_P_IP, ETH_P_IPV6 = 0x0800, 0x86DD
+
+
+def inet_checksum(data):
+    """Checksum da internet (RFC 1071)."""
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF
+
+
+def checksum_adjust(csum, old, new):
+    """Ajuste incremental de checksum quando uma palavra de 16 bits muda de
+    `old` para `new` (RFC 1624, eq. 3: HC' = ~(~HC + ~m + m'))."""
+    total = (~csum & 0xFFFF) + (~old & 0xFFFF) + (new & 0xFFFF)
+    total = (total & 0xFFFF) + (total >> 16)
+    total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF
+
+
+def _tcp_pseudo_header(src_ip, dst_ip, family, length):
+    if family == socket.AF_INET6:
+        return (socket.inet_pton(socket.AF_INET6, src_ip) + socket.inet_pton(socket.AF_INET6, dst_ip)
+                + struct.pack('!I3xB', length, socket.IPPROTO_TCP))
+    return (socket.inet_aton(src_ip) + socket.inet_aton(dst_ip)
+            + struct.pack('!BBH', 0, socket.IPPROTO_TCP, length))
+
+
+def build_syn_segment(src_ip, dst_ip, sport, dport, seq, family=socket.AF_INET, window=1024):
+    """Cabeçalho TCP (20 bytes, flag SYN) com checksum calculado."""
+    tcp = struct.pack('!HHIIBBHHH', sport, dport, seq, 0, 5 << 4, TCP_SYN, window, 0, 0)
+    csum = inet_checksum(_tcp_pseudo_header(src_ip, dst_ip, family, len(tcp)) + tcp)
+    return tcp[:16] + struct.pack('!H', csum) + tcp[18:]
+
+
+def build_ipv4_header(src_ip, dst_ip, payload_len, ident=0, ttl=64):
+    """Cabeçalho IPv4 (20 bytes, protocolo TCP) com checksum."""
+    hdr = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + payload_len, ident, 0, ttl,
+                      socket.IPPROTO_TCP, 0, socket.inet_aton(src_ip), socket.inet_aton(dst_ip))
+    return hdr[:10] + struct.pack('!H', inet_checksum(hdr)) + hdr[12:]
+
+
+def build_ipv6_header(src_ip, dst_ip, payload_len, hop_limit=64):
+    """Cabeçalho IPv6 (40 bytes, next header TCP)."""
+    return (struct.pack('!IHBB', 6 << 28, payload_len, socket.IPPROTO_TCP, hop_limit)
+            + socket.inet_pton(socket.AF_INET6, src_ip) + socket.inet_pton(socket.AF_INET6, dst_ip))
+
+
+def ethernet_header(dst_mac, src_mac, family=socket.AF_INET):
+    """Cabeçalho Ethernet II (14 bytes) para IPv4/IPv6; MACs como 'aa:bb:...'."""
+    def _mac(m):
+        return bytes.fromhex(m.replace(':', '').replace('-', ''))
+    return _mac(dst_mac) + _mac(src_mac) + struct.pack('!H', ETH_P_IPV6 if family == socket.AF_INET6 else ETH_P_IP)
+
+
+def source_address_for(dst_ip, family=socket.AF_INET):
+    """IP local que o kernel usaria para chegar em `dst_ip` (connect UDP, sem tráfego)."""
+    s = socket.socket(family, socket.SOCK_DGRAM)
+    try:
+        s.connect((dst_ip, 9))
+        return s.getsockname()[0]
+    finally:
+        s.close()
+
+
+def open_raw_sender(family=socket.AF_INET):
+    """Raw socket de envio (requer root/CAP_NET_RAW). IPv4: IPPROTO_RAW, o pacote
+    leva o cabeçalho IP; IPv6: IPPROTO_TCP, só o segmento (o kernel monta o IP)."""
+    if family == socket.AF_INET6:
+        return socket.socket(socket.AF_INET6, socket.SOCK_RAW, socket.IPPROTO_TCP)
+    return socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_RAW)
+
+
+class SynTemplate:
+    """SYN pré-montado em um `bytearray`: [link][IP][TCP].
+
+    `ip_header=False` gera só o segmento TCP (raw socket IPv6, transportes L3);
+    `link` é um cabeçalho de enlace já pronto (ex.: `ethernet_header(...)`) para
+    envio em L2. `patch()` reescreve os campos no lugar e devolve o buffer, que
+    pode ir direto para `sendto()`/`send()` — e é reutilizado no próximo patch.
+    """
+    def __init__(self, src_ip, dst_ip, sport=0, dport=0, seq=0, family=socket.AF_INET,
+                 window=1024, ttl=64, ip_header=True, link=b''):
+        self.family = family
+        tcp = build_syn_segment(src_ip, dst_ip, sport, dport, seq, family, window)
+        if not ip_header:
+            ip = b''
+        elif family == socket.AF_INET6:
+            ip = build_ipv6_header(src_ip, dst_ip, len(tcp), ttl)
+        else:
+            ip = build_ipv4_header(src_ip, dst_ip, len(tcp), 0, ttl)
+        self.buf = bytearray(bytes(link) + ip + tcp)
+        self.ip_off = len(link) if ip and family == socket.AF_INET else None
+        self.tcp_off = len(link) + len(ip)
+
+    def _set16(self, off, csum_off, value):
+        old = struct.unpack_from('!H', self.buf, off)[0]
+        struct.pack_into('!H', self.buf, off, value)
+        csum = struct.unpack_from('!H', self.buf, csum_off)[0]
+        struct.pack_into('!H', self.buf, csum_off, checksum_adjust(csum, old, value))
+
+    def patch(self, dport=None, sport=None, seq=None, ident=None):
+        """Atualiza os campos dados (None = mantém) e devolve o buffer."""
+        t = self.tcp_off
+        if sport is not None:
+            self._set16(t, t + 16, sport & 0xFFFF)
+        if dport is not None:
+            self._set16(t + 2, t + 16, dport & 0xFFFF)
+        if seq is not None:
+            self._set16(t + 4, t + 16, (seq >> 16) & 0xFFFF)
+            self._set16(t + 6, t + 16, seq & 0xFFFF)
+        if ident is not None and self.ip_off is not None:
+            self._set16(self.ip_off + 4, self.ip_off + 10, ident & 0xFFFF)
+        return self.buf
+
+    @property
+    def segment(self):
+        """Só o segmento TCP (bytes)."""
+        return bytes(self.buf[self.tcp_off:])
+
+    def __bytes__(self):
+        return bytes(self.buf)
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+pcap_io.py
+Leitura de capturas pcap/pcapng em streaming e escrita de pcap, sem Scapy.
+
+O arquivo é lido em blocos grandes e os registros são fatiados com
+`struct.unpack_from` sobre o bloco: a memória fica constante em capturas de
+vários GB e nenhum pacote é dissecado. Cada registro sai como
+(ts, quadro, tamanho_original, linktype), com o quadro em `memoryview`
+(sem cópia; `bytes(quadro)` quando precisar guardar).
+
+Suporta pcap clássico (µs e ns, as duas ordens de bytes) e pcapng (SHB, IDB
+com if_tsresol, EPB e SPB; os demais blocos são ignorados).
+
+PcapWriter grava pcap clássico (µs) direto de um buffer de quadros (ex.: o
+ring do AF_PACKET), com rotação por tamanho/tempo e só os N últimos arquivos.
+
+Usado pelo --replay do PacketSend.py e pelo --read/--write-pcap do
+verify_capture.py.
+"""
+import glob
+import os
+import re
+import struct
+import time
+
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LOOP = 108
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+
+PCAP_RECORD = struct.Struct('<IIII')        # ts_sec, ts_usec, caplen, origlen
+PCAP_MAGIC = {
+    b'\xd4\xc3\xb2\xa1': ('<', 1e-6),
+    b'\xa1\xb2\xc3\xd4': ('>', 1e-6),
+    b'\x4d\x3c\xb2\xa1': ('<', 1e-9),
+    b'\xa1\xb2\x3c\x4d': ('>', 1e-9),
+}
+PCAPNG_SHB = 0x0A0D0D0A
+PCAPNG_IDB, PCAPNG_SPB, PCAPNG_EPB = 1, 3, 6
+PCAPNG_BYTE_ORDER = 0x1A2B3C4D
+
+ETH_P_IP, ETH_P_IPV6, ETH_P_8021Q, ETH_P_8021AD = 0x0800, 0x86DD, 0x8100, 0x88A8
+
+
+class PcapError(ValueError):
+    """Arquivo que não é pcap/pcapng ou está corrompido."""
+
+
+class PcapReader:
+    """Leitor em streaming de pcap/pcapng; iterável em registros
+    (ts em segundos, quadro em memoryview, tamanho original, linktype).
+
+    `linktype` é o da captura (pcap) ou da primeira interface (pcapng).
+    Um registro truncado no fim (captura interrompida) encerra a leitura.
+    """
+    def __init__(self, path, block_size=1 << 20):
+        self.path = path
+        self.block_size = int(block_size)
+        self._fh = open(path, 'rb')
+        head = self._fh.read(4)
+        self._fh.seek(0)
+        if head in PCAP_MAGIC:
+            self.format = 'pcap'
+            endian, self._tick = PCAP_MAGIC[head]
+            hdr = self._fh.read(24)
+            if len(hdr) < 24:
+                raise PcapError(f'{path}: cabeçalho pcap incompleto')
+            self._endian = endian
+            self.snaplen, self.linktype = struct.unpack_from(endian + 'II', hdr, 16)
+            self.linktype &= 0xFFFF
+        elif len(head) == 4 and struct.unpack('<I', head)[0] == PCAPNG_SHB:
+            self.format = 'pcapng'
+            self._endian = '<'
+            self._interfaces = []
+            self.linktype = None
+            self.snaplen = 0
+        else:
+            self._fh.close()
+            raise PcapError(f'{path}: não é um arquivo pcap/pcapng')
+        self.records = 0
+
+    def __iter__(self):
+        return self._pcap() if self.format == 'pcap' else self._pcapng()
+
+    def _pcap(self):
+        rec = struct.Struct(self._endian + 'IIII')
+        tick = self._tick
+        linktype = self.linktype
+        buf = b''
+        off = 0
+        while True:
+            avail = len(buf) - off
+            if avail >= 16:
+                sec, frac, caplen, origlen = rec.unpack_from(buf, off)
+            if avail < 16 or avail < 16 + caplen:
+                more = self._fh.read(max(self.block_size, 16 + caplen if avail >= 16 else 0))
+                if not more:
+                    return
+                buf = buf[off:] + more
+                off = 0
+                continue
+            start = off + 16
+            off = start + caplen
+            self.records += 1
+            yield sec + frac * tick, memoryview(buf)[start:off], origlen, linktype
+
+    def blocks(self):
+        """Só pcap clássico: percorre o arquivo bloco a bloco e devolve, por
+        bloco, (buffer, inícios, caplens, segundos) dos registros inteiros nele,
+        para contagem vetorizada (NumPy) sem criar um objeto por pacote."""
+        if self.format != 'pcap':
+            raise PcapError('blocks() só existe para pcap clássico')
+        rec = struct.Struct(self._endian + 'IIII')
+        unpack = rec.unpack_from
+        rest = b''
+        while True:
+            more = self._fh.read(self.block_size)
+            if not more:
+                return
+            buf = rest + more if rest else more
+            end = len(buf)
+            off = 0
+            starts, caplens, secs = [], [], []
+            while off + 16 <= end:
+                sec, _, caplen, _ = unpack(buf, off)
+                if off + 16 + caplen > end:
+                    break
+                starts.append(off + 16)
+                caplens.append(caplen)
+                secs.append(sec)
+                off += 16 + caplen
+            rest = buf[off:]
+            self.records += len(starts)
+            yield buf, starts, caplens, secs
+
+    def _pcapng(self):
+        buf = b''
+        off = 0
+        e = self._endian
+        while True:
+            if len(buf) - off < 12:
+                more = self._fh.read(self.block_size)
+                if not more:
+                    return
+                buf = buf[off:] + more
+                off = 0
+                continue
+            btype, blen = struct.unpack_from(e + 'II', buf, off)
+            if btype == PCAPNG_SHB:
+                # A ordem de bytes pode mudar a cada seção
+                magic = struct.unpack_from('<I', buf, off + 8)[0]
+                e = self._endian = '<' if magic == PCAPNG_BYTE_ORDER else '>'
+                blen = struct.unpack_from(e + 'I', buf, off + 4)[0]
+                self._interfaces = []
+            if blen < 12 or blen % 4:
+                raise PcapError(f'{self.path}: bloco pcapng inválido (tamanho {blen})')
+            if len(buf) - off < blen:
+                more = self._fh.read(max(self.block_size, blen))
+                if not more:
+                    return
+                buf = buf[off:] + more
+                off = 0
+                continue
+            body = off + 8
+            end = off + blen - 4
+            off += blen
+            if btype == PCAPNG_IDB:
+                linktype, _, snaplen = struct.unpack_from(e + 'HHI', buf, body)
+                self._interfaces.append((linktype, self._tsresol(buf, body + 8, end, e), snaplen))
+                if self.linktype is None:
+                    self.linktype, self.snaplen = linktype, snaplen
+            elif btype == PCAPNG_EPB:
+                ifid, ts_hi, ts_lo, caplen, origlen = struct.unpack_from(e + 'IIIII', buf, body)
+                linktype, tick, _ = self._interfaces[ifid]
+                data = body + 20
+                self.records += 1
+                yield ((ts_hi << 32) | ts_lo) * tick, memoryview(buf)[data:data + caplen], origlen, linktype
+            elif btype == PCAPNG_SPB and self._interfaces:
+                origlen = struct.unpack_from(e + 'I', buf, body)[0]
+                linktype, _, snaplen = self._interfaces[0]
+                caplen = min(origlen, end - body - 4, snaplen or origlen)
+                self.records += 1
+                yield 0.0, memoryview(buf)[body + 4:body + 4 + caplen], origlen, linktype
+
+    @staticmethod
+    def _tsresol(buf, off, end, e):
+        """Resolução do timestamp (segundos por tick) das opções de um IDB."""
+        while off + 4 <= end:
+            code, length = struct.unpack_from(e + 'HH', buf, off)
+            if code == 0:
+                break
+            if code == 9 and length >= 1:
+                v = buf[off + 4]
+                return 2.0 ** -(v & 0x7F) if v & 0x80 else 10.0 ** -v
+            off += 4 + (length + 3) // 4 * 4
+        return 1e-6
+
+    def close(self):
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def ip_offset(frame, linktype):
+    """(offset do cabeçalho IP no quadro, versão 4/6) ou None se não for IP.
+    Ethernet (com tags 802.1Q/802.1ad), Linux SLL, NULL/LOOP e IP cru."""
+    n = len(frame)
+    if linktype == LINKTYPE_ETHERNET:
+        off = 12
+        if n < 14:
+            return None
+        ethertype = (frame[12] << 8) | frame[13]
+        while ethertype in (ETH_P_8021Q, ETH_P_8021AD) and n >= off + 6:
+            off += 4
+            ethertype = (frame[off] << 8) | frame[off + 1]
+        off += 2
+    elif linktype == LINKTYPE_LINUX_SLL:
+        if n < 16:
+            return None
+        ethertype, off = (frame[14] << 8) | frame[15], 16
+    elif linktype in (LINKTYPE_NULL, LINKTYPE_LOOP):
+        off = 4
+        ethertype = None
+    elif linktype in (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6):
+        off = 0
+        ethertype = None
+    else:
+        return None
+    if n <= off:
+        return None
+    version = frame[off] >> 4
+    if ethertype is not None and ethertype not in (ETH_P_IP, ETH_P_IPV6):
+        return None
+    if version == 4 and n >= off + 20:
+        return off, 4
+    if version == 6 and n >= off + 40:
+        return off, 6
+    return None
+
+
+def segment_path(path, n):
+    """Caminho do n-ésimo arquivo rotacionado de `path` (n >= 1): a.pcap → a.n.pcap."""
+    root, ext = os.path.splitext(path)
+    return f'{root}.{n}{ext}'
+
+
+def segment_paths(path):
+    """Arquivos rotacionados de `path` em ordem cronológica, depois o ativo."""
+    root, ext = os.path.splitext(path)
+    pattern = re.compile(re.escape(root) + r'\.(\d+)' + re.escape(ext) + '$')
+    rotated = []
+    for p in glob.glob(glob.escape(root) + '.*' + glob.escape(ext)):
+        m = pattern.match(p)
+        if m:
+            rotated.append((int(m.group(1)), p))
+    return [p for _, p in sorted(rotated)] + ([path] if os.path.exists(path) else [])
+
+
+class PcapWriter:
+    """Escritor de pcap clássico (µs, little-endian) bufferizado.
+
+    `write(buf, off, caplen, origlen, ts)` copia o cabeçalho do registro e o
+    quadro `buf[off:off + caplen]` direto para um bytearray pré-alocado (sem
+    bytes intermediários; `buf` pode ser o memoryview do ring) e só chama o
+    sistema quando o buffer enche ou em `poll()` após `flush_ms`.
+
+    Rotação como nos logs do send_log: o arquivo ativo é sempre `path` e os
+    anteriores viram `a.1.pcap`, `a.2.pcap`... ao passar de `max_bytes` ou
+    quando o timestamp de um quadro passa de `max_seconds` desde a abertura.
+    `keep` > 0 apaga os mais antigos e mantém só os `keep` últimos (ring de
+    arquivos, contando o ativo). Rotacionados de uma execução anterior são
+    apagados na abertura.
+    """
+    def __init__(self, path, linktype=LINKTYPE_ETHERNET, snaplen=262144, max_bytes=0,
+                 max_seconds=0, keep=0, buffer_size=4 << 20, flush_ms=500):
+        self.path = path
+        self.linktype = linktype
+        self.snaplen = snaplen
+        self.max_bytes = int(max_bytes or 0)
+        self.max_seconds = float(max_seconds or 0)
+        self.keep = int(keep or 0)
+        self.flush_interval = max(0.0, flush_ms / 1000.0)
+        self.packets = 0
+        self.segments = 0
+        self.deleted = 0
+        self._buf = bytearray(max(int(buffer_size), 64 << 10))
+        self._view = memoryview(self._buf)
+        self._pos = 0
+        self._last_flush = time.monotonic()
+        for old in segment_paths(path):
+            if old != path:
+                os.remove(old)
+        self._open()
+
+    def _open(self):
+        self._fh = open(self.path, 'wb')
+        self._fh.write(struct.pack('<IHHiIII', 0xA1B2C3D4, 2, 4, 0, 0, self.snaplen, self.linktype))
+        self._size = 24
+        # -inf: o primeiro quadro do arquivo passa pelo caminho lento e fixa o prazo
+        self._deadline = float('-inf') if self.max_seconds else float('inf')
+        self._update_room()
+
+    def _update_room(self):
+        """Até onde o buffer pode encher sem flush nem rotação por tamanho."""
+        room = len(self._buf)
+        if self.max_bytes:
+            room = min(room, self.max_bytes - self._size)
+        self._room = room
+
+    def write(self, buf, off, caplen, origlen, ts):
+        """Adiciona um quadro (ts em segundos epoch). Caminho comum: uma
+        comparação, um pack_into e uma cópia de fatia."""
+        pos = self._pos
+        end = pos + 16 + caplen
+        if end > self._room or ts >= self._deadline or caplen > self.snaplen:
+            self._write_slow(buf, off, caplen, origlen, ts)
+            return
+        us = int(ts * 1e6 + 0.5)
+        PCAP_RECORD.pack_into(self._buf, pos, us // 1000000, us % 1000000, caplen, origlen)
+        self._view[pos + 16:end] = buf[off:off + caplen]
+        self._pos = end
+        self.packets += 1
+
+    def _write_slow(self, buf, off, caplen, origlen, ts):
+        """Rotação por tempo/tamanho, flush e quadros maiores que o buffer."""
+        if ts >= self._deadline:
+            if self._deadline != float('-inf'):
+                self.rotate()
+            self._deadline = ts + self.max_seconds
+        caplen = min(caplen, self.snaplen)
+        need = 16 + caplen
+        if self.max_bytes and self._size + self._pos + need > self.max_bytes and self._size + self._pos > 24:
+            self.rotate()
+            self._deadline = ts + self.max_seconds if self.max_seconds else float('inf')
+        if self._pos + need > len(self._buf):
+            self.flush()
+        us = int(ts * 1e6 + 0.5)
+        record = PCAP_RECORD.pack(us // 1000000, us % 1000000, caplen, origlen)
+        if need > len(self._buf):       # quadro maior que o buffer inteiro: direto
+            self._fh.write(record)
+            self._fh.write(buf[off:off + caplen])
+            self._size += need
+        else:
+            pos = self._pos
+            self._view[pos:pos + 16] = record
+            self._view[pos + 16:pos + need] = buf[off:off + caplen]
+            self._pos = pos + need
+        self.packets += 1
+        self._update_room()
+
+    def poll(self):
+        """Grava o buffer se passou `flush_ms` desde a última escrita (chamar
+        do laço de captura, fora do caminho por quadro)."""
+        if self._pos and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self._pos:
+            self._fh.write(self._view[:self._pos])
+            self._size += self._pos
+            self._pos = 0
+        self._fh.flush()
+        self._last_flush = time.monotonic()
+        self._update_room()
+
+    def rotate(self):
+        """Fecha o arquivo ativo como o próximo segmento e abre um novo."""
+        self.flush()
+        self._fh.close()
+        self.segments += 1
+        os.replace(self.path, segment_path(self.path, self.segments))
+        if self.keep:
+            old = self.segments - self.keep + 1        # o ativo conta como um dos `keep`
+            if old >= 1 and os.path.exists(segment_path(self.path, old)):
+                os.remove(segment_path(self.path, old))
+                self.deleted += 1
+        self._open()
+
+    def files(self):
+        """Arquivos desta gravação ainda no disco, do mais antigo ao ativo."""
+        return segment_paths(self.path)
+
+    def close(self):
+        if self._fh.closed:
+            return
+        self.flush()
+        self._fh.close()
+        self._view.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
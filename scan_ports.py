@@ -17,16 +17,32 @@ import socket
 import argparse
 import sys
 import random
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import json
 import time
-import subprocess
 import platform
-import re
 import csv
 import io
 import ipaddress
 import threading
+import asyncio
+import multiprocessing
+import queue
+import hashlib
+import select
+import os
+import functools
+import collections
+import itertools
+import selectors
+import errno
+import heapq
+import math
+
+import neighbor_cache
+from packet_templates import SynTemplate, source_address_for, open_raw_sender
+from net_common import (load_targets_file, resolve_targets, interleave_targets, grow_rcvbuf,
+                        parse_tcp_reply, ether_tcp_segment)
 
 # Optional color support
 try:
@@ -56,30 +72,179 @@ class TokenBucket:
         self._tokens = float(self.capacity)
         self._last = time.monotonic()
 
-    def consume(self, tokens=1):
+    def try_consume(self, tokens=1):
+        """Tenta consumir `tokens` sem bloquear.
+        Retorna 0.0 se consumiu, senão os segundos estimados até haver tokens suficientes.
+        """
         tokens = float(tokens)
+        now = time.monotonic()
+        elapsed = now - self._last
+        # refill
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._last = now
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return 0.0
+        return (tokens - self._tokens) / max(self.rate, 1e-6)
+
+    def consume(self, tokens=1):
         while True:
-            now = time.monotonic()
-            elapsed = now - self._last
-            # refill
-            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
-            self._last = now
-            if self._tokens >= tokens:
-                self._tokens -= tokens
+            to_wait = self.try_consume(tokens)
+            if to_wait <= 0:
                 return True
             # sleep a tiny bit to wait for tokens
-            to_wait = (tokens - self._tokens) / max(self.rate, 1e-6)
             time.sleep(min(0.1, max(0.001, to_wait)))
 
+    async def consume_async(self, tokens=1):
+        """Versão para asyncio de `consume()` (não bloqueia o event loop)."""
+        while True:
+            to_wait = self.try_consume(tokens)
+            if to_wait <= 0:
+                return True
+            await asyncio.sleep(min(0.1, max(0.001, to_wait)))
+
+
+class RttEstimator:
+    """Estimativa de RTT por alvo (srtt/rttvar, RFC 6298 — o mesmo esquema do nmap).
+    Amostras vêm de respostas reais (SYN-ACK/RST ou connect concluído/recusado);
+    timeouts nunca entram. Com `adaptive`, `timeout(host)` = srtt + 4·rttvar
+    limitado a [min_timeout, max_timeout] (sem amostras vale `initial`); sem
+    `adaptive` o timeout fica fixo e a estimativa serve só para o relatório.
+    Thread-safe.
+    """
+    ALPHA, BETA = 1 / 8, 1 / 4
+
+    def __init__(self, initial, adaptive=True, min_timeout=0.1, max_timeout=10.0):
+        self.initial = float(initial)
+        self.adaptive = adaptive
+        self.min_timeout = min(float(min_timeout), self.initial)
+        self.max_timeout = max(float(max_timeout), self.initial)
+        self._hosts = {}         # host -> [srtt, rttvar, amostras]
+        self._lock = threading.Lock()
+
+    def observe(self, host, rtt):
+        if rtt < 0:
+            return
+        with self._lock:
+            st = self._hosts.get(host)
+            if st is None:
+                self._hosts[host] = [rtt, rtt / 2, 1]
+                return
+            st[1] = (1 - self.BETA) * st[1] + self.BETA * abs(st[0] - rtt)
+            st[0] = (1 - self.ALPHA) * st[0] + self.ALPHA * rtt
+            st[2] += 1
+
+    def timeout(self, host):
+        if not self.adaptive:
+            return self.initial
+        st = self._hosts.get(host)
+        if st is None:
+            return self.initial
+        return min(self.max_timeout, max(self.min_timeout, st[0] + 4 * st[1]))
+
+    def stats(self, host):
+        """{'srtt', 'rttvar', 'timeout', 'samples'} em segundos; None sem amostras."""
+        st = self._hosts.get(host)
+        if st is None:
+            return None
+        return {'srtt': st[0], 'rttvar': st[1], 'timeout': self.timeout(host), 'samples': st[2]}
+
+    def snapshot(self):
+        with self._lock:
+            return {h: tuple(st) for h, st in self._hosts.items()}
+
+    def merge(self, snapshot):
+        """Combina estimativas de outro processo (média ponderada pelas amostras)."""
+        with self._lock:
+            for host, (srtt, rttvar, n) in snapshot.items():
+                st = self._hosts.get(host)
+                if st is None:
+                    self._hosts[host] = [srtt, rttvar, n]
+                    continue
+                total = st[2] + n
+                st[0] = (st[0] * st[2] + srtt * n) / total
+                st[1] = (st[1] * st[2] + rttvar * n) / total
+                st[2] = total
+
+
+class AimdController:
+    """Controle de congestionamento AIMD para o SYN scan (tamanho do lote e pps).
+    A cada janela/lote concluído, `update(sent, answered, send_rate)` compara a
+    taxa de resposta com uma referência (a melhor recente, que decai devagar):
+    queda maior que `tolerance` é tratada como perda → lote e pps caem pela
+    metade; senão o lote cresce `batch_step` e o pps `rate_step` (10% da taxa
+    no último corte). `rate` None = sem limite até a primeira perda (então parte
+    da taxa de envio medida). `min_rate`/`max_rate` limitam o pps.
+    """
+    def __init__(self, batch=500, min_batch=50, max_batch=4000, min_rate=0.0, max_rate=None,
+                 tolerance=0.1, batch_step=None):
+        self.min_batch = max(1, int(min_batch))
+        self.max_batch = max(self.min_batch, int(max_batch))
+        self.batch = min(self.max_batch, max(self.min_batch, int(batch)))
+        self.batch_step = int(batch_step or max(1, self.batch // 10))
+        self.min_rate = float(min_rate or 0.0)
+        self.max_rate = float(max_rate) if max_rate else None
+        self.rate = self.max_rate
+        self.rate_step = None
+        self.tolerance = float(tolerance)
+        self.reference = None    # taxa de resposta de referência
+        self.windows = 0
+        self.decreases = 0
+
+    def update(self, sent, answered, send_rate=None):
+        if sent <= 0:
+            return
+        ratio = answered / sent
+        self.windows += 1
+        if self.reference is None or ratio >= self.reference:
+            self.reference = ratio
+        elif ratio < self.reference * (1 - self.tolerance):
+            # Perda: decréscimo multiplicativo
+            self.decreases += 1
+            base = self.rate or send_rate
+            if base:
+                self.rate = max(self.min_rate, base / 2)
+                self.rate_step = max(1.0, self.rate * 0.1)
+            self.batch = max(self.min_batch, self.batch // 2)
+            # A referência decai: uma faixa de portas filtradas não trava a taxa para sempre
+            self.reference = 0.9 * self.reference + 0.1 * ratio
+            return
+        else:
+            self.reference = 0.9 * self.reference + 0.1 * ratio
+        # Sem perda: acréscimo aditivo
+        self.batch = min(self.max_batch, self.batch + self.batch_step)
+        if self.rate is not None and self.rate_step:
+            self.rate += self.rate_step
+            if self.max_rate:
+                self.rate = min(self.rate, self.max_rate)
+
+    def summary(self):
+        return {'windows': self.windows, 'decreases': self.decreases, 'batch': self.batch,
+                'rate': round(self.rate, 1) if self.rate else None}
+
+
+def format_rtt(stats):
+    """Linha de relatório da estimativa de RTT de um host."""
+    return (f'RTT estimado: {stats["srtt"] * 1000:.1f} ms (±{stats["rttvar"] * 1000:.1f} ms), '
+            f'timeout {stats["timeout"] * 1000:.0f} ms, {stats["samples"]} amostra(s)')
+
 
-# Nota: Com o modelo de batching no SYN scan, o Semaphore não é mais necessário.
-# O sr() no Scapy usa uma única captura por lote, eliminando a pressão no Npcap.
+# Nota: Com o SYN scan em pipeline, o Semaphore não é mais necessário.
+# Uma única captura fica aberta o scan inteiro (não uma por lote nem por
+# porta), eliminando a pressão no Npcap.
 
+# Folga sobre o timeout de um lote: passado `timeout + SYN_BATCH_GRACE` do
+# envio, o lote sai da janela mesmo que a captura nunca tenha visto os SYNs
+# saírem ou continue ocupada com outro tráfego.
+SYN_BATCH_GRACE = 1.0
 
+
+@functools.lru_cache(maxsize=None)
 def get_service_name(port):
     """Obtém o nome do serviço para uma porta TCP.
     Usa socket.getservbyport (banco de dados do SO - mais completo que listas).
-    Retorna 'unknown' se não encontrado.
+    Retorna 'unknown' se não encontrado. Cacheado: getservbyport relê o
+    /etc/services a cada chamada e vira gargalo em scans de 65535 portas.
     """
     try:
         return socket.getservbyport(port, 'tcp')
@@ -110,13 +275,21 @@ def scan_port(host, port, timeout, family=socket.AF_INET):
         return port, 'error'
 
 
-def scan_port_with_retries(host, port, timeout, family=socket.AF_INET, max_retries=0, backoff=0.5):
+def scan_port_with_retries(host, port, timeout, family=socket.AF_INET, max_retries=0, backoff=0.5, rtt=None):
     """Wrapper around scan_port that retries on non-open results with exponential backoff.
     `max_retries` is the number of additional attempts (0 = no retry).
+    With an `RttEstimator` (`rtt`), each attempt uses its live timeout and
+    feeds back the latency of answered connects (open/closed).
     """
     attempts = max(1, int(max_retries) + 1)
     for attempt in range(attempts):
-        p, status = scan_port(host, port, timeout, family)
+        if rtt is None:
+            p, status = scan_port(host, port, timeout, family)
+        else:
+            started = time.monotonic()
+            p, status = scan_port(host, port, rtt.timeout(host), family)
+            if status in ('open', 'closed'):
+                rtt.observe(host, time.monotonic() - started)
         if status == 'open' or attempt == attempts - 1:
             return p, status
         # Exponential backoff with slight jitter
@@ -125,6 +298,554 @@ def scan_port_with_retries(host, port, timeout, family=socket.AF_INET, max_retri
     return port, 'error'
 
 
+def _single_host(host, ports, family, on_result):
+    """Adapta uma varredura de um único host para os engines multi-host:
+    gera as tarefas (host, port, family) e o callback (host, port, status)."""
+    tasks = ((host, p, family) for p in ports)
+    callback = (lambda h, p, status: on_result(p, status)) if on_result else None
+    return tasks, callback
+
+
+def scan_targets_threaded(tasks, timeout, workers=200, max_retries=0, backoff=0.5,
+                          rate_limit=0.0, rate=0.0, on_result=None, window=None, rtt=None):
+    """Connect scan com ThreadPoolExecutor em pipeline produtor/consumidor.
+    As tarefas (host, port, family) são lidas sob demanda de `tasks` e no máximo
+    `window` (default 2x workers) futures ficam em voo; os resultados são
+    entregues a `on_result(host, port, status)` assim que ficam prontos, então a
+    memória das tarefas é O(workers) independente do tamanho do intervalo.
+    `rate_limit` (tentativas/s) e `rate` (delay entre submissões) nunca bloqueiam
+    o consumo: enquanto espera tokens, a thread continua drenando resultados.
+    Com `rtt` (RttEstimator) o timeout de cada tentativa vem da estimativa do host.
+    Retorna dict {(host, port): status}.
+    """
+    window = max(1, int(window or 2 * workers))
+    tb = TokenBucket(rate_limit, capacity=max(1, workers)) if rate_limit and rate_limit > 0 else None
+    rtt_opt = {'rtt': rtt} if rtt is not None else {}
+    task_iter = iter(tasks)
+    pending = {}
+    statuses = {}
+    held = None              # tarefa já lida do iterador, aguardando token
+    exhausted = False
+    next_submit = 0.0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            # 1. Produtor: completa a janela sem bloquear
+            throttle = 0.0
+            while len(pending) < window:
+                if held is None:
+                    held = next(task_iter, None)
+                    if held is None:
+                        exhausted = True
+                        break
+                now = time.monotonic()
+                if rate > 0 and now < next_submit:
+                    throttle = next_submit - now
+                    break
+                if tb:
+                    throttle = tb.try_consume()
+                    if throttle > 0:
+                        break
+                host, port, family = held
+                future = executor.submit(scan_port_with_retries, host, port, timeout,
+                                         family, max_retries, backoff, **rtt_opt)
+                pending[future] = (host, port)
+                held = None
+                if rate > 0:
+                    next_submit = time.monotonic() + rate
+
+            if not pending:
+                if exhausted:
+                    break
+                time.sleep(min(0.1, max(0.001, throttle)))
+                continue
+
+            # 2. Consumidor: drena o que terminou (acorda a tempo do próximo token)
+            done, _ = wait(pending, timeout=throttle if throttle > 0 else None,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                host, port = pending.pop(future)
+                try:
+                    port, status = future.result()
+                except Exception:
+                    status = 'error'
+                statuses[(host, port)] = status
+                if on_result:
+                    on_result(host, port, status)
+    return statuses
+
+
+def scan_ports_threaded(host, ports, timeout, family=socket.AF_INET, workers=200, max_retries=0,
+                        backoff=0.5, rate_limit=0.0, rate=0.0, on_result=None, window=None, rtt=None):
+    """`scan_targets_threaded` para um único host. `on_result(port, status)`; retorna {port: status}."""
+    tasks, callback = _single_host(host, ports, family, on_result)
+    statuses = scan_targets_threaded(tasks, timeout, workers, max_retries, backoff,
+                                     rate_limit, rate, callback, window, rtt)
+    return {p: status for (_, p), status in statuses.items()}
+
+
+# ---------------------------------------------------------------------------
+# Engine asyncio (connect scan em uma única thread)
+# ---------------------------------------------------------------------------
+
+async def scan_port_async(host, port, timeout, family=socket.AF_INET):
+    """Equivalente assíncrono de `scan_port` usando `loop.sock_connect`.
+    Retorna (port, status) com os mesmos estados: open/closed/filtered/error.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        s = socket.socket(family, socket.SOCK_STREAM)
+    except Exception:
+        return port, 'error'
+    s.setblocking(False)
+    addr = (host, port, 0, 0) if family == socket.AF_INET6 else (host, port)
+    try:
+        await asyncio.wait_for(loop.sock_connect(s, addr), timeout)
+        return port, 'open'
+    except ConnectionRefusedError:
+        return port, 'closed'
+    except asyncio.TimeoutError:
+        return port, 'filtered'
+    except Exception:
+        return port, 'error'
+    finally:
+        s.close()
+
+
+async def scan_port_async_with_retries(host, port, timeout, family=socket.AF_INET, max_retries=0, backoff=0.5,
+                                       rtt=None):
+    """Versão assíncrona de `scan_port_with_retries` (mesmo backoff exponencial com jitter e `rtt`)."""
+    attempts = max(1, int(max_retries) + 1)
+    for attempt in range(attempts):
+        if rtt is None:
+            p, status = await scan_port_async(host, port, timeout, family)
+        else:
+            started = time.monotonic()
+            p, status = await scan_port_async(host, port, rtt.timeout(host), family)
+            if status in ('open', 'closed'):
+                rtt.observe(host, time.monotonic() - started)
+        if status == 'open' or attempt == attempts - 1:
+            return p, status
+        wait = backoff * (2 ** attempt) * (0.8 + random.random() * 0.4)
+        await asyncio.sleep(min(wait, 5))
+    return port, 'error'
+
+
+async def _scan_targets_asyncio(tasks, timeout, concurrency, max_retries, backoff, rate_limit, on_result, rtt=None):
+    # Um conjunto fixo de `concurrency` corrotinas consome o mesmo iterador de tarefas:
+    # no máximo `concurrency` conexões em voo e nenhuma Task criada por porta.
+    task_iter = iter(tasks)
+    tb = TokenBucket(rate_limit, capacity=max(1, concurrency)) if rate_limit and rate_limit > 0 else None
+
+    async def worker():
+        for host, port, family in task_iter:
+            if tb:
+                await tb.consume_async()
+            _, status = await scan_port_async_with_retries(host, port, timeout, family, max_retries, backoff, rtt)
+            on_result(host, port, status)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+
+
+def scan_targets_asyncio(tasks, timeout, concurrency=1000, max_retries=0, backoff=0.5,
+                         rate_limit=0.0, on_result=None, rtt=None):
+    """Connect scan com asyncio: milhares de conexões simultâneas em uma única thread.
+    `tasks` gera (host, port, family); `on_result(host, port, status)` é chamado a
+    cada porta concluída (na thread do event loop). Retorna dict {(host, port): status}.
+    """
+    statuses = {}
+
+    def _collect(host, port, status):
+        statuses[(host, port)] = status
+        if on_result:
+            on_result(host, port, status)
+
+    asyncio.run(_scan_targets_asyncio(tasks, timeout, concurrency, max_retries,
+                                      backoff, rate_limit, _collect, rtt))
+    return statuses
+
+
+def scan_ports_asyncio(host, ports, timeout, family=socket.AF_INET, concurrency=1000,
+                       max_retries=0, backoff=0.5, rate_limit=0.0, on_result=None, rtt=None):
+    """`scan_targets_asyncio` para um único host. `on_result(port, status)`; retorna {port: status}."""
+    if hasattr(ports, '__len__'):
+        concurrency = max(1, min(concurrency, len(ports)))
+    tasks, callback = _single_host(host, ports, family, on_result)
+    statuses = scan_targets_asyncio(tasks, timeout, concurrency, max_retries, backoff,
+                                    rate_limit, callback, rtt)
+    return {p: status for (_, p), status in statuses.items()}
+
+
+# ---------------------------------------------------------------------------
+# Engine epoll/selectors (connect não bloqueante, 1 thread, orçamento fixo de fds)
+# ---------------------------------------------------------------------------
+
+# Códigos de connect_ex() que significam "conexão em andamento"
+_CONNECT_IN_PROGRESS = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY, 10035}  # 10035 = WSAEWOULDBLOCK
+_CONNECT_REFUSED = {errno.ECONNREFUSED, 10061}  # 10061 = WSAECONNREFUSED
+
+
+def classify_connect_errno(err):
+    """Traduz o SO_ERROR de um connect() para os estados de `scan_port`."""
+    if err == 0:
+        return 'open'
+    if err in _CONNECT_REFUSED:
+        return 'closed'
+    if err in (errno.ETIMEDOUT, 10060):  # 10060 = WSAETIMEDOUT
+        return 'filtered'
+    return 'error'
+
+
+class DeadlineWheel:
+    """Timing wheel (hashed) para deadlines de socket sem uma thread/timer por porta.
+    `schedule(key, deadline)` agenda; `expire(now)` devolve as chaves vencidas.
+    Cancelamento é preguiçoso: quem consome ignora chaves que já foram resolvidas.
+    """
+    def __init__(self, tick=0.01, slots=1024, now=None):
+        self.tick = float(tick)
+        self._slots = [[] for _ in range(int(slots))]
+        self._current = int((time.monotonic() if now is None else now) / self.tick)
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def schedule(self, key, deadline):
+        # Arredonda para cima: um deadline nunca vence antes da hora
+        t = max(math.ceil(deadline / self.tick), self._current)
+        self._slots[t % len(self._slots)].append((t, key))
+        self._count += 1
+
+    def expire(self, now):
+        target = int(now / self.tick)
+        expired = []
+        if target < self._current:
+            return expired
+        n = len(self._slots)
+        for t in range(self._current, min(target, self._current + n - 1) + 1):
+            slot = self._slots[t % n]
+            if not slot:
+                continue
+            keep = []
+            for item in slot:
+                (expired if item[0] <= target else keep).append(item)
+            self._slots[t % n] = keep
+        self._current = target + 1
+        self._count -= len(expired)
+        expired.sort()
+        return [key for _, key in expired]
+
+    def next_deadline(self, now):
+        """Estimativa (em segundos) até o próximo tick com itens; None se vazio."""
+        if not self._count:
+            return None
+        n = len(self._slots)
+        for i in range(n):
+            if self._slots[(self._current + i) % n]:
+                return max(0.0, (self._current + i) * self.tick - now)
+        return None
+
+
+def fd_budget(wanted):
+    """Ajusta o número de sockets simultâneos ao limite de descritores do processo.
+    No Unix tenta elevar RLIMIT_NOFILE (soft) até o hard limit; no Windows o
+    select() aceita no máximo 512 sockets.
+    """
+    wanted = max(1, int(wanted))
+    if platform.system().lower() == 'windows':
+        return min(wanted, 500)
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        need = wanted + 64
+        if soft != resource.RLIM_INFINITY and soft < need:
+            new_soft = need if hard == resource.RLIM_INFINITY else min(need, hard)
+            try:
+                resource.setrlimit(resource.RLIMIT_NOFILE, (new_soft, hard))
+                soft = new_soft
+            except (ValueError, OSError):
+                pass
+        if soft != resource.RLIM_INFINITY:
+            return max(1, min(wanted, soft - 64))
+    except Exception:
+        pass
+    return wanted
+
+
+def scan_targets_epoll(tasks, timeout, concurrency=1000, max_retries=0, backoff=0.5,
+                       rate_limit=0.0, on_result=None, rtt=None):
+    """Connect scan não bloqueante com `selectors` (epoll no Linux, kqueue no BSD/macOS).
+    Até `concurrency` connect() em voo; cada socket é classificado pelo SO_ERROR
+    (ECONNREFUSED → closed, deadline vencido → filtered). `--timeout` é aplicado
+    pela DeadlineWheel, sem thread por porta (com `rtt`, o deadline de cada
+    connect vem da estimativa do host). `tasks` gera (host, port, family);
+    `on_result(host, port, status)`. Retorna dict {(host, port): status}.
+    """
+    concurrency = fd_budget(concurrency)
+    sel = selectors.DefaultSelector()
+    wheel = DeadlineWheel(tick=min(0.01, max(timeout / 10.0, 0.001)))
+    tb = TokenBucket(rate_limit, capacity=max(1, concurrency)) if rate_limit and rate_limit > 0 else None
+    task_iter = iter(tasks)
+    retry_heap = []          # (pronto_em, tarefa, tentativa)
+    inflight = {}            # token -> (socket, tarefa, tentativa, início)
+    statuses = {}
+    exhausted = False
+    next_token = 0           # chave única por connect (fds são reutilizados pelo SO)
+
+    def _finish(task, attempt, status):
+        if status != 'open' and attempt < max_retries:
+            wait = backoff * (2 ** attempt) * (0.8 + random.random() * 0.4)
+            heapq.heappush(retry_heap, (time.monotonic() + min(wait, 5), task, attempt + 1))
+            return
+        host, port, _ = task
+        statuses[(host, port)] = status
+        if on_result:
+            on_result(host, port, status)
+
+    def _close(token):
+        s, task, attempt, _ = inflight.pop(token)
+        try:
+            sel.unregister(s)
+        except Exception:
+            pass
+        s.close()
+        return task, attempt
+
+    def _launch(task, attempt):
+        nonlocal next_token
+        host, port, family = task
+        try:
+            s = socket.socket(family, socket.SOCK_STREAM)
+        except Exception:
+            _finish(task, attempt, 'error')
+            return
+        s.setblocking(False)
+        addr = (host, port, 0, 0) if family == socket.AF_INET6 else (host, port)
+        try:
+            err = s.connect_ex(addr)
+        except Exception:
+            s.close()
+            _finish(task, attempt, 'error')
+            return
+        if err in _CONNECT_IN_PROGRESS:
+            next_token += 1
+            started = time.monotonic()
+            inflight[next_token] = (s, task, attempt, started)
+            sel.register(s, selectors.EVENT_WRITE, next_token)
+            wheel.schedule(next_token, started + (rtt.timeout(host) if rtt else timeout))
+            return
+        s.close()
+        _finish(task, attempt, classify_connect_errno(err))
+
+    try:
+        while True:
+            now = time.monotonic()
+            # 1. Preenche a janela de conexões (retries prontos primeiro)
+            throttle = None
+            while len(inflight) < concurrency:
+                if retry_heap and retry_heap[0][0] <= now:
+                    _, task, attempt = heapq.heappop(retry_heap)
+                elif not exhausted:
+                    task = next(task_iter, None)
+                    if task is None:
+                        exhausted = True
+                        continue
+                    attempt = 0
+                else:
+                    break
+                if tb:
+                    throttle = tb.try_consume()
+                    if throttle > 0:
+                        heapq.heappush(retry_heap, (now + throttle, task, attempt))
+                        break
+                _launch(task, attempt)
+
+            if not inflight and exhausted and not retry_heap:
+                break
+
+            # 2. Espera eventos até o próximo deadline / retry / token
+            waits = [w for w in (wheel.next_deadline(now), throttle) if w is not None]
+            if retry_heap:
+                waits.append(max(0.0, retry_heap[0][0] - now))
+            wait = min(waits) if waits else timeout
+            if inflight:
+                events = sel.select(wait)
+            else:
+                time.sleep(wait)
+                events = []
+            for key, _ in events:
+                token = key.data
+                if token not in inflight:
+                    continue
+                s, _, _, started = inflight[token]
+                try:
+                    err = s.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                except OSError as e:
+                    err = e.errno or -1
+                task, attempt = _close(token)
+                status = classify_connect_errno(err)
+                if rtt and status in ('open', 'closed'):
+                    rtt.observe(task[0], time.monotonic() - started)
+                _finish(task, attempt, status)
+
+            # 3. Deadlines vencidos → filtered
+            for token in wheel.expire(time.monotonic()):
+                if token in inflight:
+                    task, attempt = _close(token)
+                    _finish(task, attempt, 'filtered')
+    finally:
+        for token in list(inflight):
+            _close(token)
+        sel.close()
+    return statuses
+
+
+def scan_ports_epoll(host, ports, timeout, family=socket.AF_INET, concurrency=1000,
+                     max_retries=0, backoff=0.5, rate_limit=0.0, on_result=None, rtt=None):
+    """`scan_targets_epoll` para um único host. `on_result(port, status)`; retorna {port: status}."""
+    tasks, callback = _single_host(host, ports, family, on_result)
+    statuses = scan_targets_epoll(tasks, timeout, concurrency, max_retries, backoff,
+                                  rate_limit, callback, rtt)
+    return {p: status for (_, p), status in statuses.items()}
+
+
+# ---------------------------------------------------------------------------
+# Dispatcher de engines + modo multi-processo (--processes N)
+# ---------------------------------------------------------------------------
+
+def run_connect_engine(engine, tasks, timeout, workers=200, concurrency=1000, max_retries=0,
+                       backoff=0.5, rate_limit=0.0, rate=0.0, on_result=None, rtt=None):
+    """Executa o connect scan de `tasks` (host, port, family) no engine escolhido.
+    `on_result(host, port, status)`; `rtt` é um RttEstimator opcional.
+    Retorna dict {(host, port): status}.
+    """
+    if engine in ('asyncio', 'epoll'):
+        # --rate (delay entre submissões) vira uma taxa equivalente no token bucket
+        if rate > 0:
+            rate_limit = min(rate_limit, 1.0 / rate) if rate_limit else 1.0 / rate
+        run = scan_targets_epoll if engine == 'epoll' else scan_targets_asyncio
+        return run(tasks, timeout, concurrency=concurrency, max_retries=max_retries,
+                   backoff=backoff, rate_limit=rate_limit, on_result=on_result, rtt=rtt)
+    return scan_targets_threaded(tasks, timeout, workers=workers, max_retries=max_retries,
+                                 backoff=backoff, rate_limit=rate_limit, rate=rate,
+                                 on_result=on_result, rtt=rtt)
+
+
+def shard_targets(hosts, ports, n):
+    """Divide o trabalho em até `n` shards [(hosts, ports)].
+    Com pelo menos `n` hosts, os hosts são distribuídos em round-robin; senão o
+    intervalo de portas é intercalado (ports[i::n]), o que equilibra a carga
+    mesmo quando portas filtradas se concentram em uma faixa.
+    """
+    n = max(1, int(n))
+    if len(hosts) >= n:
+        return [(hosts[i::n], ports) for i in range(n)]
+    return [(hosts, ports[i::n]) for i in range(n) if len(ports[i::n])]
+
+
+_SHARD_BATCH = 512           # resultados por mensagem worker → pai
+_SHARD_FLUSH_INTERVAL = 0.1  # segundos
+
+
+def _shard_worker(shard_id, hosts, ports, engine, timeout, engine_opts, result_queue):
+    """Processo filho: roda o engine no seu shard e envia lotes de
+    (host, port, status, service) para o pai. `get_service_name` roda aqui,
+    fora do processo que agrega os resultados. Com `rtt_spec`, o shard mantém
+    seu próprio RttEstimator e manda a estimativa final ao pai.
+    """
+    engine_opts = dict(engine_opts)
+    rtt_spec = engine_opts.pop('rtt_spec', None)
+    rtt = RttEstimator(**rtt_spec) if rtt_spec else None
+    batch = []
+    last_flush = time.monotonic()
+
+    def _emit(host, port, status):
+        nonlocal last_flush
+        batch.append((host, port, status, get_service_name(port)))
+        now = time.monotonic()
+        if len(batch) >= _SHARD_BATCH or now - last_flush >= _SHARD_FLUSH_INTERVAL:
+            result_queue.put(('results', shard_id, list(batch)))
+            batch.clear()
+            last_flush = now
+
+    try:
+        run_connect_engine(engine, interleave_targets(hosts, ports), timeout,
+                           on_result=_emit, rtt=rtt, **engine_opts)
+        if batch:
+            result_queue.put(('results', shard_id, batch))
+        if rtt:
+            result_queue.put(('rtt', shard_id, rtt.snapshot()))
+        result_queue.put(('done', shard_id, None))
+    except BaseException as e:
+        result_queue.put(('error', shard_id, repr(e)))
+
+
+def scan_targets_sharded(hosts, ports, processes, engine, timeout, on_result=None,
+                         on_error=None, **engine_opts):
+    """Connect scan dividido em `processes` processos (um engine por shard).
+    Os resultados chegam em lotes e são entregues no processo pai a
+    `on_result(host, port, status, service)`. `engine_opts` são os limites
+    *por processo* (workers, concurrency, rate_limit...). Um shard que falhar
+    chama `on_error(shard_id, mensagem)` (sem `on_error`, levanta RuntimeError
+    depois de drenar os demais). Um `rtt` (RttEstimator) em `engine_opts` vira
+    um estimador por shard; as estimativas são combinadas nele no fim.
+    Retorna dict {(host, port): status}.
+    """
+    rtt = engine_opts.pop('rtt', None)
+    if rtt is not None:
+        engine_opts['rtt_spec'] = dict(initial=rtt.initial, adaptive=rtt.adaptive,
+                                       min_timeout=rtt.min_timeout, max_timeout=rtt.max_timeout)
+    ctx = multiprocessing.get_context()
+    result_queue = ctx.Queue()
+    shards = shard_targets(hosts, ports, processes)
+    procs = [
+        ctx.Process(target=_shard_worker, daemon=True,
+                    args=(i, shard_hosts, shard_ports, engine, timeout, engine_opts, result_queue))
+        for i, (shard_hosts, shard_ports) in enumerate(shards)
+    ]
+    for proc in procs:
+        proc.start()
+
+    statuses = {}
+    errors = []
+    pending = set(range(len(procs)))
+    try:
+        while pending:
+            try:
+                kind, shard_id, payload = result_queue.get(timeout=0.5)
+            except queue.Empty:
+                # Processo morto sem avisar (ex.: OOM/kill) não pode travar o pai
+                for i in list(pending):
+                    if not procs[i].is_alive() and procs[i].exitcode not in (None, 0):
+                        pending.discard(i)
+                        errors.append((i, f'processo terminou com código {procs[i].exitcode}'))
+                continue
+            if kind == 'results':
+                for host, port, status, service in payload:
+                    statuses[(host, port)] = status
+                    if on_result:
+                        on_result(host, port, status, service)
+            elif kind == 'rtt':
+                if rtt is not None:
+                    rtt.merge(payload)
+            elif kind == 'done':
+                pending.discard(shard_id)
+            else:
+                pending.discard(shard_id)
+                errors.append((shard_id, payload))
+    finally:
+        for proc in procs:
+            proc.join(timeout=1.0)
+            if proc.is_alive():
+                proc.terminate()
+
+    for shard_id, message in errors:
+        if on_error is None:
+            raise RuntimeError(f'shard {shard_id} falhou: {message}')
+        on_error(shard_id, message)
+    return statuses
+
+
 # ---------------------------------------------------------------------------
 # Banner grabbing
 # ---------------------------------------------------------------------------
@@ -202,42 +923,76 @@ def apply_timing(args):
     print(Fore.CYAN + f'    workers={args.workers}  timeout={args.timeout}s  rate_limit={args.rate_limit or "ilimitado"}' + Style.RESET_ALL)
 
 
+def _is_multi_host(args):
+    """True quando o scan cobriu mais de um host: `results` é {ip: {port: info}}
+    e `open_ports` é {ip: [ports]}."""
+    return len(getattr(args, 'hosts', None) or []) > 1
+
+
+def _host_groups(results, open_ports, args):
+    """Gera (label, ip, results_do_host, open_ports_do_host) para cada host do scan."""
+    if _is_multi_host(args):
+        for label, ip, _ in args.hosts:
+            yield label, ip, results.get(ip, {}), open_ports.get(ip, [])
+    else:
+        yield args.target, args.target_ip, results, open_ports
+
+
+def _state_service(info, p, services_map):
+    state = info['state'] if isinstance(info, dict) else info
+    service = info['service'] if isinstance(info, dict) else services_map.get(p, 'unknown')
+    return state, service
+
+
 def save_results_csv(filename, results, open_ports, services_map, args):
-    """Save results to CSV format."""
+    """Save results to CSV format (coluna Host extra em scans multi-host)."""
+    multi = _is_multi_host(args)
     with open(filename, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
-        writer.writerow(['Port', 'State', 'Service'])
-        for p in sorted(results.keys()):
-            info = results[p]
-            state = info['state'] if isinstance(info, dict) else info
-            service = info['service'] if isinstance(info, dict) else services_map.get(p, 'unknown')
-            writer.writerow([p, state, service])
+        writer.writerow((['Host'] if multi else []) + ['Port', 'State', 'Service'])
+        for _, ip, host_results, _ in _host_groups(results, open_ports, args):
+            for p in sorted(host_results.keys()):
+                state, service = _state_service(host_results[p], p, services_map)
+                writer.writerow(([ip] if multi else []) + [p, state, service])
 
 
 def save_results_ndjson(filename, results, open_ports, services_map, args):
-    """Save results to NDJSON format (one JSON per line)."""
+    """Save results to NDJSON format (one JSON per line; campo host em multi-host)."""
+    multi = _is_multi_host(args)
     with open(filename, 'w', encoding='utf-8') as f:
-        for p in sorted(results.keys()):
-            info = results[p]
-            state = info['state'] if isinstance(info, dict) else info
-            service = info['service'] if isinstance(info, dict) else services_map.get(p, 'unknown')
-            line = json.dumps({'port': p, 'state': state, 'service': service})
-            f.write(line + '\n')
+        for _, ip, host_results, _ in _host_groups(results, open_ports, args):
+            for p in sorted(host_results.keys()):
+                state, service = _state_service(host_results[p], p, services_map)
+                record = {'host': ip} if multi else {}
+                record.update({'port': p, 'state': state, 'service': service})
+                f.write(json.dumps(record) + '\n')
 
 
 def save_results_xml(filename, results, open_ports, services_map, args):
-    """Save results to XML format."""
+    """Save results to XML format (um elemento <host> por alvo em multi-host)."""
+    multi = _is_multi_host(args)
     with open(filename, 'w', encoding='utf-8') as f:
         f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
         f.write(f'<scan target="{args.target}" start="{args.start}" end="{args.end}">\n')
-        for p in sorted(results.keys()):
-            info = results[p]
-            state = info['state'] if isinstance(info, dict) else info
-            service = info['service'] if isinstance(info, dict) else services_map.get(p, 'unknown')
-            f.write(f'  <port number="{p}" state="{state}" service="{service}" />\n')
+        for label, ip, host_results, _ in _host_groups(results, open_ports, args):
+            indent = '    ' if multi else '  '
+            if multi:
+                f.write(f'  <host address="{ip}" name="{label}">\n')
+            for p in sorted(host_results.keys()):
+                state, service = _state_service(host_results[p], p, services_map)
+                f.write(f'{indent}<port number="{p}" state="{state}" service="{service}" />\n')
+            if multi:
+                f.write('  </host>\n')
         f.write('</scan>')
 
 
+def _json_host_block(host_results, host_open_ports):
+    simple_results = {p: (host_results[p]['state'] if isinstance(host_results[p], dict) else host_results[p]) for p in host_results}
+    services_map_out = {p: (host_results[p]['service'] if isinstance(host_results[p], dict) else get_service_name(p)) for p in sorted(host_open_ports)}
+    open_ports_detailed = [{'port': p, 'service': services_map_out.get(p, get_service_name(p))} for p in sorted(host_open_ports)]
+    return open_ports_detailed, simple_results, services_map_out
+
+
 def save_results(filename, format_type, results, open_ports, services_map, args):
     """Wrapper to save results in the specified format."""
     if format_type == 'csv':
@@ -246,11 +1001,45 @@ def save_results(filename, format_type, results, open_ports, services_map, args)
         save_results_ndjson(filename, results, open_ports, services_map, args)
     elif format_type == 'xml':
         save_results_xml(filename, results, open_ports, services_map, args)
+    elif _is_multi_host(args):
+        hosts_out = []
+        for label, ip, host_results, host_open_ports in _host_groups(results, open_ports, args):
+            open_ports_detailed, simple_results, services_map_out = _json_host_block(host_results, host_open_ports)
+            host_out = {
+                'target': label,
+                'target_ip': ip,
+                'ip_version': 6 if ':' in ip else 4,
+                'open_ports': open_ports_detailed,
+                'results': simple_results,
+                'services': services_map_out,
+            }
+            mac_address = (getattr(args, 'host_macs', None) or {}).get(ip)
+            if mac_address:
+                host_out['mac_address'] = mac_address
+            rounds = (getattr(args, 'syn_rounds', None) or {}).get(ip)
+            if rounds:
+                host_out['retransmissions'] = rounds
+            rtt_stats = (getattr(args, 'rtt_stats', None) or {}).get(ip)
+            if rtt_stats:
+                host_out['rtt'] = rtt_stats
+            cc_stats = (getattr(args, 'syn_congestion', None) or {}).get(ip)
+            if cc_stats:
+                host_out['congestion'] = cc_stats
+            hosts_out.append(host_out)
+        out = {
+            'target': args.target,
+            'start': args.start,
+            'end': args.end,
+            'hosts': hosts_out,
+            'elapsed': args.elapsed,
+            'mac': args.mac,
+            'method': getattr(args, 'method', 'connect')
+        }
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(out, f, indent=2)
     else:
         # Default to JSON
-        simple_results = {p: (results[p]['state'] if isinstance(results[p], dict) else results[p]) for p in results}
-        services_map_out = {p: (results[p]['service'] if isinstance(results[p], dict) else get_service_name(p)) for p in sorted(open_ports)}
-        open_ports_detailed = [{'port': p, 'service': services_map_out.get(p, get_service_name(p))} for p in sorted(open_ports)]
+        open_ports_detailed, simple_results, services_map_out = _json_host_block(results, open_ports)
         out = {
             'target': args.target,
             'target_ip': args.target_ip,
@@ -264,6 +1053,15 @@ def save_results(filename, format_type, results, open_ports, services_map, args)
             'ip_version': args.ip_version,
             'method': getattr(args, 'method', 'connect')
         }
+        rounds = (getattr(args, 'syn_rounds', None) or {}).get(args.target_ip)
+        if rounds:
+            out['retransmissions'] = rounds
+        rtt_stats = (getattr(args, 'rtt_stats', None) or {}).get(args.target_ip)
+        if rtt_stats:
+            out['rtt'] = rtt_stats
+        cc_stats = (getattr(args, 'syn_congestion', None) or {}).get(args.target_ip)
+        if cc_stats:
+            out['congestion'] = cc_stats
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(out, f, indent=2)
 
@@ -279,74 +1077,747 @@ def is_private_ip(ip_str):
         return False
 
 
-def get_mac_for_ip(ip, timeout=0.5):
-    """Tenta obter o MAC address do `ip` consultando a tabela ARP local.
-    Estratégia:
-    1. Se IP é público (externo), retorna None (ARP não funciona fora da rede local)
-    2. Tenta usar Scapy getmacbyip() se disponível (mais rápido e preciso)
-    3. Fallback: ping + arp -a/arp -n (método tradicional com timeouts maiores)
-    
+# ---------------------------------------------------------------------------
+# MAC do alvo (--mac), pelo cache de vizinhos compartilhado
+# ---------------------------------------------------------------------------
+
+def get_mac_for_ip(ip, timeout=0.5, cache_path=None):
+    """Tenta obter o MAC address do `ip` pelo cache de vizinhos compartilhado
+    (neighbor_cache: memória com TTL, disco opcional em `cache_path`, tabela
+    do kernel por rtnetlink//proc/net/arp e sonda ARP só em falta).
+    Se IP é público (externo), retorna None (ARP não funciona fora da rede local).
+
     Retorna o MAC como string ou None se não encontrado.
     """
     # Verificação 1: Se é IP público, não insista
     if not is_private_ip(ip):
         print(Fore.YELLOW + f'⚠️  {ip} é um IP público (fora da rede local). ARP não descobrirá seu MAC.' + Style.RESET_ALL)
         return None
-    
-    # Verificação 2: Tenta Scapy getmacbyip (nativo, rápido e preciso)
-    try:
-        from scapy.arch import getmacbyip
-        mac = getmacbyip(ip)
-        if mac and mac != '00:00:00:00:00:00':
-            return mac
-    except Exception:
-        pass
-    
-    # Fallback: Método tradicional (ping + ARP table lookup) com timeouts maiores
-    system = platform.system().lower()
-    ping_timeout = max(1.0, timeout * 2)  # Aumento timeout para 2x
-    
-    # Ping com múltiplas tentativas para popular ARP cache
-    try:
-        if system == 'windows':
-            ping_cmd = ['ping', '-n', '2', '-w', str(int(ping_timeout * 1000)), ip]  # 2 pings em vez de 1
+    return neighbor_cache.lookup(ip, socket.AF_INET, timeout, path=cache_path)
+
+
+def syn_scan(target_ip, family, ports, timeout, chunk_size=500, window=4,
+             retries=0, retry_factor=0.5, round_stats=None, rtt=None, cc=None, fast=False):
+    """SYN scan em pipeline de um único alvo (syn_scan_hosts com um host).
+    Se `round_stats` (lista) for passado, recebe um dict por rodada com
+    enviadas/recuperadas/timeout. Retorna (results, open_ports) no mesmo
+    formato do connect scan.
+    """
+    stats = {} if round_stats is not None else None
+    results, open_ports = syn_scan_hosts([(target_ip, target_ip, family)], ports, timeout, chunk_size, window,
+                                         retries, retry_factor, stats, rtt, cc, fast)
+    if round_stats is not None:
+        round_stats.extend(stats.get(target_ip, []))
+    return results[target_ip], open_ports[target_ip]
+
+
+def syn_scan_hosts(hosts, ports, timeout, chunk_size=500, window=4,
+                   retries=0, retry_factor=0.5, round_stats=None, rtt=None, cc=None, fast=False):
+    """SYN scan em pipeline com Scapy (requer privilégios/Npcap) em um ou mais
+    `hosts` ([(label, ip, família)], como resolve_targets).
+    Uma única captura (socket L2 do Scapy; uma por interface de rota, em geral
+    só uma) fica ativa durante o scan inteiro e os lotes de pares (host, porta),
+    intercalados host a host a cada porta, são enviados em sequência por
+    sockets persistentes. `chunk_size` é o passo de envio e `window` o número
+    de lotes em voo: um lote sai da janela assim que todos os seus pares
+    respondem ou `timeout` depois de a captura ver o próprio SYN sair, então
+    só o fim do scan paga uma espera completa e o envio nunca se adianta demais
+    à captura. Um host filtrado não atrasa os outros: as esperas de todos
+    correm na mesma janela.
+    `retries` rodadas de retransmissão reenviam só os pares ainda sem resposta,
+    com timeout `timeout * retry_factor ** rodada`; se `round_stats` (dict) for
+    passado, recebe por IP uma lista com um dict por rodada (enviadas/
+    recuperadas/timeout daquele host).
+    Com `rtt` (RttEstimator), cada SYN-ACK/RST vira uma amostra de RTT do host
+    (timestamp da captura menos o envio) e o timeout de cada lote é a maior
+    estimativa entre os hosts dele; respostas de portas retransmitidas não
+    geram amostra (regra de Karn).
+    Com `cc` (AimdController), o tamanho de cada lote e o pps vêm do controle de
+    congestionamento, alimentado pela taxa de resposta de cada lote da 1ª rodada
+    (`chunk_size` é ignorado; o lote inicial é `cc.batch`). O controle é um só
+    para o scan: todos os SYNs saem pelo mesmo envio.
+    `fast`: os SYNs saem de um SynTemplate por host (bytes pré-montados, só
+    dport reescrito) por raw sockets, sem montar camadas do Scapy por pacote;
+    sem raw socket ou rota (Windows/sem root) volta aos sockets L3 do Scapy.
+    Retorna ({ip: results}, {ip: open_ports}), cada um no formato do connect scan.
+    """
+    from scapy.all import conf, Ether, IP, IPv6, TCP
+    from scapy.interfaces import resolve_iface
+
+    ports = list(ports)
+    sport = random.randint(40000, 60000)
+    family_of = {}               # IP (texto) -> família
+    ip_of = {}                   # IP (bytes, como na captura) -> IP (texto)
+    for _, host_ip, family in hosts:
+        family_of[host_ip] = family
+        ip_of[socket.inet_pton(family, host_ip)] = host_ip
+    host_ips = list(family_of)
+    multi_host = len(host_ips) > 1
+    answers = {}                 # (IP, porta) -> estado (preenchido pela thread da captura)
+    batch_of = {}                # (IP, porta) -> índice do lote
+    remaining = []               # pares ainda sem resposta em cada lote
+    unechoed = []                # SYNs do lote que a captura ainda não viu sair
+    echoed = set()
+    clock = {}                   # lote -> instante em que a captura viu o último SYN
+    sent_at = {}                 # (IP, porta) -> time.time() do último SYN enviado
+    attempts = {}                # (IP, porta) -> SYNs enviados (Karn: só a 1ª tentativa mede RTT)
+    last_rx = [time.monotonic()]  # último pacote do scan (sport/alvos) visto pela captura
+    cond = threading.Condition()
+
+    def _handle(src, dst, segment, ts):
+        hdr = parse_tcp_reply(segment)
+        if hdr is None:
+            return
+        rsport, rdport, _, _, rflags = hdr
+        if rsport == sport and dst in ip_of:
+            # Nosso próprio SYN visto pela captura: relógio do lote
+            last_rx[0] = time.monotonic()
+            key = (ip_of[dst], rdport)
+            with cond:
+                idx = batch_of.get(key)
+                if idx is None or key in echoed:
+                    return
+                echoed.add(key)
+                unechoed[idx] -= 1
+                if unechoed[idx] <= 0:
+                    clock[idx] = time.monotonic()
+                    cond.notify_all()
+            return
+        if rdport != sport or src not in ip_of:
+            return
+        last_rx[0] = time.monotonic()
+        if rflags & (TCP_SYN | TCP_ACK) == TCP_SYN | TCP_ACK:
+            state = 'open'
+        elif rflags & TCP_RST:       # RST / RST-ACK
+            state = 'closed'
         else:
-            ping_cmd = ['ping', '-c', '2', '-W', str(int(max(1, ping_timeout))), ip]
-        subprocess.run(ping_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=ping_timeout + 1)
-    except Exception:
-        pass
+            state = 'filtered'
+        key = (ip_of[src], rsport)
+        with cond:
+            if key in answers or key not in batch_of:
+                return
+            answers[key] = state
+            remaining[batch_of[key]] -= 1
+            cond.notify_all()
+        # Regra de Karn: com a porta retransmitida (mesmo sport e seq), não há
+        # como saber a qual SYN a resposta corresponde; a amostra é descartada
+        if rtt is not None and attempts.get(key) == 1:
+            rtt.observe(key[0], ts - sent_at[key])
+
+    # O filtro deixa passar também os SYNs de saída (relógio dos lotes); com
+    # muitos hosts, só o sport (aleatório) já separa o tráfego do scan
+    bpf = f'tcp and port {sport}'
+    if len(host_ips) <= 16:
+        bpf += ' and (' + ' or '.join(f'host {ip}' for ip in host_ips) + ')'
+
+    # Captura na interface da rota para cada alvo (ex.: lo para 127.x), como o sr() faz
+    iface_of = {}
+    ifaces = {}
+    for host_ip in host_ips:
+        try:
+            route = (conf.route6.route(host_ip) if family_of[host_ip] == socket.AF_INET6
+                     else conf.route.route(host_ip))
+            cap_iface = resolve_iface(route[0] or conf.iface)
+        except Exception:
+            cap_iface = conf.iface
+        iface_of[host_ip] = ifaces.setdefault(str(cap_iface), cap_iface)
 
+    listens = []
     try:
-        if system == 'windows':
-            out = subprocess.check_output(['arp', '-a'], encoding='utf-8', errors='ignore')
-            # Windows arp -a lines:  192.168.1.10           01-23-45-67-89-ab     dynamic
-            # Melhor regex: evita multicast (01-00-5e) e broadcast (ff-ff)
-            m = re.search(rf'^{re.escape(ip)}\s+([0-9a-fA-F][0-9a-fA-F](?:[\-:][0-9a-fA-F][0-9a-fA-F]){{5}})\s+', out, re.MULTILINE)
-            if m:
-                mac = m.group(1)
-                # Rejeita multicast e broadcast
-                if not mac.upper().startswith(('01-00-5E', 'FF-FF')):
-                    return mac
-        else:
-            # Try `ip neigh` first
+        for cap_iface in ifaces.values():
+            # Sem libpcap o Scapy não compila BPF: cai para captura sem filtro (o _handle já filtra)
             try:
-                out = subprocess.check_output(['ip', 'neigh'], encoding='utf-8', errors='ignore')
-                m = re.search(rf'^{re.escape(ip)}\s+.*lladdr\s+([0-9a-fA-F:]+)', out, re.MULTILINE)
-                if m:
-                    return m.group(1)
+                listen = conf.L2listen(iface=cap_iface, filter=bpf)
             except Exception:
-                pass
-            # Fallback to arp -n
+                print(Fore.YELLOW + '  [!] Captura com filtro BPF falhou; filtrando em Python.' + Style.RESET_ALL)
+                listen = conf.L2listen(iface=cap_iface)
+            listens.append(listen)
+            # A captura fica aberta o scan inteiro: buffer grande evita perder respostas em rajada
+            if hasattr(listen, 'ins'):
+                grow_rcvbuf(listen.ins)
+    except Exception:
+        for listen in listens:
+            listen.close()
+        raise
+    stop = threading.Event()
+
+    def _capture():
+        # Quadros crus e parse por bytes: dissecar cada pacote com o Scapy não
+        # acompanha o envio em pipeline. Outros tipos de enlace usam o Scapy.
+        while not stop.is_set():
             try:
-                out = subprocess.check_output(['arp', '-n', ip], encoding='utf-8', errors='ignore')
-                m = re.search(r'(([0-9a-fA-F]{2}[:\-]){5}[0-9a-fA-F]{2})', out)
-                if m:
-                    return m.group(1)
+                ready = listens[0].select(listens, 0.05)
             except Exception:
-                pass
-    except Exception:
+                continue
+            for listen in ready or ():
+                try:
+                    cls, frame, ts = listen.recv_raw()
+                except Exception:
+                    continue
+                if not frame:
+                    continue
+                if cls is Ether:
+                    found = ether_tcp_segment(frame)
+                else:
+                    pkt = cls(frame) if cls else None
+                    found = None
+                    if pkt is not None and TCP in pkt and (IP in pkt or IPv6 in pkt):
+                        ip = pkt[IPv6] if IPv6 in pkt else pkt[IP]
+                        fam = socket.AF_INET6 if IPv6 in pkt else socket.AF_INET
+                        found = (fam, socket.inet_pton(fam, ip.src), socket.inet_pton(fam, ip.dst), bytes(pkt[TCP]))
+                if found:
+                    _handle(*found[1:], ts or time.time())
+
+    sniffer = threading.Thread(target=_capture, daemon=True)
+    sniffer.start()
+    senders = []                 # sockets de envio abertos (fechados no fim)
+    route_of = {}                # IP -> (socket, SynTemplate ou camada IP do Scapy, destino do sendto)
+    if fast:
+        try:
+            # Modelos antes dos sockets: sem rota, o OSError não deixa um socket raw aberto
+            tpls = {ip: SynTemplate(source_address_for(ip, family_of[ip]), ip, sport, 0, 0, family_of[ip],
+                                    ip_header=family_of[ip] == socket.AF_INET) for ip in host_ips}
+            raw = {}
+            for family in set(family_of.values()):
+                raw[family] = open_raw_sender(family)
+                senders.append(raw[family])
+            for ip in host_ips:
+                dest = (ip, 0, 0, 0) if family_of[ip] == socket.AF_INET6 else (ip, 0)
+                route_of[ip] = (raw[family_of[ip]], tpls[ip], dest)
+        except (PermissionError, OSError) as e:
+            for s in senders:
+                s.close()
+            senders, route_of = [], {}
+            print(Fore.YELLOW + f'  [!] Modo rápido indisponível ({e}); usando o Scapy.' + Style.RESET_ALL)
+    templated = bool(route_of)
+    if not templated:
+        # Socket L3 ligado à interface da rota, como o sr() do Scapy
+        l3 = {}
+        for ip in host_ips:
+            ipv6 = family_of[ip] == socket.AF_INET6
+            key = (str(iface_of[ip]), ipv6)
+            if key not in l3:
+                l3[key] = iface_of[ip].l3socket(ipv6)(iface=iface_of[ip])
+                senders.append(l3[key])
+            route_of[ip] = (l3[key], IPv6(dst=ip) if ipv6 else IP(dst=ip), None)
+
+    inflight = collections.deque()   # (instante do envio, índice do lote)
+    batch_timeout = []               # timeout de cada lote (encolhe nas retransmissões)
+    batch_feed = []                  # (enviadas, pps medido) dos lotes que alimentam o `cc`
+    pacer = [None, None]             # (pps, TokenBucket) atuais
+
+    def _pace():
+        rate = cc.rate if cc is not None else None
+        if not rate:
+            return
+        if pacer[0] != rate:
+            # Rajada de no máximo ~10 ms: o bucket não acumula crédito demais
+            pacer[:] = [rate, TokenBucket(rate, capacity=max(1, rate / 100))]
+        pacer[1].consume()
+
+    def _expired(sent, idx, now):
+        # Conta o timeout a partir de quando a captura viu o lote sair; se ela
+        # não vê pacotes de saída, vale o envio, desde que ela não esteja
+        # recebendo pacotes do scan (backlog ainda por dissecar). Em qualquer
+        # caso o lote vence em `sent + timeout + SYN_BATCH_GRACE`: tráfego
+        # contínuo na captura não segura a janela (nem a drenagem) para sempre.
+        deadline = sent + batch_timeout[idx]
+        if now >= deadline + SYN_BATCH_GRACE:
+            return True
+        if idx in clock:
+            return now >= clock[idx] + batch_timeout[idx]
+        return now >= deadline and now - last_rx[0] >= 0.25
+
+    def _retire(wait_for_slot=False, drain=False):
+        # Tira da janela os lotes completos ou vencidos. `wait_for_slot` espera
+        # até haver vaga (< window); `drain` espera todos os lotes.
+        with cond:
+            while inflight:
+                sent, idx = inflight[0]
+                now = time.monotonic()
+                if remaining[idx] <= 0 or _expired(sent, idx, now):
+                    inflight.popleft()
+                    if cc is not None and batch_feed[idx]:
+                        size, pps = batch_feed[idx]
+                        cc.update(size, size - remaining[idx], pps)
+                    continue
+                if drain or (wait_for_slot and len(inflight) >= window):
+                    cond.wait(0.05)
+                    continue
+                return
+
+    def _base_timeout(ip):
+        return rtt.timeout(ip) if rtt is not None else timeout
+
+    def _answered():
+        with cond:
+            count = dict.fromkeys(host_ips, 0)
+            for ip, _ in answers:
+                count[ip] += 1
+        return count
+
+    def _run_round(tasks, scale, verbose, feed):
+        tasks = iter(tasks)
+        while True:
+            # Espera vaga antes de fixar o tamanho: o `cc` reage aos lotes que acabaram de sair
+            _retire(wait_for_slot=True)
+            batch = list(itertools.islice(tasks, cc.batch if cc is not None else chunk_size))
+            if not batch:
+                break
+            idx = len(remaining)
+            with cond:
+                remaining.append(len(batch))
+                unechoed.append(len(batch))
+                batch_timeout.append(max(_base_timeout(ip) for ip in {ip for ip, _ in batch}) * scale)
+                batch_feed.append(None)
+                for key in batch:
+                    batch_of[key] = idx
+                    attempts[key] = attempts.get(key, 0) + 1
+                echoed.difference_update(batch)
+            if verbose:
+                pace = f', {cc.rate:.0f} pps' if cc is not None and cc.rate else ''
+                where = f' em {len({ip for ip, _ in batch})} host(s)' if multi_host else ''
+                print(Fore.CYAN + f'  Escaneando lote {idx + 1}: portas {batch[0][1]}-{batch[-1][1]}{where}'
+                      f' ({len(batch)}{pace})...' + Style.RESET_ALL)
+            started = time.monotonic()
+            try:
+                if templated:
+                    for key in batch:
+                        sock, tpl, dest = route_of[key[0]]
+                        _pace()
+                        sent_at[key] = time.time()
+                        sock.sendto(tpl.patch(dport=key[1]), dest)
+                else:
+                    for key in batch:
+                        sock, ip_layer, _ = route_of[key[0]]
+                        _pace()
+                        sent_at[key] = time.time()
+                        sock.send(ip_layer / TCP(sport=sport, dport=key[1], flags='S'))
+            except Exception as e:
+                print(Fore.RED + f'  Erro no lote {idx + 1}: {e}' + Style.RESET_ALL)
+                # Continuar com próximo lote em caso de erro
+            now = time.monotonic()
+            if feed:
+                batch_feed[idx] = (len(batch), len(batch) / max(now - started, 1e-6))
+            inflight.append((now, idx))
+            _retire()
+        # Drenagem final: só os últimos lotes esperam o timeout inteiro
+        _retire(drain=True)
+
+    try:
+        first_timeout = {ip: _base_timeout(ip) for ip in host_ips}
+        # Porta a porta, todos os hosts: um host filtrado ocupa 1/N de cada lote
+        _run_round(((ip, p) for p in ports for ip in host_ips), 1.0, True, True)
+        if round_stats is not None:
+            answered = _answered()
+            for ip in host_ips:
+                round_stats.setdefault(ip, []).append(
+                    {'round': 0, 'sent': len(ports), 'recovered': answered[ip], 'timeout': first_timeout[ip]})
+        # Retransmissões: só os pares ainda sem resposta, com timeout menor a cada rodada
+        for r in range(1, retries + 1):
+            with cond:
+                pending = [(ip, p) for p in ports for ip in host_ips if (ip, p) not in answers]
+            if not pending:
+                break
+            before = _answered()
+            round_timeout = {ip: _base_timeout(ip) * retry_factor ** r for ip in host_ips}
+            # Retransmissões não alimentam o `cc`: quase só sobram portas filtradas
+            _run_round(pending, retry_factor ** r, False, False)
+            after = _answered()
+            recovered = sum(after.values()) - sum(before.values())
+            shown = max(round_timeout.values())
+            print(Fore.CYAN + f'  Retransmissão {r}/{retries}: {len(pending)} porta(s) sem resposta, '
+                  f'{recovered} recuperada(s) (timeout {shown:.2f}s)' + Style.RESET_ALL)
+            if round_stats is not None:
+                sent = collections.Counter(ip for ip, _ in pending)
+                for ip in host_ips:
+                    if sent[ip]:
+                        round_stats.setdefault(ip, []).append(
+                            {'round': r, 'sent': sent[ip], 'recovered': after[ip] - before[ip],
+                             'timeout': round_timeout[ip]})
+    finally:
+        stop.set()
+        sniffer.join()
+        for listen in listens:
+            listen.close()
+        for sock in senders:
+            sock.close()
+
+    results = {}
+    open_ports = {}
+    for ip in host_ips:
+        results[ip] = {}
+        open_ports[ip] = []
+        for p in ports:
+            state = answers.get((ip, p), 'filtered')
+            service = get_service_name(p)
+            results[ip][p] = {'state': state, 'service': service}
+            if state == 'open':
+                open_ports[ip].append(p)
+                where = f'{ip}:{p}' if multi_host else f'{p}'
+                print(Fore.GREEN + f'  Open: {where} ({service})' + Style.RESET_ALL)
+    return results, open_ports
+
+
+# ---------------------------------------------------------------------------
+# SYN scan stateless (sender e receiver separados, estilo masscan)
+# ---------------------------------------------------------------------------
+# O número de sequência de cada SYN é um hash com chave de (dst, dport, sport),
+# como um SYN cookie. O receiver valida SYN-ACK/RST pelo ack (= cookie + 1) e
+# não precisa de tabela de sondas em voo.
+
+TCP_FIN, TCP_SYN, TCP_RST, TCP_PSH, TCP_ACK = 0x01, 0x02, 0x04, 0x08, 0x10
+
+
+def syn_cookie(key, dst_ip, dport, sport):
+    """Número de sequência (32 bits) derivado de (dst, dport, sport) com `key` secreta."""
+    h = hashlib.blake2b(f'{dst_ip}|{dport}|{sport}'.encode(), key=key, digest_size=4)
+    return int.from_bytes(h.digest(), 'big')
+
+
+class RawSocketTransport:
+    """Transporte L3 com raw sockets do SO (Linux/macOS, requer root/CAP_NET_RAW).
+    IPv4: envia pacote IP completo (IPPROTO_RAW, `ip_header = True`: quem envia
+    passa o pacote já com cabeçalho IP); IPv6: envia só o TCP e o kernel monta o
+    cabeçalho. `recv()` devolve (ip_origem, segmento_tcp) ou None.
+    """
+    def __init__(self, family=socket.AF_INET):
+        self.family = family
+        self.ip_header = family == socket.AF_INET
+        self._tx = open_raw_sender(family)
+        self._rx = socket.socket(family, socket.SOCK_RAW, socket.IPPROTO_TCP)
+        self._rx.setblocking(False)
+        grow_rcvbuf(self._rx)
+
+    def send(self, src_ip, dst_ip, packet):
+        self._tx.sendto(packet, (dst_ip, 0, 0, 0) if self.family == socket.AF_INET6 else (dst_ip, 0))
+
+    def recv(self, timeout):
+        # Com tráfego chegando, lê direto; só faz select() quando a fila está vazia
+        try:
+            data, addr = self._rx.recvfrom(65535)
+        except BlockingIOError:
+            ready, _, _ = select.select([self._rx], [], [], timeout)
+            if not ready:
+                return None
+            try:
+                data, addr = self._rx.recvfrom(65535)
+            except BlockingIOError:
+                return None
+        if self.family == socket.AF_INET6:
+            return addr[0], data          # raw IPv6 entrega só o payload TCP
+        ihl = (data[0] & 0x0F) * 4
+        return addr[0], data[ihl:]
+
+    def close(self):
+        self._tx.close()
+        self._rx.close()
+
+
+class ScapyTransport:
+    """Fallback com os sockets L3 do Scapy (Windows/Npcap ou sem raw sockets nativos)."""
+    ip_header = False
+
+    def __init__(self, family=socket.AF_INET, sport=None):
+        from scapy.all import conf, IP, IPv6, TCP
+        self.family = family
+        self._IP, self._IPv6, self._TCP = IP, IPv6, TCP
+        self._tx = conf.L3socket6() if family == socket.AF_INET6 else conf.L3socket()
+        bpf = f'tcp and dst port {sport}' if sport else 'tcp'
+        self._rx = conf.L3socket6(filter=bpf) if family == socket.AF_INET6 else conf.L3socket(filter=bpf)
+
+    def send(self, src_ip, dst_ip, segment):
+        ip = self._IPv6(src=src_ip, dst=dst_ip) if self.family == socket.AF_INET6 else self._IP(src=src_ip, dst=dst_ip)
+        self._tx.send(ip / self._TCP(bytes(segment)))
+
+    def recv(self, timeout):
+        ready = self._rx.select([self._rx], timeout)
+        if not ready:
+            return None
+        pkt = self._rx.recv()
+        if pkt is None or self._TCP not in pkt:
+            return None
+        ip = pkt[self._IPv6] if self._IPv6 in pkt else pkt[self._IP]
+        return ip.src, bytes(pkt[self._TCP])
+
+    def close(self):
+        self._tx.close()
+        self._rx.close()
+
+
+class MemoryTransport:
+    """Transporte em memória para testes (sem root).
+    `responder(dst_ip, segment)` devolve uma lista de (ip_origem, segmento_resposta).
+    """
+    ip_header = False
+
+    def __init__(self, responder, family=socket.AF_INET):
+        self.family = family
+        self.responder = responder
+        self.sent = 0
+        self._replies = queue.Queue()
+
+    def send(self, src_ip, dst_ip, segment):
+        self.sent += 1
+        for reply in self.responder(dst_ip, bytes(segment)) or ():
+            self._replies.put(reply)
+
+    def recv(self, timeout):
+        try:
+            return self._replies.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
         pass
-    return None
+
+
+def open_syn_transport(family=socket.AF_INET, sport=None):
+    """Raw socket nativo quando possível; senão o fallback via Scapy."""
+    try:
+        return RawSocketTransport(family)
+    except (PermissionError, OSError, AttributeError):
+        return ScapyTransport(family, sport)
+
+
+class StatelessSynScanner:
+    """SYN scan sem estado por sonda: uma thread envia, outra recebe.
+    Respostas são aceitas só se `ack == cookie(dst, dport, sport) + 1`, o que
+    descarta tráfego alheio e respostas forjadas sem tabela de pendências.
+    """
+    def __init__(self, transport, src_ip, sport=None, key=None, rate=0.0):
+        self.transport = transport
+        self.src_ip = src_ip
+        self.sport = sport or random.randint(40000, 60000)
+        self.key = key or os.urandom(16)
+        self.rate = float(rate or 0.0)
+        self.sent = 0
+        self.ignored = 0
+        self._templates = {}     # dst -> SynTemplate (montado uma vez por destino)
+        self._ident = random.randrange(0x10000)
+
+    def _packet(self, dst_ip, dport, seq):
+        tpl = self._templates.get(dst_ip)
+        if tpl is None:
+            tpl = self._templates[dst_ip] = SynTemplate(
+                self.src_ip, dst_ip, self.sport, dport, seq, self.transport.family,
+                ip_header=getattr(self.transport, 'ip_header', False))
+        self._ident = (self._ident + 1) & 0xFFFF
+        return tpl.patch(dport=dport, seq=seq, ident=self._ident)
+
+    def _sender(self, tasks, stop):
+        tb = TokenBucket(self.rate, capacity=max(1, int(self.rate // 100))) if self.rate > 0 else None
+        for dst_ip, dport in tasks:
+            if stop.is_set():
+                break
+            if tb:
+                tb.consume()
+            seq = syn_cookie(self.key, dst_ip, dport, self.sport)
+            packet = self._packet(dst_ip, dport, seq)
+            for attempt in range(3):
+                try:
+                    self.transport.send(self.src_ip, dst_ip, packet)
+                    self.sent += 1
+                    break
+                except OSError as e:
+                    # Buffer de envio cheio: espera a fila da NIC esvaziar e tenta de novo
+                    if e.errno != errno.ENOBUFS:
+                        break
+                    time.sleep(0.001 * (attempt + 1))
+
+    def _receiver(self, stop, on_result):
+        while not stop.is_set():
+            item = self.transport.recv(0.05)
+            if item is None:
+                continue
+            src_ip, segment = item
+            fields = parse_tcp_reply(segment)
+            if fields is None:
+                continue
+            rport, lport, _, ack, flags = fields
+            if lport != self.sport or ack != (syn_cookie(self.key, src_ip, rport, self.sport) + 1) & 0xFFFFFFFF:
+                self.ignored += 1
+                continue
+            if flags & TCP_RST:
+                on_result(src_ip, rport, 'closed')
+            elif flags & (TCP_SYN | TCP_ACK) == (TCP_SYN | TCP_ACK):
+                on_result(src_ip, rport, 'open')
+
+    def scan(self, hosts, ports, timeout, on_result=None):
+        """Envia um SYN para cada (host, porta) e espera `timeout` após o último envio.
+        `hosts` e `ports` precisam ser re-iteráveis (ex.: lista e range): as
+        portas sem resposta são derivadas deles no fim, não de uma tabela.
+        Retorna dict {(host, port): status}.
+        """
+        statuses = {}
+
+        def _record(host, port, status):
+            if (host, port) in statuses:
+                return  # retransmissão do alvo (SYN-ACK repetido)
+            statuses[(host, port)] = status
+            if on_result:
+                on_result(host, port, status)
+
+        # O receiver só valida e enfileira; on_result roda nesta thread, para que
+        # callbacks lentos (nome do serviço, print) não atrasem a leitura do socket.
+        answers = collections.deque()
+        stop_rx = threading.Event()
+        stop_tx = threading.Event()
+        rx = threading.Thread(target=self._receiver, args=(stop_rx, lambda *a: answers.append(a)), daemon=True)
+        rx.start()
+        tasks = ((h, p) for p in ports for h in hosts)
+        tx = threading.Thread(target=self._sender, args=(tasks, stop_tx), daemon=True)
+        tx.start()
+        drain_until = None
+        try:
+            while True:
+                while answers:
+                    _record(*answers.popleft())
+                if drain_until is None and not tx.is_alive():
+                    drain_until = time.monotonic() + timeout  # janela final para respostas atrasadas
+                if drain_until is not None and time.monotonic() >= drain_until:
+                    break
+                time.sleep(0.005)
+        except KeyboardInterrupt:
+            stop_tx.set()
+            raise
+        finally:
+            stop_rx.set()
+            rx.join()
+        while answers:
+            _record(*answers.popleft())
+        for p in ports:
+            for h in hosts:
+                if (h, p) not in statuses:
+                    _record(h, p, 'filtered')
+        return statuses
+
+
+def stateless_syn_scan(hosts, ports, timeout, rate=0.0, transport=None, on_result=None):
+    """SYN scan stateless para `hosts` [(label, ip, family)] e `ports`.
+    Um scanner por família de endereço (IPv4/IPv6). Retorna {(host, port): status}.
+    """
+    statuses = {}
+    by_family = {}
+    for _, ip, family in hosts:
+        by_family.setdefault(family, []).append(ip)
+    for family, ips in by_family.items():
+        sport = random.randint(40000, 60000)
+        tr = transport or open_syn_transport(family, sport)
+        try:
+            scanner = StatelessSynScanner(tr, source_address_for(ips[0], family), sport=sport, rate=rate)
+            statuses.update(scanner.scan(ips, ports, timeout, on_result))
+        finally:
+            if transport is None:
+                tr.close()
+    return statuses
+
+
+def print_results_table(results, elapsed, target, target_ip, args):
+    """Mostra a tabela de portas de um host (estilo nmap em --pretty)."""
+    # --- Monta linhas da tabela ---
+    all_rows = []  # (port_str, state, service, version)
+    for p in sorted(results.keys()):
+        info = results[p]
+        state   = info['state']   if isinstance(info, dict) else info
+        service = info.get('service', 'unknown') if isinstance(info, dict) else get_service_name(p)
+        version = info.get('version', '')        if isinstance(info, dict) else ''
+        if service is None:
+            service = 'unknown'
+        all_rows.append((f'{p}/tcp', state, service, version or ''))
+
+    # --- print_pretty estilo nmap ---
+    def print_pretty(rows, elapsed, target, target_ip, total_scanned, show_banners=False):
+        sep = '=' * 62
+        open_count  = sum(1 for r in rows if r[1] == 'open')
+        closed_count = total_scanned - len(rows)  # número de portas não mostradas
+
+        print()
+        print(Fore.CYAN + Style.BRIGHT + sep + Style.RESET_ALL)
+        print(Fore.CYAN + Style.BRIGHT + f'  Nmap-like scan report for {target} ({target_ip})' + Style.RESET_ALL)
+        print(Fore.CYAN + f'  Host is up  |  {open_count} open port(s)  |  elapsed {elapsed:.2f}s' + Style.RESET_ALL)
+        print(Fore.CYAN + Style.BRIGHT + sep + Style.RESET_ALL)
+
+        if closed_count > 0:
+            print(Fore.YELLOW + f'  Not shown: {closed_count} closed/filtered port(s)' + Style.RESET_ALL)
+
+        if not rows:
+            print(Fore.YELLOW + '  Nenhuma porta aberta encontrada.' + Style.RESET_ALL)
+            print(Fore.CYAN + Style.BRIGHT + sep + Style.RESET_ALL)
+            return
+
+        # Colunas dinâmicas
+        port_w    = max((len(r[0]) for r in rows), default=7)
+        state_w   = max((len(r[1]) for r in rows), default=5)
+        service_w = max((len(r[2]) for r in rows), default=7)
+        version_w = max((len(r[3]) for r in rows), default=7) if show_banners else 0
+
+        # Header
+        header = f"  {'PORT'.ljust(port_w)}  {'STATE'.ljust(state_w)}  {'SERVICE'.ljust(service_w)}"
+        if show_banners:
+            header += f"  {'VERSION'.ljust(version_w)}"
+        print()
+        print(Fore.CYAN + header + Style.RESET_ALL)
+        print(Fore.CYAN + '  ' + '-' * (len(header) - 2) + Style.RESET_ALL)
+
+        for row in rows:
+            port_str, state, service, version = row
+            color = Fore.GREEN if state == 'open' else (Fore.YELLOW if state in ('filtered', 'no-response') else Fore.RED)
+            state_txt = state.upper()
+            line = f"  {port_str.ljust(port_w)}  {color}{state_txt.ljust(state_w)}{Style.RESET_ALL}  {service.ljust(service_w)}"
+            if show_banners:
+                line += f"  {Fore.YELLOW}{version.ljust(version_w)}{Style.RESET_ALL}"
+            print(line)
+
+        print(Fore.CYAN + Style.BRIGHT + sep + Style.RESET_ALL)
+
+    only_open = getattr(args, 'only_open', False)
+    show_banners = getattr(args, 'banners', False)
+    # Por padrão no modo pretty mostra só open (estilo nmap). --no-only-open mostra tudo.
+    display_rows = [r for r in all_rows if r[1] == 'open'] if (only_open or getattr(args, 'pretty', False)) else all_rows
+
+    if getattr(args, 'pretty', False):
+        print_pretty(display_rows, elapsed, target, target_ip, len(all_rows), show_banners)
+    else:
+        rows_to_print = display_rows
+        if not rows_to_print:
+            print(Fore.YELLOW + 'Nenhuma porta encontrada.' + Style.RESET_ALL)
+        else:
+            port_w    = max(len(r[0]) for r in rows_to_print)
+            state_w   = max(len(r[1]) for r in rows_to_print)
+            service_w = max(len(r[2]) for r in rows_to_print)
+
+            print()
+            header = f"{'PORT'.ljust(port_w)}  {'STATE'.ljust(state_w)}  {'SERVICE'.ljust(service_w)}"
+            if show_banners:
+                version_w = max(len(r[3]) for r in rows_to_print)
+                header += f"  {'VERSION'.ljust(version_w)}"
+            print(header)
+            for row in rows_to_print:
+                port_str, state, service, version = row
+                color = Fore.GREEN if state == 'open' else (Fore.YELLOW if state in ('filtered', 'no-response') else Fore.RED)
+                line = f"{port_str.ljust(port_w)}  {color}{state.ljust(state_w)}{Style.RESET_ALL}  {service.ljust(service_w)}"
+                if show_banners:
+                    line += f"  {version.ljust(version_w)}"
+                print(line)
+
+
+def _print_progress(completed, total_ports, start_time):
+    """Barra de progresso com ETA (reescreve a mesma linha)."""
+    elapsed_now = time.time() - start_time
+    if elapsed_now > 0 and completed > 0:
+        eta = (elapsed_now / completed) * (total_ports - completed)
+        eta_str = f'{eta:.0f}s'
+    else:
+        eta_str = '?'
+    pct = completed / total_ports * 100
+    bar_len = 28
+    filled = int(bar_len * completed / total_ports)
+    bar = '=' * filled + ('>' if filled < bar_len else '') + ' ' * max(0, bar_len - filled - 1)
+    print(
+        f'\r  [{bar}] {pct:5.1f}%  ({completed}/{total_ports})  ETA: {eta_str}   ',
+        end='', flush=True
+    )
 
 
 def main():
@@ -362,7 +1833,8 @@ def main():
             '  T5  Insane   — workers=500, timeout=0.1s (máximo)\n'
         )
     )
-    parser.add_argument('target', help='IP ou hostname a escanear')
+    parser.add_argument('target', nargs='?', help='IP, hostname, CIDR (10.0.0.0/24), intervalo (10.0.0.1-50) ou lista separada por vírgulas')
+    parser.add_argument('--targets-file', '-iL', metavar='FILE', help='Arquivo com alvos (um ou mais por linha, # para comentários)')
     parser.add_argument('--start', '-s', type=int, default=1, help='Porta inicial (default: 1)')
     parser.add_argument('--end', '-e', type=int, default=1024, help='Porta final (inclusive) (default: 1024)')
     parser.add_argument('--timeout', '-t', type=float, default=0.5, help='Timeout por tentativa (segundos)')
@@ -370,14 +1842,37 @@ def main():
     parser.add_argument('--save', help='Salvar resultado em JSON')
     parser.add_argument('--rate', type=float, default=0.0, help='Delay (s) entre submissões de tarefas para reduzir carga (default 0)')
     parser.add_argument('--rate-limit', type=float, default=0.0, help='Máximo de tentativas por segundo (0 = sem limite)')
-    parser.add_argument('--max-retries', type=int, default=0, help='Número máximo de tentativas adicionais para portas não abertas (default 0)')
+    parser.add_argument('--max-retries', type=int, default=0, help='Tentativas adicionais para portas não abertas (connect) ou rodadas de retransmissão das sem resposta (SYN) (default 0)')
     parser.add_argument('--retry-backoff', type=float, default=0.5, help='Backoff base em segundos entre tentativas (exponencial)')
+    parser.add_argument('--fast', action='store_true',
+                        help='SYN: pacotes de um template em bytes enviados por raw socket (sem Scapy por pacote)')
+    parser.add_argument('--min-rate', type=float, default=0.0,
+                        help='SYN: piso de pacotes/s do controle de congestionamento (default 0)')
+    parser.add_argument('--max-rate', type=float, default=0.0,
+                        help='SYN: teto de pacotes/s do controle de congestionamento (0 = sem teto; usa --rate-limit se dado)')
+    parser.add_argument('--adaptive-timeout', action='store_true',
+                        help='Timeout por alvo a partir do RTT medido (srtt + 4*rttvar); --timeout vira o valor inicial')
+    parser.add_argument('--retry-factor', type=float, default=0.5,
+                        help='SYN: fator do timeout a cada rodada de retransmissão (--max-retries rodadas, default 0.5)')
     parser.add_argument('--syn', action='store_true', help='Usar SYN scan com Scapy (requer Npcap/Admin)')
+    parser.add_argument('--syn-mode', choices=['batch', 'stateless'], default='batch',
+                        help='SYN scan: batch (lotes em pipeline, uma captura para o scan inteiro) ou stateless '
+                             '(sender/receiver separados, '
+                             'seq = cookie; use --rate-limit como pps)')
     parser.add_argument('--mac', action='store_true', help='Obter endereço MAC do alvo usando ARP (rede local)')
+    parser.add_argument('--neigh-cache', metavar='ARQUIVO',
+                        help='Com --mac: cache em disco (JSON) dos MACs resolvidos, reaproveitado entre execuções')
     parser.add_argument('--format', choices=['json', 'csv', 'ndjson', 'xml'], default='json', help='Formato de saída (padrão: json)')
     parser.add_argument('--only-open', action='store_true', help='Na tabela, mostrar apenas portas abertas (útil para scans grandes)')
     parser.add_argument('--banners', action='store_true', help='Tenta ler banner/versão das portas abertas (adiciona coluna VERSION)')
     parser.add_argument('--timing', metavar='T1-T5', help='Template de velocidade: T1(stealth)..T5(insane). Sobrescreve --workers/--timeout')
+    parser.add_argument('--engine', choices=['threads', 'asyncio', 'epoll'], default='threads',
+                        help='Engine do connect scan: threads (ThreadPoolExecutor), asyncio ou epoll '
+                             '(connect não bloqueante + selectors); asyncio/epoll usam 1 thread')
+    parser.add_argument('--concurrency', type=int, default=0,
+                        help='Conexões simultâneas nos engines asyncio/epoll (0 = 10x workers)')
+    parser.add_argument('--processes', '-P', type=int, default=1,
+                        help='Processos em paralelo; divide portas (ou hosts) em shards, um engine por processo (default 1)')
     grp = parser.add_mutually_exclusive_group()
     grp.add_argument('--pretty', dest='pretty', action='store_true', help='Mostrar saída formatada/colorida')
     grp.add_argument('--no-pretty', dest='pretty', action='store_false', help='Desabilitar saída formatada')
@@ -455,283 +1950,248 @@ def main():
             target=target, start=int(start), end=int(end),
             timeout=0.5, workers=int(workers) if not isinstance(workers, int) else workers,
             save=save, rate=0.0, syn=use_syn, mac=use_mac,
-            rate_limit=0.0, max_retries=0, retry_backoff=0.5,
+            rate_limit=0.0, max_retries=0, retry_backoff=0.5, retry_factor=0.5, adaptive_timeout=False,
+            min_rate=0.0, max_rate=0.0, fast=False,
             format=fmt, pretty=True, only_open=False, banners=use_banners,
-            timing=timing, target_ip='', elapsed=0, ip_version=4, method='connect'
+            timing=timing, target_ip='', elapsed=0, ip_version=4, method='connect',
+            engine='threads', concurrency=0, targets_file=None, processes=1,
+            syn_mode='batch'
         )
     else:
         args = parser.parse_args()
+        if not args.target and not args.targets_file:
+            parser.error('informe um alvo ou --targets-file')
 
-    # Resolve target to support IPv4 and IPv6
-    try:
-        addrinfos = socket.getaddrinfo(args.target, None)
-        family = addrinfos[0][0]
-        target_ip = addrinfos[0][4][0]
-        args.target_ip = target_ip
-        args.ip_version = 6 if family == socket.AF_INET6 else 4
-    except Exception as e:
-        print(Fore.RED + 'Falha ao resolver host:' + Style.RESET_ALL, e)
+    # Resolve alvos (IPv4/IPv6, hostnames, CIDR, intervalos e --targets-file)
+    specs = [args.target] if args.target else []
+    if getattr(args, 'targets_file', None):
+        try:
+            specs.extend(load_targets_file(args.targets_file))
+        except OSError as e:
+            print(Fore.RED + f'Falha ao ler arquivo de alvos: {e}' + Style.RESET_ALL)
+            return
+        if not args.target:
+            args.target = args.targets_file
+
+    def _resolve_error(spec, e):
+        print(Fore.RED + f'Falha ao resolver host {spec}:' + Style.RESET_ALL, e)
+
+    hosts = resolve_targets(specs, on_error=_resolve_error)
+    if not hosts:
+        print(Fore.RED + '[!] Nenhum alvo válido.' + Style.RESET_ALL)
         return
+    multi_host = len(hosts) > 1
+    _, target_ip, family = hosts[0]
+    args.target_ip = target_ip
+    args.ip_version = 6 if family == socket.AF_INET6 else 4
+    if multi_host:
+        args.hosts = hosts
+        args.host_macs = {}
 
     # Aplicar timing template (sobrescreve workers/timeout se --timing foi passado)
     apply_timing(args)
 
     mac_addr = None
     if getattr(args, 'mac', False):
-        if family == socket.AF_INET6:
-            print('MAC via ARP não aplicável a IPv6; pulando lookup de MAC para IPv6.')
-        else:
-            mac_addr = get_mac_for_ip(target_ip, args.timeout)
+        for label, host_ip, host_family in hosts:
+            if host_family == socket.AF_INET6:
+                print('MAC via ARP não aplicável a IPv6; pulando lookup de MAC para IPv6.')
+                continue
+            mac_addr = get_mac_for_ip(host_ip, args.timeout, getattr(args, 'neigh_cache', None))
+            prefix = f'{host_ip} ' if multi_host else ''
             if mac_addr:
-                print(f'MAC: {mac_addr}')
+                print(f'{prefix}MAC: {mac_addr}')
+                if multi_host:
+                    args.host_macs[host_ip] = mac_addr
+                else:
+                    args.mac_address = mac_addr
             else:
-                print('MAC não encontrado (pode estar fora da rede local ou bloqueado).')
+                print(f'{prefix}MAC não encontrado (pode estar fora da rede local ou bloqueado).')
 
     # === NOVO BLOCO SYN SCAN (BATCHING MODE) ===
     # Resolve OSError [Errno 22] no Windows reduzindo o número de sniffers abertos
     if getattr(args, 'syn', False):
         try:
-            from scapy.all import conf, IP, IPv6, TCP, sr, send, getmacbyip
+            from scapy.all import conf
         except Exception as e:
             print(Fore.RED + f'Scapy não disponível: {e}' + Style.RESET_ALL)
             return
 
         conf.verb = 0  # Silencia logs do Scapy
-        print(Fore.CYAN + f'Iniciando SYN scan otimizado (Batch Mode) em {target_ip}...' + Style.RESET_ALL)
+        start_time = time.time()
+        ports = range(max(1, args.start), min(65535, args.end) + 1)
+        results_by_host = {}
+        open_by_host = {}
 
-        # 1. Obter MAC estilo Nmap (ARP)
-        if args.mac and family == socket.AF_INET:
-            try:
-                mac = getmacbyip(target_ip)
-                if mac:
-                    print(Fore.YELLOW + f'MAC Address: {mac.upper()}' + Style.RESET_ALL)
-                    args.mac_address = mac
-            except Exception:
-                pass
+        if getattr(args, 'syn_mode', 'batch') == 'stateless':
+            print(Fore.CYAN + f'Iniciando SYN scan stateless em {len(hosts)} host(s), {len(ports)} porta(s)...' + Style.RESET_ALL)
+            for _, host_ip, _ in hosts:
+                results_by_host[host_ip] = {}
+                open_by_host[host_ip] = []
 
-        start_time = time.time()
-        ports = list(range(max(1, args.start), min(65535, args.end) + 1))
-        
-        # Dividir em blocos de 500 portas para não sobrecarregar o buffer do Npcap/Windows
-        # Isso reduz o número de sniffers de 8000 para ~16
-        chunk_size = 500
-        open_ports = []
-        results = {}
-
-        for i in range(0, len(ports), chunk_size):
-            batch = ports[i:i + chunk_size]
-            print(Fore.CYAN + f'  Escaneando lote {i//chunk_size + 1}: portas {batch[0]}-{batch[-1]}...' + Style.RESET_ALL)
-            
-            try:
-                # sr() envia o lote inteiro e espera respostas de uma vez (estilo Nmap)
-                # Usa APENAS 1 PIPE por lote, resolvendo OSError 22
-                if family == socket.AF_INET6:
-                    ans, unans = sr(IPv6(dst=target_ip)/TCP(dport=batch, flags="S"), 
-                                   timeout=args.timeout, verbose=0, retry=0)
-                else:
-                    ans, unans = sr(IP(dst=target_ip)/TCP(dport=batch, flags="S"), 
-                                   timeout=args.timeout, verbose=0, retry=0)
-
-                for sent, received in ans:
-                    sport = received.sport
-                    if received.haslayer(TCP):
-                        rflags = received[TCP].flags
-                        if rflags == 0x12:  # SYN-ACK
-                            service = get_service_name(sport)
-                            if sport not in open_ports:
-                                open_ports.append(sport)
-                                results[sport] = {'state': 'open', 'service': service}
-                                print(Fore.GREEN + f'  Open: {sport} ({service})' + Style.RESET_ALL)
-                        elif rflags == 0x14:  # RST-ACK
-                            service = get_service_name(sport)
-                            results[sport] = {'state': 'closed', 'service': service}
-                        else:
-                            service = get_service_name(sport)
-                            results[sport] = {'state': 'filtered', 'service': service}
-                
-                # Marcar portas que não responderam
-                for sent in unans:
-                    sport = sent[TCP].dport
-                    if sport not in results:
-                        results[sport] = {'state': 'filtered', 'service': get_service_name(sport)}
+            def _on_syn_result(host_ip, p, status):
+                service = get_service_name(p)
+                results_by_host[host_ip][p] = {'state': status, 'service': service}
+                if status == 'open':
+                    open_by_host[host_ip].append(p)
+                    where = f'{host_ip}:{p}' if multi_host else f'{p}'
+                    print(Fore.GREEN + f'  Open: {where} ({service})' + Style.RESET_ALL)
 
+            try:
+                stateless_syn_scan(hosts, ports, args.timeout, rate=args.rate_limit, on_result=_on_syn_result)
             except Exception as e:
-                print(Fore.RED + f'  Erro no lote {i//chunk_size + 1}: {e}' + Style.RESET_ALL)
-                # Continuar com próximo lote em caso de erro
+                print(Fore.RED + f'Falha no SYN scan stateless: {e}' + Style.RESET_ALL)
+                return
+        else:
+            args.syn_rounds = {}
+            rtt = RttEstimator(args.timeout, adaptive=getattr(args, 'adaptive_timeout', False))
+            where = f'{len(hosts)} hosts' if multi_host else target_ip
+            print(Fore.CYAN + f'Iniciando SYN scan otimizado (Batch Mode) em {where}...' + Style.RESET_ALL)
+            # O MAC (--mac) já veio do cache de vizinhos, antes do scan.
+            # Uma captura e uma janela de lotes para todos os hosts; o controle
+            # de congestionamento é um só, porque todos os SYNs saem pelo mesmo envio
+            cc = AimdController(batch=500, min_rate=getattr(args, 'min_rate', 0.0),
+                                max_rate=getattr(args, 'max_rate', 0.0) or args.rate_limit or None)
+            results_by_host, open_by_host = syn_scan_hosts(
+                hosts, ports, args.timeout,
+                retries=max(0, args.max_retries), retry_factor=args.retry_factor, round_stats=args.syn_rounds,
+                rtt=rtt, cc=cc, fast=getattr(args, 'fast', False))
+            args.syn_congestion = dict.fromkeys((ip for _, ip, _ in hosts), cc.summary())
+            args.rtt_stats = {ip: rtt.stats(ip) for _, ip, _ in hosts if rtt.stats(ip)}
 
         elapsed = time.time() - start_time
         print(Fore.CYAN + f'\nSYN scan completo em {elapsed:.2f}s' + Style.RESET_ALL)
-        print('Portas abertas:', sorted(open_ports))
+        for label, host_ip, _ in hosts:
+            prefix = f'{host_ip} — ' if multi_host else ''
+            print(f'{prefix}Portas abertas:', sorted(open_by_host[host_ip]))
+            rtt_stats = (getattr(args, 'rtt_stats', None) or {}).get(host_ip)
+            if rtt_stats:
+                print(Fore.CYAN + f'{prefix}{format_rtt(rtt_stats)}' + Style.RESET_ALL)
+        # Congestionamento: um controle para o scan inteiro (o mesmo em todos os hosts)
+        cc_stats = (getattr(args, 'syn_congestion', None) or {}).get(target_ip)
+        if cc_stats:
+            rate = f'{cc_stats["rate"]:.0f} pps' if cc_stats['rate'] else 'sem limite'
+            print(Fore.CYAN + f'Congestionamento: {cc_stats["decreases"]} redução(ões) em '
+                  f'{cc_stats["windows"]} lote(s); lote final {cc_stats["batch"]}, taxa final {rate}' + Style.RESET_ALL)
 
         if args.save:
             args.elapsed = elapsed
-            save_results(args.save, args.format, results, sorted(open_ports), 
-                        {p: results[p]['service'] for p in sorted(open_ports)}, args)
+            if multi_host:
+                results, open_ports = results_by_host, {ip: sorted(v) for ip, v in open_by_host.items()}
+                services_map = {}
+            else:
+                results, open_ports = results_by_host[target_ip], sorted(open_by_host[target_ip])
+                services_map = {p: results[p]['service'] for p in open_ports}
+            save_results(args.save, args.format, results, open_ports, services_map, args)
             print(Fore.GREEN + f'Resultados salvos em {args.save}' + Style.RESET_ALL)
         return
 
-    ports = list(range(max(1, args.start), min(65535, args.end) + 1))
-    total_ports = len(ports)
-    open_ports = []
-    results = {}
+    ports = range(max(1, args.start), min(65535, args.end) + 1)
+    total_ports = len(ports) * len(hosts)
+    results_by_host = {host_ip: {} for _, host_ip, _ in hosts}
+    open_by_host = {host_ip: [] for _, host_ip, _ in hosts}
 
-    print(Fore.CYAN + Style.BRIGHT + f'\nStarting scan — {args.target} ({target_ip})' + Style.RESET_ALL)
-    print(Fore.CYAN + f'Scanning {total_ports} ports ({args.start}-{args.end}) | workers={args.workers} | timeout={args.timeout}s' + Style.RESET_ALL)
+    engine = getattr(args, 'engine', 'threads') or 'threads'
+    timeout = args.timeout if args.timeout else 0.5
+
+    if multi_host:
+        print(Fore.CYAN + Style.BRIGHT + f'\nStarting scan — {args.target} ({len(hosts)} hosts)' + Style.RESET_ALL)
+    else:
+        print(Fore.CYAN + Style.BRIGHT + f'\nStarting scan — {args.target} ({target_ip})' + Style.RESET_ALL)
+    scope = f'{len(ports)} ports x {len(hosts)} hosts' if multi_host else f'{total_ports} ports'
+    if engine in ('asyncio', 'epoll'):
+        concurrency = fd_budget(getattr(args, 'concurrency', 0) or args.workers * 10)
+        concurrency = max(1, min(concurrency, total_ports))
+        print(Fore.CYAN + f'Scanning {scope} ({args.start}-{args.end}) | engine={engine} | concurrency={concurrency} | timeout={args.timeout}s' + Style.RESET_ALL)
+    else:
+        print(Fore.CYAN + f'Scanning {scope} ({args.start}-{args.end}) | workers={args.workers} | timeout={args.timeout}s' + Style.RESET_ALL)
+    if (getattr(args, 'processes', 1) or 1) > 1:
+        print(Fore.CYAN + f'Dividido em {args.processes} processos (limites acima repartidos entre eles)' + Style.RESET_ALL)
     start_time = time.time()
+    completed = 0
 
-    with ThreadPoolExecutor(max_workers=args.workers) as executor:
-        future_to_port = {}
-        tb = TokenBucket(args.rate_limit, capacity=max(1, args.workers)) if args.rate_limit and args.rate_limit > 0 else None
-        for p in ports:
-            if tb:
-                tb.consume()
-            future = executor.submit(
-                scan_port_with_retries, target_ip, p,
-                args.timeout if args.timeout else 0.5,
-                family, args.max_retries, args.retry_backoff
-            )
-            future_to_port[future] = p
-            if args.rate > 0:
-                time.sleep(args.rate)
-
-        completed = 0
-        for future in as_completed(future_to_port):
-            port = future_to_port[future]
-            completed += 1
-            try:
-                p, status = future.result()
-                service = get_service_name(p)
-                results[p] = {'state': status, 'service': service, 'version': ''}
-                if status == 'open':
-                    if p not in open_ports:
-                        open_ports.append(p)
-                    print(Fore.GREEN + f'  {p}/tcp  OPEN  {service}' + Style.RESET_ALL)
-            except Exception:
-                results[port] = {'state': 'error', 'service': 'unknown', 'version': ''}
+    last_progress = 0.0
 
-            # --- Barra de progresso com ETA ---
-            elapsed_now = time.time() - start_time
-            if elapsed_now > 0 and completed > 0:
-                eta = (elapsed_now / completed) * (total_ports - completed)
-                eta_str = f'{eta:.0f}s'
-            else:
-                eta_str = '?'
-            pct = completed / total_ports * 100
-            bar_len = 28
-            filled = int(bar_len * completed / total_ports)
-            bar = '=' * filled + ('>' if filled < bar_len else '') + ' ' * max(0, bar_len - filled - 1)
-            print(
-                f'\r  [{bar}] {pct:5.1f}%  ({completed}/{total_ports})  ETA: {eta_str}   ',
-                end='', flush=True
-            )
+    def _on_result(host_ip, p, status, service=None):
+        nonlocal completed, last_progress
+        completed += 1
+        if service is None:
+            service = get_service_name(p)
+        results_by_host[host_ip][p] = {'state': status, 'service': service, 'version': ''}
+        if status == 'open':
+            if p not in open_by_host[host_ip]:
+                open_by_host[host_ip].append(p)
+            where = f'{host_ip}:{p}' if multi_host else f'{p}'
+            print(Fore.GREEN + f'  {where}/tcp  OPEN  {service}' + Style.RESET_ALL)
+        # Progresso no máximo a cada 50 ms: em scans grandes o terminal custa mais que o scan
+        now = time.monotonic()
+        if now - last_progress >= 0.05 or completed == total_ports:
+            last_progress = now
+            _print_progress(completed, total_ports, start_time)
+
+    # Tarefas (host, port) intercaladas: um host lento não segura a janela inteira
+    processes = max(1, getattr(args, 'processes', 1) or 1)
+    rtt = RttEstimator(timeout, adaptive=getattr(args, 'adaptive_timeout', False))
+    engine_opts = dict(
+        workers=args.workers, concurrency=concurrency if engine in ('asyncio', 'epoll') else 0,
+        max_retries=args.max_retries, backoff=args.retry_backoff,
+        rate_limit=args.rate_limit, rate=args.rate, rtt=rtt,
+    )
+    if processes > 1:
+        # Limites globais divididos entre os processos
+        engine_opts['workers'] = max(1, args.workers // processes)
+        engine_opts['concurrency'] = max(1, engine_opts['concurrency'] // processes)
+        engine_opts['rate_limit'] = (args.rate_limit or 0.0) / processes
+        engine_opts['rate'] = (args.rate or 0.0) * processes
+
+        def _shard_error(shard_id, message):
+            print(Fore.RED + f'\n[!] Shard {shard_id} falhou: {message}' + Style.RESET_ALL)
+
+        scan_targets_sharded(hosts, ports, processes, engine, timeout,
+                             on_result=_on_result, on_error=_shard_error, **engine_opts)
+    else:
+        run_connect_engine(engine, interleave_targets(hosts, ports), timeout,
+                           on_result=_on_result, **engine_opts)
 
     print()  # Quebra a linha da barra de progresso
     elapsed = time.time() - start_time
+    args.rtt_stats = {ip: rtt.stats(ip) for _, ip, _ in hosts if rtt.stats(ip)}
 
     # --- Banner grabbing para portas abertas ---
     use_banners = getattr(args, 'banners', False)
-    if use_banners and open_ports:
-        print(Fore.CYAN + f'\n[*] Banner grabbing em {len(open_ports)} porta(s) abertas...' + Style.RESET_ALL)
-        for p in sorted(open_ports):
-            banner = grab_banner(target_ip, p, timeout=max(1.5, args.timeout * 3), family=family)
-            if banner:
-                results[p]['version'] = banner
-                print(Fore.GREEN + f'  {p}/tcp  {banner}' + Style.RESET_ALL)
-            else:
-                print(Fore.YELLOW + f'  {p}/tcp  (sem banner)' + Style.RESET_ALL)
+    for label, host_ip, host_family in hosts:
+        results = results_by_host[host_ip]
+        open_ports = open_by_host[host_ip]
+        if use_banners and open_ports:
+            print(Fore.CYAN + f'\n[*] Banner grabbing em {len(open_ports)} porta(s) abertas de {host_ip}...' + Style.RESET_ALL)
+            for p in sorted(open_ports):
+                banner = grab_banner(host_ip, p, timeout=max(1.5, args.timeout * 3), family=host_family)
+                if banner:
+                    results[p]['version'] = banner
+                    print(Fore.GREEN + f'  {p}/tcp  {banner}' + Style.RESET_ALL)
+                else:
+                    print(Fore.YELLOW + f'  {p}/tcp  (sem banner)' + Style.RESET_ALL)
 
     print(Fore.CYAN + f'\nScan concluído em {elapsed:.2f}s' + Style.RESET_ALL)
-    print(Fore.GREEN + f'Portas abertas ({len(open_ports)}): {sorted(open_ports)}' + Style.RESET_ALL)
-
-    # --- Monta linhas da tabela ---
-    all_rows = []  # (port_str, state, service, version)
-    for p in sorted(results.keys()):
-        info = results[p]
-        state   = info['state']   if isinstance(info, dict) else info
-        service = info.get('service', 'unknown') if isinstance(info, dict) else get_service_name(p)
-        version = info.get('version', '')        if isinstance(info, dict) else ''
-        if service is None:
-            service = 'unknown'
-        all_rows.append((f'{p}/tcp', state, service, version or ''))
-
-    # --- print_pretty estilo nmap ---
-    def print_pretty(rows, elapsed, target, target_ip, total_scanned, show_banners=False):
-        sep = '=' * 62
-        open_count  = sum(1 for r in rows if r[1] == 'open')
-        closed_count = total_scanned - len(rows)  # número de portas não mostradas
-
-        print()
-        print(Fore.CYAN + Style.BRIGHT + sep + Style.RESET_ALL)
-        print(Fore.CYAN + Style.BRIGHT + f'  Nmap-like scan report for {target} ({target_ip})' + Style.RESET_ALL)
-        print(Fore.CYAN + f'  Host is up  |  {open_count} open port(s)  |  elapsed {elapsed:.2f}s' + Style.RESET_ALL)
-        print(Fore.CYAN + Style.BRIGHT + sep + Style.RESET_ALL)
-
-        if closed_count > 0:
-            print(Fore.YELLOW + f'  Not shown: {closed_count} closed/filtered port(s)' + Style.RESET_ALL)
-
-        if not rows:
-            print(Fore.YELLOW + '  Nenhuma porta aberta encontrada.' + Style.RESET_ALL)
-            print(Fore.CYAN + Style.BRIGHT + sep + Style.RESET_ALL)
-            return
-
-        # Colunas dinâmicas
-        port_w    = max((len(r[0]) for r in rows), default=7)
-        state_w   = max((len(r[1]) for r in rows), default=5)
-        service_w = max((len(r[2]) for r in rows), default=7)
-        version_w = max((len(r[3]) for r in rows), default=7) if show_banners else 0
-
-        # Header
-        header = f"  {'PORT'.ljust(port_w)}  {'STATE'.ljust(state_w)}  {'SERVICE'.ljust(service_w)}"
-        if show_banners:
-            header += f"  {'VERSION'.ljust(version_w)}"
-        print()
-        print(Fore.CYAN + header + Style.RESET_ALL)
-        print(Fore.CYAN + '  ' + '-' * (len(header) - 2) + Style.RESET_ALL)
-
-        for row in rows:
-            port_str, state, service, version = row
-            color = Fore.GREEN if state == 'open' else (Fore.YELLOW if state in ('filtered', 'no-response') else Fore.RED)
-            state_txt = state.upper()
-            line = f"  {port_str.ljust(port_w)}  {color}{state_txt.ljust(state_w)}{Style.RESET_ALL}  {service.ljust(service_w)}"
-            if show_banners:
-                line += f"  {Fore.YELLOW}{version.ljust(version_w)}{Style.RESET_ALL}"
-            print(line)
-
-        print(Fore.CYAN + Style.BRIGHT + sep + Style.RESET_ALL)
-
-    only_open = getattr(args, 'only_open', False)
-    show_banners = getattr(args, 'banners', False)
-    # Por padrão no modo pretty mostra só open (estilo nmap). --no-only-open mostra tudo.
-    display_rows = [r for r in all_rows if r[1] == 'open'] if (only_open or getattr(args, 'pretty', False)) else all_rows
-
-    if getattr(args, 'pretty', False):
-        print_pretty(display_rows, elapsed, args.target, target_ip, len(all_rows), show_banners)
-    else:
-        rows_to_print = display_rows
-        if not rows_to_print:
-            print(Fore.YELLOW + 'Nenhuma porta encontrada.' + Style.RESET_ALL)
-        else:
-            port_w    = max(len(r[0]) for r in rows_to_print)
-            state_w   = max(len(r[1]) for r in rows_to_print)
-            service_w = max(len(r[2]) for r in rows_to_print)
-
-            print()
-            header = f"{'PORT'.ljust(port_w)}  {'STATE'.ljust(state_w)}  {'SERVICE'.ljust(service_w)}"
-            if show_banners:
-                version_w = max(len(r[3]) for r in rows_to_print)
-                header += f"  {'VERSION'.ljust(version_w)}"
-            print(header)
-            for row in rows_to_print:
-                port_str, state, service, version = row
-                color = Fore.GREEN if state == 'open' else (Fore.YELLOW if state in ('filtered', 'no-response') else Fore.RED)
-                line = f"{port_str.ljust(port_w)}  {color}{state.ljust(state_w)}{Style.RESET_ALL}  {service.ljust(service_w)}"
-                if show_banners:
-                    line += f"  {version.ljust(version_w)}"
-                print(line)
+    for label, host_ip, _ in hosts:
+        open_ports = open_by_host[host_ip]
+        prefix = f'{host_ip} — ' if multi_host else ''
+        print(Fore.GREEN + f'{prefix}Portas abertas ({len(open_ports)}): {sorted(open_ports)}' + Style.RESET_ALL)
+        if host_ip in args.rtt_stats:
+            print(Fore.CYAN + f'{prefix}{format_rtt(args.rtt_stats[host_ip])}' + Style.RESET_ALL)
+
+    for label, host_ip, _ in hosts:
+        if multi_host and not getattr(args, 'pretty', False):
+            print(Fore.CYAN + f'\n{label} ({host_ip})' + Style.RESET_ALL)
+        print_results_table(results_by_host[host_ip], elapsed, label if multi_host else args.target, host_ip, args)
 
     if args.save:
-        services_map = {p: (results[p]['service'] if isinstance(results[p], dict) else get_service_name(p)) for p in sorted(open_ports)}
         args.elapsed = elapsed
+        if multi_host:
+            results, open_ports, services_map = results_by_host, open_by_host, {}
+        else:
+            results, open_ports = results_by_host[target_ip], open_by_host[target_ip]
+            services_map = {p: (results[p]['service'] if isinstance(results[p], dict) else get_service_name(p)) for p in sorted(open_ports)}
         save_results(args.save, args.format, results, open_ports, services_map, args)
         print(Fore.GREEN + 'Resultados salvos em' + Style.RESET_ALL, args.save)
 
@@ -0,0 +1,646 @@
+#!/usr/bin/env python3
+"""
+send_log.py
+Log de envio do PacketSend em streaming (NDJSON, um registro por linha).
+
+Formato:
+    {"type": "header", ...campos constantes do envio...}
+    {"ts": ..., "src": ..., "dst": ..., "dport": ..., "sport": ..., ...}   # um por pacote
+    ...
+    {"type": "summary", "sent": ..., "elapsed": ..., ...}
+
+Os registros vão para um buffer que é gravado a cada `flush_records` registros
+ou `flush_ms` milissegundos, então a memória fica constante em envios longos e
+uma queda perde no máximo um buffer. Com `max_bytes`, o arquivo é rotacionado:
+o segmento cheio vira `nome.1.ndjson`, `nome.2.ndjson`... (ordem cronológica)
+e o arquivo ativo recomeça com um novo header. Com vários workers, cada um
+grava a sua parte (`nome.w0.ndjson`, ...) e o arquivo principal lista as
+partes no summary. Com --capture, as respostas casadas (SYN-ACK/RST, com RTT)
+vão para `nome.rtt.ndjson`, sempre em NDJSON.
+
+Formato binário (.pslog), para envios de dezenas de milhões de pacotes:
+    MAGIC | u32 tamanho | header JSON (campos constantes + tabela de destinos)
+    registros de 16 bytes: Δts em µs (u32), índice do destino (u32),
+                           sport (u16), dport (u16), seq (u32)
+    [summary JSON | u32 tamanho | MAGIC_END]     # ausente se o envio caiu
+~8x menor que o NDJSON e mapeável em memória (np.memmap) sem parse. Logs da
+versão 1 (índice do destino em u16, 14 bytes por registro) continuam legíveis.
+
+Conversão entre os formatos e análise (taxa, jitter, rajadas, pausas):
+    python send_log.py convert open_send_log.pslog open_send_log.ndjson
+    python send_log.py convert open_send_log.json open_send_log.pslog
+    python send_log.py analyze open_send_log.ndjson --window 1
+"""
+import argparse
+import glob
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:     # numpy é opcional: sem ele o leitor usa struct
+    np = None
+
+MAGIC = b'PSLOG\x00\x02\x00'
+MAGIC_V1 = b'PSLOG\x00\x01\x00'                 # v1: índice do destino em u16
+MAGIC_END = b'PSLOGEND'
+RECORD = struct.Struct('<IIHHI')                  # Δts_us, dst, sport, dport, seq
+RECORD_V1 = struct.Struct('<IHHHI')
+RECORD_FIELDS = ('dt_us', 'dst', 'sport', 'dport', 'seq')
+# Por versão: (struct do registro, dtypes NumPy dos campos)
+RECORD_LAYOUTS = {
+    MAGIC: (RECORD, ('<u4', '<u4', '<u2', '<u2', '<u4')),
+    MAGIC_V1: (RECORD_V1, ('<u4', '<u2', '<u2', '<u2', '<u4')),
+}
+
+
+def _split(path):
+    root, ext = os.path.splitext(path)
+    return root, ext or '.ndjson'
+
+
+def segment_path(path, n):
+    """Caminho do n-ésimo segmento rotacionado de `path` (n >= 1)."""
+    root, ext = _split(path)
+    return f'{root}.{n}{ext}'
+
+
+def part_path(path, worker):
+    """Caminho da parte do log gravada pelo worker `worker`."""
+    root, ext = _split(path)
+    return f'{root}.w{worker}{ext}'
+
+
+def reply_path(path):
+    """Caminho do log de respostas (um registro por SYN-ACK/RST casado, com RTT)."""
+    root, _ = os.path.splitext(path)
+    return f'{root}.rtt.ndjson'
+
+
+def segment_paths(path):
+    """Segmentos de `path` em ordem cronológica (rotacionados, depois o ativo)."""
+    root, ext = _split(path)
+    pattern = re.compile(re.escape(root) + r'\.(\d+)' + re.escape(ext) + '$')
+    rotated = []
+    for p in glob.glob(glob.escape(root) + '.*' + glob.escape(ext)):
+        m = pattern.match(p)
+        if m:
+            rotated.append((int(m.group(1)), p))
+    return [p for _, p in sorted(rotated)] + ([path] if os.path.exists(path) else [])
+
+
+class NdjsonLogWriter:
+    """Escritor NDJSON bufferizado, append-only, com rotação por tamanho."""
+
+    def __init__(self, path, header=None, flush_records=1000, flush_ms=200, max_bytes=0):
+        self.path = path
+        self.header = dict(header or {}, type='header')
+        self.flush_records = max(1, int(flush_records))
+        self.flush_interval = max(0.0, flush_ms / 1000.0)
+        self.max_bytes = int(max_bytes or 0)
+        self.records = 0
+        self.segments = 0
+        self._buf = []
+        self._size = 0
+        self._last_flush = time.monotonic()
+        for old in segment_paths(path):     # segmentos de um envio anterior
+            if old != path:
+                os.remove(old)
+        self._fh = open(path, 'w', encoding='utf-8')
+        self._write_line(self.header)
+        self._fh.flush()
+
+    def _write_line(self, record):
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        self._fh.write(line)
+        self._size += len(line)
+
+    def write(self, record):
+        """Adiciona um registro (dict) ao buffer."""
+        self.write_line(json.dumps(record, separators=(',', ':')))
+
+    def write_line(self, line):
+        """Adiciona um registro já serializado (JSON, sem '\\n') ao buffer."""
+        self._buf.append(line)
+        self.records += 1
+        if (len(self._buf) >= self.flush_records
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Grava o buffer no arquivo (uma escrita) e rotaciona se passou do limite."""
+        if self._buf:
+            data = '\n'.join(self._buf) + '\n'
+            self._buf.clear()
+            self._fh.write(data)
+            self._size += len(data)
+        self._fh.flush()
+        self._last_flush = time.monotonic()
+        if self.max_bytes and self._size >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self._fh.close()
+        self.segments += 1
+        os.replace(self.path, segment_path(self.path, self.segments))
+        self._fh = open(self.path, 'w', encoding='utf-8')
+        self._size = 0
+        self._write_line(dict(self.header, segment=self.segments))
+        self._fh.flush()
+
+    def close(self, summary=None):
+        """Grava o que restou no buffer e o registro de summary, e fecha."""
+        if self._fh.closed:
+            return
+        self.flush()
+        if summary is not None:
+            self._write_line(dict(summary, type='summary', records=self.records,
+                                  segments=self.segments + 1))
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BinaryLogWriter:
+    """Escritor do formato binário (.pslog): mesmo buffer/flush/rotação do
+    NdjsonLogWriter, mas um registro de 16 bytes por pacote. O header deve ter
+    `labels` (destinos, na ordem dos índices) e `ip_versions`. `t0` é o
+    instante base dos Δts (default: agora; na conversão, o do 1º pacote).
+    """
+
+    def __init__(self, path, header=None, flush_records=1000, flush_ms=200, max_bytes=0, t0=None):
+        self.path = path
+        self.header = dict(header or {}, type='header', format='pslog', record=list(RECORD_FIELDS))
+        self.flush_records = max(1, int(flush_records))
+        self.flush_interval = max(0.0, flush_ms / 1000.0)
+        self.max_bytes = int(max_bytes or 0)
+        self.records = 0
+        self.segments = 0
+        self._buf = bytearray()
+        self._pending = 0
+        self._size = 0
+        self._last_flush = time.monotonic()
+        for old in segment_paths(path):
+            if old != path:
+                os.remove(old)
+        self._open(int((time.time() if t0 is None else t0) * 1e6))
+
+    def _open(self, t0_us, **extra):
+        self._prev_us = t0_us
+        hdr = json.dumps(dict(self.header, t0_us=t0_us, **extra), separators=(',', ':')).encode()
+        self._fh = open(self.path, 'wb')
+        self._fh.write(MAGIC + struct.pack('<I', len(hdr)) + hdr)
+        self._fh.flush()
+        self._size = len(MAGIC) + 4 + len(hdr)
+
+    def write_packet(self, ts, dst, sport, dport, seq=0):
+        """Adiciona um pacote (ts em segundos, como time.time())."""
+        us = int(ts * 1e6)
+        dt = us - self._prev_us
+        if dt < 0:
+            dt = 0          # relógio de parede voltou: mantém a ordem
+        elif dt > 0xFFFFFFFF:
+            dt = 0xFFFFFFFF
+        self._prev_us += dt
+        self._buf += RECORD.pack(dt, dst, sport, dport, seq & 0xFFFFFFFF)
+        self._pending += 1
+        self.records += 1
+        if (self._pending >= self.flush_records
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Grava o buffer no arquivo (uma escrita) e rotaciona se passou do limite."""
+        if self._buf:
+            self._fh.write(self._buf)
+            self._size += len(self._buf)
+            self._buf.clear()
+            self._pending = 0
+        self._fh.flush()
+        self._last_flush = time.monotonic()
+        if self.max_bytes and self._size >= self.max_bytes:
+            self._fh.close()
+            self.segments += 1
+            os.replace(self.path, segment_path(self.path, self.segments))
+            self._open(self._prev_us, segment=self.segments)
+
+    def close(self, summary=None):
+        """Grava o que restou no buffer e o trailer com o summary, e fecha."""
+        if self._fh.closed:
+            return
+        self.flush()
+        if summary is not None:
+            data = json.dumps(dict(summary, type='summary', records=self.records,
+                                   segments=self.segments + 1), separators=(',', ':')).encode()
+            self._fh.write(data + struct.pack('<I', len(data)) + MAGIC_END)
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _log_files(path, summary):
+    """Segmentos do arquivo principal e das partes listadas no summary."""
+    files = []
+    for p in [path] + [os.path.join(os.path.dirname(path), os.path.basename(q))
+                       for q in (summary or {}).get('parts', [])]:
+        files.extend(segment_paths(p))
+    return files
+
+
+def is_binary_log(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) in RECORD_LAYOUTS
+
+
+def _binary_layout(path):
+    """(header, summary, offset dos registros, nº de registros, magic da
+    versão) de um .pslog."""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        magic = f.read(len(MAGIC))
+        if magic not in RECORD_LAYOUTS:
+            raise ValueError(f'{path}: não é um log binário do PacketSend')
+        record = RECORD_LAYOUTS[magic][0]
+        (hlen,) = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(hlen))
+        start = len(MAGIC) + 4 + hlen
+        summary = None
+        end = size
+        if size - start >= 4 + len(MAGIC_END):
+            f.seek(size - 4 - len(MAGIC_END))
+            tail = f.read()
+            if tail[4:] == MAGIC_END:
+                (slen,) = struct.unpack('<I', tail[:4])
+                f.seek(size - 4 - len(MAGIC_END) - slen)
+                summary = json.loads(f.read(slen))
+                end = size - 4 - len(MAGIC_END) - slen
+    return header, summary, start, (end - start) // record.size, magic
+
+
+def read_binary_log(path):
+    """Lê um segmento .pslog. Devolve (header, summary, colunas): `colunas` é um
+    dict ts (s), dst, sport, dport, seq — arrays NumPy sobre um mmap do arquivo
+    (só `ts` é materializado, por cumsum) ou, sem numpy, listas.
+    """
+    header, summary, start, count, magic = _binary_layout(path)
+    record, formats = RECORD_LAYOUTS[magic]
+    t0 = header['t0_us']
+    if np is not None:
+        dtype = np.dtype([(name, fmt) for name, fmt in zip(RECORD_FIELDS, formats)])
+        rec = (np.memmap(path, dtype=dtype, mode='r', offset=start, shape=(count,))
+               if count else np.zeros(0, dtype))
+        ts = (t0 + np.cumsum(rec['dt_us'], dtype=np.int64)) / 1e6
+        cols = {'ts': ts, 'dst': rec['dst'], 'sport': rec['sport'], 'dport': rec['dport'], 'seq': rec['seq']}
+        return header, summary, cols
+    cols = {'ts': [], 'dst': [], 'sport': [], 'dport': [], 'seq': []}
+    if count:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            us = t0
+            for dt, dst, sport, dport, seq in record.iter_unpack(mm[start:start + count * record.size]):
+                us += dt
+                cols['ts'].append(us / 1e6)
+                cols['dst'].append(dst)
+                cols['sport'].append(sport)
+                cols['dport'].append(dport)
+                cols['seq'].append(seq)
+    return header, summary, cols
+
+
+def _binary_entries(paths):
+    """Entradas (dicts no esquema do log JSON) de uma sequência de segmentos .pslog."""
+    for p in paths:
+        header, _, cols = read_binary_log(p)
+        labels = header.get('labels') or header.get('targets') or []
+        versions = header.get('ip_versions') or [header.get('ip_version', 4)] * len(labels)
+        src = header.get('src', 'default')
+        iface = header.get('iface')
+        for ts, dst, sport, dport, seq in zip(cols['ts'], cols['dst'], cols['sport'], cols['dport'], cols['seq']):
+            dst = int(dst)
+            yield {'ts': float(ts), 'src': src, 'dst': labels[dst], 'dport': int(dport), 'sport': int(sport),
+                   'seq': int(seq), 'iface': iface, 'ip_version': versions[dst]}
+
+
+def _last_record(path, block=65536):
+    """Último registro de um NDJSON, lendo só o fim do arquivo (None se truncado)."""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        end = pos = f.tell()
+        data = b''
+        while pos > 0:
+            pos = max(0, pos - block)
+            f.seek(pos)
+            data = f.read(end - pos)
+            if data.rstrip(b'\n').count(b'\n') >= 1 or pos == 0:
+                break
+    line = data.rstrip(b'\n').rsplit(b'\n', 1)[-1]
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+def _iter_file(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                return      # última linha truncada (queda no meio da escrita)
+
+
+def read_send_log(path):
+    """Lê um log de envio: NDJSON (com segmentos e partes) ou o JSON antigo
+    ({..., 'entries': [...]}) ou binário (.pslog). Devolve (header, summary, iterador de entradas);
+    summary é None se o envio não terminou (ex.: queda).
+    """
+    if is_binary_log(path):
+        # O summary fica no trailer do último segmento (o arquivo ativo)
+        header, summary, _, _, _ = _binary_layout(path)
+
+        return header, summary, _binary_entries(_log_files(path, summary))
+
+    with open(path, 'r', encoding='utf-8') as f:
+        first = f.readline()
+    try:
+        head = json.loads(first)
+    except ValueError:
+        head = None
+    if not isinstance(head, dict) or head.get('type') != 'header':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        entries = data.pop('entries', [])
+        return data, data, iter(entries)
+
+    summary = _last_record(path)
+    if not isinstance(summary, dict) or summary.get('type') != 'summary':
+        summary = None
+
+    def _entries():
+        for p in _log_files(path, summary):
+            for rec in _iter_file(p):
+                if 'type' not in rec:
+                    yield rec
+
+    return head, summary, _entries()
+
+
+# ---------------------------------------------------------------------------
+# Conversão entre formatos
+# ---------------------------------------------------------------------------
+
+_HEADER_KEYS = ('target', 'resolved_ip', 'port', 'ip_version', 'targets', 'ports', 'started', 'workers',
+                'labels', 'ip_versions', 'src', 'iface')
+
+
+def convert_log(src, dst):
+    """Converte um log de envio; o formato de saída vem da extensão de `dst`:
+    .pslog (binário), .ndjson (streaming) ou .json (JSON antigo, com 'entries').
+    Partes de workers viram um arquivo só. Devolve o número de entradas.
+    """
+    header, summary, entries = read_send_log(src)
+    header = {k: v for k, v in (header or {}).items() if k in _HEADER_KEYS}
+    summary = {k: v for k, v in (summary or {}).items()
+               if k not in ('type', 'records', 'segments', 'parts', 'format', 'record', 't0_us')} if summary else None
+    ext = os.path.splitext(dst)[1].lower()
+    n = 0
+    if ext == '.pslog':
+        # As partes dos workers se sobrepõem no tempo; Δts exige ordem
+        entries = sorted(entries, key=lambda e: e['ts'])
+        labels = list(header.get('labels') or [])
+        for e in entries:
+            if e['dst'] not in labels:
+                labels.append(e['dst'])
+        index = {label: i for i, label in enumerate(labels)}
+        versions = {e['dst']: e.get('ip_version', 4) for e in entries}
+        header['labels'] = labels
+        header['ip_versions'] = [versions.get(label, header.get('ip_version', 4)) for label in labels]
+        if entries:
+            header.setdefault('src', entries[0].get('src'))
+            header.setdefault('iface', entries[0].get('iface'))
+        t0 = entries[0]['ts'] if entries else None
+        with BinaryLogWriter(dst, header, flush_records=65536, t0=t0) as w:
+            for e in entries:
+                w.write_packet(e['ts'], index[e['dst']], e.get('sport', 0), e['dport'], e.get('seq', 0))
+                n += 1
+            w.close(summary=summary)
+    elif ext == '.json':
+        data = dict(header)
+        data.update(summary or {})
+        data['entries'] = list(entries)
+        n = len(data['entries'])
+        with open(dst, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+    else:
+        with NdjsonLogWriter(dst, header, flush_records=65536) as w:
+            for e in entries:
+                w.write(e)
+                n += 1
+            w.close(summary=summary)
+    return n
+
+
+# ---------------------------------------------------------------------------
+# Análise (NumPy)
+# ---------------------------------------------------------------------------
+
+def load_log_arrays(path):
+    """Carrega um log (qualquer formato, com segmentos e partes) em arrays NumPy
+    ordenados por ts. Devolve (header, summary, cols) com cols ts (float64, s),
+    dst (índice em header['labels']), sport, dport e seq. Requer numpy.
+    """
+    if np is None:
+        raise RuntimeError('numpy não instalado (pip install numpy)')
+    fields = ('dst', 'sport', 'dport', 'seq')
+    if is_binary_log(path):
+        header, summary, _, _, _ = _binary_layout(path)
+        parts = [read_binary_log(p)[2] for p in _log_files(path, summary)]
+        cols = {k: np.concatenate([np.asarray(p[k]) for p in parts]) if parts else np.zeros(0)
+                for k in ('ts',) + fields}
+    else:
+        header, summary, entries = read_send_log(path)
+        header = dict(header or {})
+        labels = {label: i for i, label in enumerate(header.get('labels') or [])}
+        ts, dst, sport, dport, seq = [], [], [], [], []
+        for e in entries:
+            ts.append(e['ts'])
+            dst.append(labels.setdefault(e.get('dst'), len(labels)))
+            sport.append(e.get('sport', 0))
+            dport.append(e.get('dport', 0))
+            seq.append(e.get('seq', 0))
+        header['labels'] = list(labels)
+        cols = {'ts': np.asarray(ts, dtype=np.float64), 'dst': np.asarray(dst, dtype=np.uint32),
+                'sport': np.asarray(sport, dtype=np.uint16), 'dport': np.asarray(dport, dtype=np.uint16),
+                'seq': np.asarray(seq, dtype=np.uint32)}
+    ts = cols['ts']
+    if ts.size > 1 and np.any(ts[1:] < ts[:-1]):       # partes de workers intercaladas
+        order = np.argsort(ts, kind='stable')
+        cols = {k: v[order] for k, v in cols.items()}
+    return header, summary, cols
+
+
+def _runs(mask):
+    """(início, fim exclusivo) das sequências de True em `mask`."""
+    edges = np.diff(np.concatenate(([False], mask, [False])).astype(np.int8))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def analyze_send_log(path, window=1.0, burst_gap=1e-5, stall_factor=10.0, top=5):
+    """Estatísticas de um log de envio, vetorizadas:
+    - taxa em janelas deslizantes de `window` s (passo window/4);
+    - percentis do intervalo entre pacotes;
+    - rajadas: sequências de pacotes com intervalo <= `burst_gap`;
+    - pausas: intervalos > `stall_factor` × intervalo esperado (1/pps alvo,
+      ou o intervalo médio entre envios fora de rajadas sem pacing);
+    - enviados × capturados e respostas/perda/RTT, se o log tiver o bloco `captured`.
+    """
+    header, summary, cols = load_log_arrays(path)
+    ts = cols['ts']
+    n = int(ts.size)
+    report = {'path': path, 'packets': n, 'logged_sent': (summary or {}).get('sent')}
+    if n == 0:
+        return report
+    t0 = float(ts[0])
+    duration = float(ts[-1] - t0)
+    report['duration_s'] = duration
+    report['mean_pps'] = (n - 1) / duration if duration > 0 else None
+
+    # Taxa em janelas deslizantes: contagem por busca binária nos ts ordenados
+    if duration > window:
+        starts = np.arange(t0, ts[-1] - window + 1e-12, window / 4)
+        counts = np.searchsorted(ts, starts + window, 'left') - np.searchsorted(ts, starts, 'left')
+        pps = counts / window
+        report['window_pps'] = {
+            'window_s': window, 'windows': int(pps.size), 'min': float(pps.min()),
+            'p5': float(np.percentile(pps, 5)), 'p50': float(np.percentile(pps, 50)), 'max': float(pps.max()),
+        }
+
+    gaps = np.diff(ts)
+    if gaps.size:
+        pct = np.percentile(gaps, [50, 90, 99, 99.9])
+        report['gap_ms'] = {
+            'mean': float(gaps.mean() * 1e3), 'std': float(gaps.std() * 1e3),
+            'p50': float(pct[0] * 1e3), 'p90': float(pct[1] * 1e3), 'p99': float(pct[2] * 1e3),
+            'p99.9': float(pct[3] * 1e3), 'max': float(gaps.max() * 1e3),
+        }
+
+        # Rajadas: k intervalos curtos seguidos = k + 1 pacotes
+        b_start, b_end = _runs(gaps <= burst_gap)
+        sizes = b_end - b_start + 1
+        report['bursts'] = {
+            'gap_threshold_ms': burst_gap * 1e3, 'count': int(sizes.size),
+            'packets_in_bursts': int(sizes.sum()), 'mean_size': float(sizes.mean()) if sizes.size else 0.0,
+            'max_size': int(sizes.max()) if sizes.size else 0,
+        }
+
+        # Intervalo esperado entre envios: pelo alvo do pacing ou, sem ele, a
+        # média entre envios distintos (pacotes de um mesmo lote têm o mesmo ts)
+        pacing = (summary or {}).get('pacing') or {}
+        target = pacing.get('target_pps')
+        event_gaps = gaps[gaps > burst_gap]
+        expected = 1.0 / target if target else float(event_gaps.mean() if event_gaps.size else gaps.mean())
+        threshold = stall_factor * expected
+        idx = np.flatnonzero(gaps > threshold)
+        longest = idx[np.argsort(gaps[idx])[::-1][:top]]
+        report['stalls'] = {
+            'threshold_ms': threshold * 1e3, 'count': int(idx.size),
+            'total_s': float(gaps[idx].sum()),
+            'longest': [{'at_s': float(ts[i] - t0), 'gap_ms': float(gaps[i] * 1e3)} for i in longest],
+        }
+
+    captured = (summary or {}).get('captured')
+    if captured is not None:
+        syns = int(captured.get('syns', 0))
+        sent = int((summary or {}).get('sent', n))
+        report['capture'] = {'sent': sent, 'captured': syns, 'missing': sent - syns,
+                             'ratio': syns / sent if sent else None}
+        if 'answered' in captured:
+            report['replies'] = {k: captured.get(k) for k in
+                                 ('answered', 'synack', 'rst', 'lost', 'loss_rate', 'rtt_ms', 'rtt_max_ms')}
+    return report
+
+
+def print_report(r):
+    print(f'[*] {r["path"]}: {r["packets"]} pacotes'
+          + (f' (summary: {r["logged_sent"]} enviados)' if r.get('logged_sent') is not None else ''))
+    if r['packets'] == 0:
+        return
+    mean = f'{r["mean_pps"]:.1f}' if r.get('mean_pps') else '-'
+    print(f'    Duração: {r["duration_s"]:.3f}s, taxa média {mean} pps')
+    w = r.get('window_pps')
+    if w:
+        print(f'    Taxa em janelas de {w["window_s"]}s ({w["windows"]}): mín {w["min"]:.1f}, '
+              f'p5 {w["p5"]:.1f}, mediana {w["p50"]:.1f}, máx {w["max"]:.1f} pps')
+    g = r.get('gap_ms')
+    if g:
+        print(f'    Intervalo (ms): média {g["mean"]:.4f} ± {g["std"]:.4f}, p50 {g["p50"]:.4f}, '
+              f'p90 {g["p90"]:.4f}, p99 {g["p99"]:.4f}, p99.9 {g["p99.9"]:.4f}, máx {g["max"]:.4f}')
+        b = r['bursts']
+        print(f'    Rajadas (intervalo <= {b["gap_threshold_ms"]:.3f} ms): {b["count"]}, '
+              f'{b["packets_in_bursts"]} pacotes, tamanho médio {b["mean_size"]:.1f}, máx {b["max_size"]}')
+        s = r['stalls']
+        print(f'    Pausas (> {s["threshold_ms"]:.3f} ms): {s["count"]}, total {s["total_s"]:.3f}s')
+        for st in s['longest']:
+            print(f'      em {st["at_s"]:.3f}s: {st["gap_ms"]:.3f} ms')
+    c = r.get('capture')
+    if c:
+        ratio = f'{c["ratio"] * 100:.2f}%' if c['ratio'] is not None else '-'
+        print(f'    Captura: {c["captured"]}/{c["sent"]} SYNs vistos ({ratio}), {c["missing"]} faltando')
+    rep = r.get('replies')
+    if rep:
+        loss = f'{rep["loss_rate"] * 100:.2f}%' if rep['loss_rate'] is not None else '-'
+        print(f'    Respostas: {rep["synack"]} SYN-ACK, {rep["rst"]} RST, {rep["lost"]} sem resposta (perda {loss})')
+        if rep['rtt_ms']:
+            print('    RTT (ms): ' + ', '.join(f'{k} {v:.3f}' for k, v in rep['rtt_ms'].items())
+                  + f', máx {rep["rtt_max_ms"]:.3f}')
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Ferramentas para o log de envio do PacketSend')
+    sub = p.add_subparsers(dest='cmd', required=True)
+    conv = sub.add_parser('convert', help='Converte entre .json, .ndjson e .pslog (pela extensão)')
+    conv.add_argument('src')
+    conv.add_argument('dst')
+    an = sub.add_parser('analyze', help='Taxa em janelas, percentis de intervalo, rajadas e pausas')
+    an.add_argument('log')
+    an.add_argument('--window', type=float, default=1.0, help='Janela da taxa deslizante em s (default: 1)')
+    an.add_argument('--burst-gap', type=float, default=1e-5,
+                    help='Intervalo máximo (s) entre pacotes de uma rajada (default: 1e-5)')
+    an.add_argument('--stall-factor', type=float, default=10.0,
+                    help='Pausa = intervalo > N × o esperado (default: 10)')
+    an.add_argument('--json', action='store_true', help='Imprime o relatório em JSON')
+    args = p.parse_args(argv)
+    if args.cmd == 'convert':
+        n = convert_log(args.src, args.dst)
+        print(f'[+] {n} entradas: {args.src} → {args.dst} ({os.path.getsize(args.dst)} bytes)')
+    elif args.cmd == 'analyze':
+        try:
+            report = analyze_send_log(args.log, window=args.window, burst_gap=args.burst_gap,
+                                      stall_factor=args.stall_factor)
+        except RuntimeError as e:
+            print(f'[!] {e}')
+            return 1
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print_report(report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
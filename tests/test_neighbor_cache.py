@@ -0,0 +1,86 @@
+import socket
+import struct
+import sys
+
+import pytest
+
+import neighbor_cache as nc
+
+
+def _neigh(family, ip, mac, state=0x02):
+    """Mensagem RTM_NEWNEIGH com NDA_DST e NDA_LLADDR."""
+    def attr(atype, value):
+        return struct.pack('=HH', 4 + len(value), atype) + value + b'\0' * (-len(value) % 4)
+    body = nc.NDMSG.pack(family, 2, state, 0, 1) + attr(nc.NDA_DST, socket.inet_pton(family, ip))
+    if mac is not None:
+        body += attr(nc.NDA_LLADDR, bytes.fromhex(mac.replace(':', '')))
+    return nc.NLMSGHDR.pack(16 + len(body), nc.RTM_NEWNEIGH, 2, 1, 0) + body
+
+
+def test_parse_neigh_messages_and_proc_arp(tmp_path):
+    data = (_neigh(socket.AF_INET, '192.168.0.1', '02:AA:00:00:00:01')
+            + _neigh(socket.AF_INET6, 'fe80::1', '02:aa:00:00:00:02')
+            + _neigh(socket.AF_INET, '192.168.0.9', None, state=nc.NUD_INCOMPLETE)
+            + _neigh(socket.AF_INET, '192.168.0.8', '00:00:00:00:00:00')
+            + nc.NLMSGHDR.pack(20, nc.NLMSG_DONE, 2, 1, 0) + b'\0' * 4)
+    entries, done = nc.parse_neigh_messages(data)
+    assert done and entries == [('192.168.0.1', '02:aa:00:00:00:01', 0x02),
+                                ('fe80::1', '02:aa:00:00:00:02', 0x02)]
+    with pytest.raises(OSError):
+        nc.parse_neigh_messages(nc.NLMSGHDR.pack(36, nc.NLMSG_ERROR, 0, 1, 0) + struct.pack('=i', -1) + b'\0' * 16)
+
+    arp = tmp_path / 'arp'
+    arp.write_text('IP address       HW type     Flags       HW address            Mask     Device\n'
+                   '10.0.0.1         0x1         0x2         02:00:00:00:00:01     *        eth0\n'
+                   '10.0.0.2         0x1         0x0         00:00:00:00:00:00     *        eth0\n')
+    assert nc.read_proc_arp(str(arp)) == {'10.0.0.1': '02:00:00:00:00:01'}
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='rtnetlink só no Linux')
+def test_netlink_dump_agrees_with_proc_arp():
+    table = nc.netlink_neighbors()
+    v4 = {ip: mac for ip, mac in table.items() if ':' not in ip}
+    assert v4 == nc.read_proc_arp()
+    assert all(mac.count(':') == 5 and not mac.startswith('33:33') for mac in table.values())
+
+
+class _Relogio:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+def test_cache_reads_table_once_and_probes_only_on_miss(tmp_path, monkeypatch):
+    monkeypatch.setattr(nc, 'is_on_link', lambda ip: True)
+    kernel = {'10.0.0.1': '02:00:00:00:00:01', '10.0.0.2': '02:00:00:00:00:02'}
+    probes = []
+
+    def prober(ip, family):
+        probes.append(ip)
+        if ip == '10.0.0.3':
+            kernel[ip] = '02:00:00:00:00:03'        # o vizinho responde à sonda
+
+    clock = _Relogio()
+    path = str(tmp_path / 'neigh.json')
+    cache = nc.NeighborCache(ttl=60, negative_ttl=5, path=path, table=lambda: dict(kernel),
+                             prober=prober, clock=clock)
+    assert cache.lookup_many(['10.0.0.1', '10.0.0.2']) == {'10.0.0.1': '02:00:00:00:00:01',
+                                                           '10.0.0.2': '02:00:00:00:00:02'}
+    assert cache.stats['table_reads'] == 1 and probes == []
+    assert cache.lookup('10.0.0.3', timeout=1.0) == '02:00:00:00:00:03' and probes == ['10.0.0.3']
+    assert cache.lookup('10.0.0.4', timeout=0.05) is None
+    assert cache.lookup('10.0.0.4', timeout=0.05) is None and probes.count('10.0.0.4') == 1   # falta em cache
+    assert cache.lookup('127.0.0.1') is None and '127.0.0.1' not in probes
+    assert cache.lookup('host-que-nao-resolve') is None and 'host-que-nao-resolve' not in probes
+    clock.t += 6
+    assert cache.lookup('10.0.0.4', timeout=0.05) is None and probes.count('10.0.0.4') == 2
+
+    # Cache em disco: outro processo acha sem tabela nem sonda, até o TTL vencer
+    kernel.clear()
+    fresh = nc.NeighborCache(ttl=60, path=path, table=dict, prober=prober, clock=clock)
+    assert fresh.lookup('10.0.0.3') == '02:00:00:00:00:03' and fresh.stats['probes'] == 0
+    clock.t += 60
+    stale = nc.NeighborCache(ttl=60, path=path, table=dict, prober=prober, clock=clock)
+    assert stale.lookup('10.0.0.1', timeout=0.05) is None and stale.stats['probes'] == 1
@@ -0,0 +1,63 @@
+import socket
+
+import pytest
+
+import net_common
+import packet_templates
+
+
+# ---------------------------------------------------------------------------
+# Testes: multi-host (CIDR, intervalos, arquivo de alvos)
+# ---------------------------------------------------------------------------
+
+def test_expand_target_spec_cidr():
+    assert net_common.expand_target_spec('10.0.0.0/30') == ['10.0.0.1', '10.0.0.2']
+
+
+def test_expand_target_spec_ranges_and_lists():
+    assert net_common.expand_target_spec('10.0.0.1-3') == ['10.0.0.1', '10.0.0.2', '10.0.0.3']
+    assert net_common.expand_target_spec('10.0.0.9-10.0.0.10,my-host') == ['10.0.0.9', '10.0.0.10', 'my-host']
+
+
+def test_expand_target_spec_rejects_huge_specs_before_expanding():
+    for spec in ('2001:db8::/64', '10.0.0.0/8', '10.0.0.0-10.255.255.255'):
+        with pytest.raises(ValueError, match='grande demais'):
+            net_common.expand_target_spec(spec)
+    errors = []
+    assert net_common.resolve_targets(['2001:db8::/64', '10.0.0.1'], on_error=lambda s, e: errors.append(s)) \
+        == [('10.0.0.1', '10.0.0.1', socket.AF_INET)]
+    assert errors == ['2001:db8::/64']
+
+
+def test_load_targets_file_and_resolve(tmp_path):
+    path = tmp_path / 'targets.txt'
+    path.write_text('# lab\n127.0.0.1\n127.0.0.1-2, ::1\n', encoding='utf-8')
+    hosts = net_common.resolve_targets(net_common.load_targets_file(str(path)))
+    assert [ip for _, ip, _ in hosts] == ['127.0.0.1', '127.0.0.2', '::1']
+    assert hosts[2][2] == socket.AF_INET6
+
+
+def test_interleave_targets_is_port_major():
+    hosts = [('a', '10.0.0.1', socket.AF_INET), ('b', '10.0.0.2', socket.AF_INET)]
+    tasks = list(net_common.interleave_targets(hosts, range(1, 3)))
+    assert [(h, p) for h, p, _ in tasks] == [
+        ('10.0.0.1', 1), ('10.0.0.2', 1), ('10.0.0.1', 2), ('10.0.0.2', 2)
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Testes: respostas TCP por bytes
+# ---------------------------------------------------------------------------
+
+def test_ether_tcp_segment_ipv4_vlan_and_non_tcp():
+    seg = packet_templates.build_syn_segment('10.0.0.1', '10.0.0.2', 40000, 80, 1)
+    ip = packet_templates.build_ipv4_header('10.0.0.1', '10.0.0.2', len(seg))
+    eth = b'\x00' * 12 + b'\x08\x00'
+    fam, src, dst, tcp = net_common.ether_tcp_segment(eth + ip + seg + b'\x00' * 6)  # padding Ethernet
+    assert fam == socket.AF_INET and tcp == seg
+    assert (socket.inet_ntoa(src), socket.inet_ntoa(dst)) == ('10.0.0.1', '10.0.0.2')
+    vlan = b'\x00' * 12 + b'\x81\x00\x00\x05\x08\x00'
+    assert net_common.ether_tcp_segment(vlan + ip + seg)[3] == seg
+    udp = bytearray(ip)
+    udp[9] = socket.IPPROTO_UDP
+    assert net_common.ether_tcp_segment(eth + bytes(udp) + seg) is None
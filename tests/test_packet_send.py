@@ -0,0 +1,198 @@
+import json
+import socket
+
+import PacketSend
+
+
+def test_sendmmsg_backend_delivers_batch_in_order():
+    a, b = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        tx = PacketSend.SendmmsgBackend(a, layer=2, max_batch=4)
+        pkts = [bytes([i]) * (10 + i) for i in range(10)]   # 10 pacotes > max_batch: 3 syscalls
+        assert tx.send_batch(pkts) == 10
+        b.settimeout(1)
+        assert [b.recv(64) for _ in pkts] == pkts
+    finally:
+        a.close()
+        b.close()
+
+
+def test_sendmmsg_backend_sends_oversized_frames_separately():
+    a, b = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        tx = PacketSend.SendmmsgBackend(a, layer=2, max_batch=4, slot=64)
+        pkts = [b'a' * 10, b'B' * 200, b'c' * 64, b'd' * 65, b'e' * 5]
+        assert tx.send_batch(pkts) == 5
+        b.settimeout(1)
+        assert [b.recv(512) for _ in pkts] == pkts
+    finally:
+        a.close()
+        b.close()
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, s):
+        self.slept.append(s)
+        self.now += s
+
+
+def test_deadline_scheduler_keeps_schedule_and_bursts_when_late():
+    clk = _FakeClock()
+    sched = PacketSend.DeadlineScheduler(1000, max_burst=8, spin=0, clock=clk, sleep=clk.sleep)
+    for _ in range(5):
+        n = sched.wait()
+        assert n == 1
+        sched.record(n)
+    assert abs(clk.now - 0.004) < 1e-9          # deadline absoluto: k / pps, sem deriva
+
+    clk.now += 0.020                            # travou 20 ms: ~20 pacotes atrasados
+    assert sched.wait() == 8                    # rajada limitada a max_burst
+    sched.record(8)
+    assert sched.wait(limit=3) == 3
+    st = sched.stats()
+    assert st['target_pps'] == 1000 and st['max_late_ms'] >= 19
+
+
+def test_deadline_scheduler_ramp_profiles():
+    lin = PacketSend.DeadlineScheduler(100, ramp=2.0, profile='linear')
+    assert lin.deadline(0) == 0
+    assert abs(lin.deadline(100) - 2.0) < 1e-9          # área da rampa linear: pps * ramp / 2
+    assert abs(lin.deadline(200) - 3.0) < 1e-9          # depois, taxa cheia
+    step = PacketSend.DeadlineScheduler(100, ramp=4.0, profile='step')
+    assert abs(step.deadline(25) - 1.0) < 1e-9          # 1º degrau: 25 pps
+    assert abs(step._due_at(step.deadline(160)) - 160) < 1e-9
+
+
+def test_parse_port_spec_lists_and_ranges():
+    assert PacketSend.parse_port_spec(80) == [80]
+    assert PacketSend.parse_port_spec('22, 80,8000-8002') == [22, 80, 8000, 8001, 8002]
+    for bad in ('0', '70000', '90-80', ''):
+        try:
+            PacketSend.parse_port_spec(bad)
+        except ValueError:
+            continue
+        raise AssertionError(bad)
+
+
+def test_gerador_syn_interleaves_targets_and_source_ports():
+    destinos = [('10.0.0.1', '10.0.0.1', False), ('10.0.0.2', '10.0.0.2', False)]
+    seq = PacketSend.GeradorSyn(destinos, [80, 443], layer=3, sport=65535, sport_mode='seq')
+    assert [seq.fluxo(k) for k in range(5)] == [
+        (0, 80, 65535), (1, 80, 1024), (0, 443, 1025), (1, 443, 1026), (0, 80, 1027)]
+    data, idx, dport, sport, _ = seq.pacote(2)
+    assert len(data) == 40 and data[16:20] == bytes([10, 0, 0, 1])
+    assert int.from_bytes(data[22:24], 'big') == 443 and int.from_bytes(data[20:22], 'big') == 1025
+
+    rnd = PacketSend.GeradorSyn(destinos, [80], layer=3, sport_mode='random', seed=1)
+    assert all(1024 <= rnd.fluxo(k)[2] <= 65535 for k in range(100))
+    assert len({rnd.fluxo(k)[2] for k in range(100)}) > 50
+
+
+def test_cota_splits_count_across_workers():
+    assert [PacketSend._cota(10, w, 3) for w in range(3)] == [4, 3, 3]
+    assert sum(PacketSend._cota(1001, w, 4) for w in range(4)) == 1001
+
+
+def test_metricas_envio_and_stats_outputs(tmp_path):
+    m = PacketSend.MetricasEnvio(workers=2)
+    m.add(0, 64, 3456)
+    m.add(1, 10, 540)
+    m.add(0, 1, 54)
+    assert m.totais() == {'sent': 75, 'bytes': 4050, 'batches': 3}
+    assert m.por_worker()[1] == {'sent': 10, 'bytes': 540, 'batches': 1}
+
+    jsonl = tmp_path / 'st.jsonl'
+    rep = PacketSend.RelatorioStatus(m, interval=0, stats_file=str(jsonl), extra=lambda: {'captured': 7})
+    rep.tick()
+    m.add(1, 25, 1350)
+    rep.stop()
+    lines = [json.loads(l) for l in jsonl.read_text().splitlines()]
+    assert [l['sent'] for l in lines] == [75, 100] and lines[-1]['captured'] == 7
+
+    prom = PacketSend.formatar_prometheus(lines[-1])
+    assert 'packetsend_packets_sent_total{worker="1"} 35' in prom
+    assert 'packetsend_captured_syns_total 7' in prom
+    assert '# TYPE packetsend_send_rate_pps gauge' in prom
+
+
+def test_histograma_latencia_buckets_and_percentiles():
+    h = PacketSend.HistogramaLatencia()
+    for v in range(1, 100001):                      # 1 µs .. 100 ms, uniforme
+        h.record(v)
+    assert h.total == 100000 and h.max == 100000
+    for p in (50, 90, 99):
+        exact = p * 1000
+        assert abs(h.percentile(p) - exact) / exact < 1 / 64
+    assert h.percentile(100) == 100000
+    # Buckets contíguos: cada índice volta ao seu menor valor
+    for v in (0, 127, 128, 129, 1000, 65535, 10 ** 7):
+        idx = h._index(v)
+        assert h._lower(idx) <= v <= h._upper(idx)
+    assert sum(c for _, c in h.buckets()) == h.total
+
+
+def _syn(sport, dport, seq, flags=0x02, ack=0):
+    import struct
+    return struct.pack('!HHIIBBHHH', sport, dport, seq, ack, 5 << 4, flags, 1024, 0, 0)
+
+
+def test_correlacao_respostas_matches_by_sport_seq_and_expires():
+    me, alvo = socket.inet_aton('10.0.0.1'), socket.inet_aton('10.0.0.2')
+    got = []
+    c = PacketSend.CorrelacaoRespostas({alvo}, timeout=1.0, on_reply=got.append)
+    c.on_segment(me, alvo, _syn(40000, 80, 100), 10.0, saida=True)
+    c.on_segment(me, alvo, _syn(40001, 80, 200), 10.0, saida=True)
+    c.on_segment(me, alvo, _syn(40002, 81, 300), 10.0, saida=True)
+    # Cópia de entrada da loopback: não conta de novo
+    c.on_segment(me, alvo, _syn(40000, 80, 100), 10.0, saida=False)
+    # Respostas fora de ordem; a cópia de saída (direção errada) é ignorada
+    c.on_segment(alvo, me, _syn(80, 40001, 7, flags=0x14, ack=201), 10.002, saida=True)
+    c.on_segment(alvo, me, _syn(80, 40001, 7, flags=0x14, ack=201), 10.002, saida=False)
+    c.on_segment(alvo, me, _syn(80, 40000, 5, flags=0x12, ack=101), 10.005, saida=False)
+    c.on_segment(alvo, me, _syn(80, 40000, 5, flags=0x12, ack=101), 10.006, saida=False)   # duplicada
+    assert [(r['sport'], r['reply']) for r in got] == [(40001, 'rst'), (40000, 'synack')]
+    assert abs(got[1]['rtt_ms'] - 5.0) < 0.01
+    c.expire(12.0)
+    st = c.stats()
+    assert (st['syns'], st['synack'], st['rst'], st['lost']) == (3, 1, 1, 1)
+    assert st['loss_rate'] == round(1 / 3, 6) and st['unmatched_replies'] == 1
+    assert not c.pending and 2.0 <= st['rtt_ms']['p50'] <= 5.1
+
+
+def test_gerador_syn_unique_seq_for_capture():
+    from scapy.all import IP, TCP
+    g = PacketSend.GeradorSyn([('a', '10.0.0.2', False)], [80], 3, seq_unico=True)
+    seqs = [g.pacote(k)[4] for k in range(3)]
+    assert len(set(seqs)) == 3
+    assert IP(g.pacote(5)[0])[TCP].seq == g.pacote(5)[4]
+
+
+def test_fonte_replay_rewrites_destination_with_valid_checksums(tmp_path, monkeypatch):
+    from scapy.all import Ether, IP, IPv6, TCP, UDP, wrpcap
+    pkts = [Ether(dst='02:00:00:00:00:01') / IP(src='10.0.0.1', dst='10.0.0.9') / TCP(sport=4000, dport=22, seq=5, flags='S'),
+            Ether(dst='02:00:00:00:00:01') / IP(src='10.0.0.1', dst='10.0.0.8') / UDP(sport=53, dport=5353) / b'abc',
+            Ether(dst='02:00:00:00:00:01') / IPv6(dst='fe80::1') / TCP(),
+            Ether(b'\x00' * 12 + b'\x08\x06' + b'\x00' * 28)]
+    wrpcap(str(tmp_path / 'in.pcap'), pkts)
+    link = b'\x02' * 6 + b'\x04' * 6 + b'\x08\x00'
+    monkeypatch.setattr(PacketSend.FonteReplay, '_link', lambda self, dst, version: link)   # sem ARP
+    fonte = PacketSend.FonteReplay(str(tmp_path / 'in.pcap'), destino=('192.168.7.7', False), porta=8080)
+    out = list(fonte)
+    fonte.close()
+    assert fonte.skipped == {'family': 1, 'non_ip': 1} and len(out) == 2
+    for item, proto in zip(out, (TCP, UDP)):
+        assert item[1][:14] == link and item[2] == '192.168.7.7' and item[5] == 8080
+        pkt = Ether(item[1])
+        assert pkt[IP].dst == '192.168.7.7' and pkt[proto].dport == 8080
+        fixed = Ether(item[1])
+        del fixed[IP].chksum, fixed[proto].chksum
+        fixed = Ether(bytes(fixed))
+        assert (pkt[IP].chksum, pkt[proto].chksum) == (fixed[IP].chksum, fixed[proto].chksum)
+    assert out[0][6] == 5 and out[0][7] == 0x02
@@ -0,0 +1,41 @@
+import socket
+import struct
+
+import packet_templates as pt
+
+
+def _tcp_valid(src, dst, segment, family=socket.AF_INET):
+    pseudo = pt._tcp_pseudo_header(src, dst, family, len(segment))
+    return pt.inet_checksum(pseudo + bytes(segment)) == 0
+
+
+def test_checksum_adjust_matches_full_recompute():
+    data = bytearray(struct.pack('!8H', 0x4500, 0x0054, 0x1234, 0, 0x4006, 0, 0x0a00, 0x0001))
+    csum = pt.inet_checksum(bytes(data))
+    for new in (0x0000, 0xFFFF, 0xBEEF, 0x1234):
+        old = struct.unpack_from('!H', data, 4)[0]
+        struct.pack_into('!H', data, 4, new)
+        csum = pt.checksum_adjust(csum, old, new)
+        assert pt.inet_checksum(bytes(data) + struct.pack('!H', csum)) in (0, 0xFFFF)
+
+
+def test_syn_template_patch_ipv4_keeps_checksums_valid():
+    tpl = pt.SynTemplate('10.0.0.1', '10.0.0.2', 40000, 1, 0)
+    for dport, seq, ident in ((22, 0xDEADBEEF, 1), (65535, 0, 0xFFFF), (80, 12345, 7)):
+        buf = tpl.patch(dport=dport, seq=seq, ident=ident)
+        assert pt.inet_checksum(bytes(buf[:20])) == 0                  # cabeçalho IPv4
+        assert _tcp_valid('10.0.0.1', '10.0.0.2', buf[20:])
+        assert bytes(buf[20:]) == pt.build_syn_segment('10.0.0.1', '10.0.0.2', 40000, dport, seq)
+        assert struct.unpack_from('!H', buf, 4)[0] == ident
+
+
+def test_syn_template_ipv6_segment_only_and_ethernet_link():
+    tpl = pt.SynTemplate('fe80::1', 'fe80::2', 40000, 80, 5, family=socket.AF_INET6, ip_header=False)
+    seg = tpl.patch(sport=41000, dport=443)
+    assert len(seg) == 20 and _tcp_valid('fe80::1', 'fe80::2', seg, socket.AF_INET6)
+
+    link = pt.ethernet_header('aa:bb:cc:dd:ee:ff', '11:22:33:44:55:66', socket.AF_INET6)
+    tpl = pt.SynTemplate('fe80::1', 'fe80::2', 40000, 80, 5, family=socket.AF_INET6, link=link)
+    buf = tpl.patch(seq=99)
+    assert buf[:14] == link and buf[14] >> 4 == 6 and len(buf) == 14 + 40 + 20
+    assert _tcp_valid('fe80::1', 'fe80::2', buf[54:], socket.AF_INET6)
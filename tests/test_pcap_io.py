@@ -0,0 +1,95 @@
+import struct
+
+import pytest
+from scapy.all import Ether, IP, IPv6, TCP, UDP, wrpcap, PcapNgWriter
+
+import pcap_io
+
+
+def _pacotes():
+    pkts = [Ether(dst='02:00:00:00:00:01') / IP(dst='10.0.0.%d' % i) / TCP(dport=80 + i, flags='S') for i in range(5)]
+    pkts.append(Ether(dst='02:00:00:00:00:01') / IPv6(dst='fe80::1') / UDP(dport=53))
+    for i, p in enumerate(pkts):
+        p.time = 1000 + i * 0.25
+    return pkts
+
+
+@pytest.mark.parametrize('fmt', ['pcap', 'pcapng'])
+def test_reader_streams_records_in_small_blocks(tmp_path, fmt):
+    pkts = _pacotes()
+    path = str(tmp_path / f'c.{fmt}')
+    if fmt == 'pcap':
+        wrpcap(path, pkts)
+    else:
+        w = PcapNgWriter(path)
+        for p in pkts:
+            w.write(p)
+        w.close()
+    with pcap_io.PcapReader(path, block_size=40) as r:       # bloco < registro: força recargas
+        recs = list(r)
+        assert r.format == fmt and r.linktype == pcap_io.LINKTYPE_ETHERNET
+    assert [bytes(f) for _, f, _, _ in recs] == [bytes(p) for p in pkts]
+    assert [round(ts, 6) for ts, _, _, _ in recs] == [1000 + i * 0.25 for i in range(6)]
+    assert pcap_io.ip_offset(recs[0][1], 1) == (14, 4) and pcap_io.ip_offset(recs[5][1], 1) == (14, 6)
+
+
+def test_reader_stops_at_truncated_tail_and_rejects_other_files(tmp_path):
+    path = tmp_path / 'c.pcap'
+    wrpcap(str(path), _pacotes())
+    data = path.read_bytes()
+    path.write_bytes(data[:-10])
+    assert len(list(pcap_io.PcapReader(str(path)))) == 5
+    bad = tmp_path / 'x.pcap'
+    bad.write_bytes(b'not a pcap at all')
+    with pytest.raises(pcap_io.PcapError):
+        pcap_io.PcapReader(str(bad))
+
+
+def test_ip_offset_link_types():
+    ip = bytes(IP(dst='1.2.3.4') / TCP())
+    vlan = b'\x00' * 12 + struct.pack('!HHH', 0x8100, 7, 0x0800) + ip
+    assert pcap_io.ip_offset(vlan, pcap_io.LINKTYPE_ETHERNET) == (18, 4)
+    assert pcap_io.ip_offset(ip, pcap_io.LINKTYPE_RAW) == (0, 4)
+    sll = b'\x00' * 14 + b'\x08\x00' + ip
+    assert pcap_io.ip_offset(sll, pcap_io.LINKTYPE_LINUX_SLL) == (16, 4)
+    assert pcap_io.ip_offset(b'\x00' * 12 + b'\x08\x06' + b'\x00' * 28, 1) is None   # ARP
+
+
+def test_writer_round_trip_and_snaplen(tmp_path):
+    pkts = _pacotes()
+    frames = [bytes(p) for p in pkts]
+    ring = memoryview(bytearray(b'\xff' * 7 + b''.join(frames)))   # quadros como offsets num buffer
+    path = str(tmp_path / 'out.pcap')
+    with pcap_io.PcapWriter(path, snaplen=60, buffer_size=1) as w:  # buffer mínimo (64 KiB)
+        off = 7
+        for p, f in zip(pkts, frames):
+            w.write(ring, off, len(f), len(f), float(p.time))
+            off += len(f)
+        w.write(b'\x00' * (100 << 10), 0, 100 << 10, 100 << 10, 1002.0)   # maior que o buffer
+    with pcap_io.PcapReader(path) as r:
+        recs = [(ts, bytes(fr), orig) for ts, fr, orig, _ in r]
+        assert r.snaplen == 60 and r.linktype == pcap_io.LINKTYPE_ETHERNET
+    assert [ts for ts, _, _ in recs] == [float(p.time) for p in pkts] + [1002.0]
+    assert [fr for _, fr, _ in recs[:-1]] == [f[:60] for f in frames]
+    assert [o for _, _, o in recs] == [len(f) for f in frames] + [100 << 10]
+    assert w.packets == len(pkts) + 1 and w.files() == [path]
+
+
+def test_writer_rotates_by_size_and_time_keeping_last_files(tmp_path):
+    frame = b'\x02' * 84                                   # 100 bytes por registro
+    path = str(tmp_path / 'ev.pcap')
+    (tmp_path / 'ev.7.pcap').write_bytes(b'antigo')        # de uma execução anterior
+    w = pcap_io.PcapWriter(path, max_bytes=24 + 300, keep=2)
+    for i in range(10):
+        w.write(frame, 0, len(frame), len(frame), 1000.0 + i)
+    w.close()
+    files = w.files()
+    assert w.segments == 3 and w.deleted == 2 and files == [str(tmp_path / 'ev.3.pcap'), path]
+    assert [sum(1 for _ in pcap_io.PcapReader(p)) for p in files] == [3, 1]
+
+    w = pcap_io.PcapWriter(path, max_seconds=2.5)
+    for ts in (10.0, 11.0, 12.4, 12.6, 13.0, 20.0):
+        w.write(frame, 0, len(frame), len(frame), ts)
+    w.close()
+    assert [[ts for ts, _, _, _ in pcap_io.PcapReader(p)] for p in w.files()] == \
+        [[10.0, 11.0, 12.4], [12.6, 13.0], [20.0]]
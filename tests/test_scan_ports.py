@@ -5,6 +5,7 @@ import tempfile
 import time
 import types
 
+import packet_templates
 import scan_ports
 
 
@@ -211,3 +212,458 @@ def test_save_results_xml():
         assert 'number="80"' in content
     finally:
         os.unlink(fname)
+
+
+# ---------------------------------------------------------------------------
+# Testes: engine asyncio
+# ---------------------------------------------------------------------------
+
+def _listen_and_free_port():
+    """Retorna (socket em listen, porta aberta, porta fechada) em 127.0.0.1."""
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.bind(('127.0.0.1', 0))
+    srv.listen(64)
+    tmp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    tmp.bind(('127.0.0.1', 0))
+    closed_port = tmp.getsockname()[1]
+    tmp.close()
+    return srv, srv.getsockname()[1], closed_port
+
+
+def test_scan_ports_asyncio_open_and_closed():
+    srv, open_port, closed_port = _listen_and_free_port()
+    try:
+        seen = []
+        statuses = scan_ports.scan_ports_asyncio(
+            '127.0.0.1', [open_port, closed_port], 1.0,
+            concurrency=10, on_result=lambda p, s: seen.append(p)
+        )
+    finally:
+        srv.close()
+    assert statuses[open_port] == 'open'
+    assert statuses[closed_port] == 'closed'
+    assert sorted(seen) == sorted([open_port, closed_port])
+
+
+def test_scan_port_async_filtered(monkeypatch):
+    import asyncio
+
+    class _Loop:
+        async def sock_connect(self, s, addr):
+            await asyncio.sleep(10)
+
+    monkeypatch.setattr(scan_ports.asyncio, 'get_running_loop', lambda: _Loop())
+    p, status = asyncio.run(scan_ports.scan_port_async('127.0.0.1', 9, 0.05))
+    assert (p, status) == (9, 'filtered')
+
+
+def test_token_bucket_try_consume():
+    tb = scan_ports.TokenBucket(rate=1, capacity=1)
+    assert tb.try_consume() == 0.0
+    assert tb.try_consume() > 0
+
+
+# ---------------------------------------------------------------------------
+# Testes: engine epoll/selectors
+# ---------------------------------------------------------------------------
+
+def test_scan_ports_epoll_open_and_closed():
+    srv, open_port, closed_port = _listen_and_free_port()
+    try:
+        statuses = scan_ports.scan_ports_epoll(
+            '127.0.0.1', [open_port, closed_port], 1.0, concurrency=10
+        )
+    finally:
+        srv.close()
+    assert statuses == {open_port: 'open', closed_port: 'closed'}
+
+
+def test_rtt_estimator_converges_and_clamps():
+    rtt = scan_ports.RttEstimator(1.0, min_timeout=0.1, max_timeout=5.0)
+    assert rtt.timeout('h') == 1.0                  # sem amostras: valor inicial
+    for _ in range(50):
+        rtt.observe('h', 0.2)
+    st = rtt.stats('h')
+    assert abs(st['srtt'] - 0.2) < 1e-3 and st['samples'] == 50
+    assert 0.2 <= rtt.timeout('h') < 0.25
+    for _ in range(50):
+        rtt.observe('lan', 0.0005)
+    assert rtt.timeout('lan') == 0.1                # piso
+    assert scan_ports.RttEstimator(1.0, adaptive=False).timeout('h') == 1.0
+    other = scan_ports.RttEstimator(1.0)
+    other.observe('h', 0.4)
+    rtt.merge(other.snapshot())
+    assert rtt.stats('h')['samples'] == 51
+
+
+def test_scan_ports_epoll_feeds_rtt_estimator():
+    srv, open_port, closed_port = _listen_and_free_port()
+    rtt = scan_ports.RttEstimator(1.0)
+    try:
+        scan_ports.scan_ports_epoll('127.0.0.1', [open_port, closed_port], 1.0, concurrency=10, rtt=rtt)
+    finally:
+        srv.close()
+    assert rtt.stats('127.0.0.1')['samples'] >= 1
+    assert rtt.timeout('127.0.0.1') < 1.0
+
+
+def test_classify_connect_errno():
+    import errno
+    assert scan_ports.classify_connect_errno(0) == 'open'
+    assert scan_ports.classify_connect_errno(errno.ECONNREFUSED) == 'closed'
+    assert scan_ports.classify_connect_errno(errno.ETIMEDOUT) == 'filtered'
+    assert scan_ports.classify_connect_errno(errno.EACCES) == 'error'
+
+
+def test_deadline_wheel_expires_in_order():
+    wheel = scan_ports.DeadlineWheel(tick=0.01, slots=8, now=0.0)
+    wheel.schedule('b', 0.05)
+    wheel.schedule('a', 0.02)
+    wheel.schedule('c', 1.00)   # além de uma volta da roda
+    assert wheel.expire(0.01) == []
+    assert wheel.expire(0.06) == ['a', 'b']
+    assert len(wheel) == 1
+    assert wheel.expire(0.5) == []
+    assert wheel.expire(1.0) == ['c']
+
+
+# ---------------------------------------------------------------------------
+# Testes: pipeline com janela limitada (engine threads)
+# ---------------------------------------------------------------------------
+
+def test_scan_ports_threaded_bounded_window(monkeypatch):
+    def fake_scan(host, port, timeout, family=socket.AF_INET, max_retries=0, backoff=0.5):
+        time.sleep(0.01)
+        return port, 'open' if port % 10 == 0 else 'closed'
+
+    monkeypatch.setattr(scan_ports, 'scan_port_with_retries', fake_scan)
+    pulled = {'n': 0}
+    pulled_at_first_result = []
+
+    def lazy_ports():
+        for p in range(1, 201):
+            pulled['n'] += 1
+            yield p
+
+    def on_result(p, status):
+        if not pulled_at_first_result:
+            pulled_at_first_result.append(pulled['n'])
+
+    statuses = scan_ports.scan_ports_threaded(
+        '127.0.0.1', lazy_ports(), 0.1, workers=4, on_result=on_result
+    )
+    assert len(statuses) == 200
+    assert statuses[10] == 'open' and statuses[11] == 'closed'
+    # Janela = 2x workers: o produtor não pode ter lido o intervalo inteiro antes do 1º resultado
+    assert pulled_at_first_result[0] <= 2 * 4 + 1
+
+
+def test_save_results_multi_host_grouped(tmp_path):
+    args = _make_dummy_args(target='10.0.0.0/30')
+    args.hosts = [('10.0.0.1', '10.0.0.1', socket.AF_INET), ('10.0.0.2', '10.0.0.2', socket.AF_INET)]
+    results = {
+        '10.0.0.1': {22: {'state': 'open', 'service': 'ssh'}},
+        '10.0.0.2': {22: {'state': 'closed', 'service': 'ssh'}},
+    }
+    open_ports = {'10.0.0.1': [22], '10.0.0.2': []}
+
+    json_file = tmp_path / 'out.json'
+    scan_ports.save_results(str(json_file), 'json', results, open_ports, {}, args)
+    data = json.loads(json_file.read_text(encoding='utf-8'))
+    assert [h['target_ip'] for h in data['hosts']] == ['10.0.0.1', '10.0.0.2']
+    assert data['hosts'][0]['open_ports'] == [{'port': 22, 'service': 'ssh'}]
+
+    csv_file = tmp_path / 'out.csv'
+    scan_ports.save_results(str(csv_file), 'csv', results, open_ports, {}, args)
+    lines = csv_file.read_text(encoding='utf-8').splitlines()
+    assert lines[0] == 'Host,Port,State,Service'
+    assert '10.0.0.2,22,closed,ssh' in lines
+
+
+# ---------------------------------------------------------------------------
+# Testes: modo multi-processo (--processes)
+# ---------------------------------------------------------------------------
+
+def test_shard_targets_splits_ports_or_hosts():
+    one_host = [('a', '10.0.0.1', socket.AF_INET)]
+    shards = scan_ports.shard_targets(one_host, range(1, 11), 3)
+    assert sorted(p for _, ports in shards for p in ports) == list(range(1, 11))
+    many_hosts = [(str(i), f'10.0.0.{i}', socket.AF_INET) for i in range(1, 7)]
+    shards = scan_ports.shard_targets(many_hosts, range(1, 3), 3)
+    assert len(shards) == 3 and all(len(h) == 2 for h, _ in shards)
+
+
+def test_scan_targets_sharded_merges_results():
+    srv, open_port, closed_port = _listen_and_free_port()
+    hosts = [('127.0.0.1', '127.0.0.1', socket.AF_INET)]
+    seen = []
+    try:
+        statuses = scan_ports.scan_targets_sharded(
+            hosts, [open_port, closed_port], 2, 'epoll', 1.0,
+            on_result=lambda h, p, s, service: seen.append((p, s)),
+            concurrency=10,
+        )
+    finally:
+        srv.close()
+    assert statuses[('127.0.0.1', open_port)] == 'open'
+    assert statuses[('127.0.0.1', closed_port)] == 'closed'
+    assert sorted(seen) == sorted([(open_port, 'open'), (closed_port, 'closed')])
+
+
+# ---------------------------------------------------------------------------
+# Testes: SYN scan stateless (transporte em memória, sem root)
+# ---------------------------------------------------------------------------
+
+def _fake_tcp_stack(dst_ip, segment):
+    import struct
+    sport, dport, seq, _, _ = scan_ports.parse_tcp_reply(segment)
+    def reply(flags, ack):
+        return (dst_ip, struct.pack('!HHIIBBHHH', dport, sport, 1000, ack, 5 << 4, flags, 0, 0, 0))
+    if dport == 22:
+        # resposta forjada (ack errado) deve ser ignorada; a legítima vale
+        return [reply(0x12, seq + 2), reply(0x12, (seq + 1) & 0xFFFFFFFF)]
+    if dport == 23:
+        return [reply(0x14, (seq + 1) & 0xFFFFFFFF)]
+    return []   # 24: sem resposta → filtered
+
+
+class _LossyWire:
+    """Captura L2 + socket L3 falsos para o syn_scan: o 'alvo' responde SA na
+    porta 22 e RST nas demais, mas perde o primeiro SYN das portas em `lose_once`."""
+    def __init__(self, target, lose_once):
+        import queue
+        self.target = target
+        self.lose = set(lose_once)
+        self.frames = queue.Queue()
+        self.sent = []
+
+    def l3socket(self, ipv6):
+        return lambda iface=None: self
+
+    def send(self, pkt):
+        import struct
+        from scapy.all import TCP
+        tcp = pkt[TCP]
+        self.sent.append(tcp.dport)
+        if tcp.dport in self.lose:
+            self.lose.discard(tcp.dport)
+            return
+        flags = 0x12 if tcp.dport == 22 else 0x14
+        seg = struct.pack('!HHIIBBHHH', tcp.dport, tcp.sport, 1, tcp.seq + 1, 5 << 4, flags, 0, 0, 0)
+        ip = packet_templates.build_ipv4_header(self.target, '10.0.0.1', len(seg))
+        self.frames.put(b'\x00' * 12 + b'\x08\x00' + ip + seg)
+
+    def select(self, socks, timeout):
+        if self.frames.empty():
+            time.sleep(timeout)
+            return []
+        return [self]
+
+    def recv_raw(self):
+        from scapy.all import Ether
+        return Ether, self.frames.get(), None
+
+    def close(self):
+        pass
+
+
+def test_syn_scan_retransmits_only_unanswered(monkeypatch):
+    import pytest
+    pytest.importorskip('scapy.all')
+    import scapy.interfaces
+    from scapy.all import conf
+    wire = _LossyWire('10.9.9.9', lose_once={23, 25})
+    monkeypatch.setattr(conf, 'L2listen', lambda iface=None, filter=None: wire)
+    monkeypatch.setattr(conf.route, 'route', lambda dst, **kw: ('fake0', '10.0.0.1', '0.0.0.0'))
+    monkeypatch.setattr(scapy.interfaces, 'resolve_iface', lambda name: wire)
+    rounds = []
+    results, open_ports = scan_ports.syn_scan('10.9.9.9', socket.AF_INET, range(22, 27), 0.1,
+                                              chunk_size=2, retries=2, round_stats=rounds)
+    assert open_ports == [22]
+    assert {p: r['state'] for p, r in results.items()} == {22: 'open', 23: 'closed', 24: 'closed', 25: 'closed', 26: 'closed'}
+    assert sorted(wire.sent) == [22, 23, 23, 24, 25, 25, 26]
+    assert [(r['round'], r['sent'], r['recovered']) for r in rounds] == [(0, 5, 3), (1, 2, 2)]
+    assert rounds[1]['timeout'] == 0.05
+
+
+def test_syn_scan_skips_rtt_samples_of_retransmitted_ports(monkeypatch):
+    import pytest
+    pytest.importorskip('scapy.all')
+    import scapy.interfaces
+    from scapy.all import conf
+    wire = _LossyWire('10.9.9.9', lose_once={23, 25})
+    monkeypatch.setattr(conf, 'L2listen', lambda iface=None, filter=None: wire)
+    monkeypatch.setattr(conf.route, 'route', lambda dst, **kw: ('fake0', '10.0.0.1', '0.0.0.0'))
+    monkeypatch.setattr(scapy.interfaces, 'resolve_iface', lambda name: wire)
+    rtt = scan_ports.RttEstimator(0.1)
+    results, _ = scan_ports.syn_scan('10.9.9.9', socket.AF_INET, range(22, 27), 0.1,
+                                     chunk_size=2, retries=1, rtt=rtt)
+    # 23 e 25 só responderam ao SYN retransmitido: regra de Karn, sem amostra
+    assert all(r['state'] != 'filtered' for r in results.values())
+    assert rtt.stats('10.9.9.9')['samples'] == 3
+
+
+def test_syn_scan_fast_path_without_route_leaks_no_raw_socket(monkeypatch):
+    import pytest
+    pytest.importorskip('scapy.all')
+    import scapy.interfaces
+    from scapy.all import conf
+    wire = _LossyWire('10.9.9.9', lose_once=())
+    monkeypatch.setattr(conf, 'L2listen', lambda iface=None, filter=None: wire)
+    monkeypatch.setattr(conf.route, 'route', lambda dst, **kw: ('fake0', '10.0.0.1', '0.0.0.0'))
+    monkeypatch.setattr(scapy.interfaces, 'resolve_iface', lambda name: wire)
+    opened = []
+
+    class _Raw:
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    def open_raw(family):
+        opened.append(_Raw())
+        return opened[-1]
+
+    def no_route(ip, family):
+        raise OSError('sem rota')
+    monkeypatch.setattr(scan_ports, 'open_raw_sender', open_raw)
+    monkeypatch.setattr(scan_ports, 'source_address_for', no_route)
+    # Sem rota o modo rápido cai para o Scapy sem deixar socket raw aberto
+    results, open_ports = scan_ports.syn_scan('10.9.9.9', socket.AF_INET, [22, 23], 0.1, fast=True)
+    assert open_ports == [22] and all(s.closed for s in opened)
+
+
+class _HostsWire(_LossyWire):
+    """Vários alvos atrás da mesma captura: os de `alive` respondem SA na 22 e
+    RST nas demais; os outros são filtrados (nunca respondem)."""
+    def __init__(self, alive):
+        super().__init__(None, ())
+        self.alive = set(alive)
+        self.listens = 0
+        self.sent_to = []
+
+    def send(self, pkt):
+        import struct
+        from scapy.all import IP, TCP
+        dst, tcp = pkt[IP].dst, pkt[TCP]
+        self.sent_to.append((dst, tcp.dport))
+        if dst not in self.alive:
+            return
+        flags = 0x12 if tcp.dport == 22 else 0x14
+        seg = struct.pack('!HHIIBBHHH', tcp.dport, tcp.sport, 1, tcp.seq + 1, 5 << 4, flags, 0, 0, 0)
+        self.frames.put(b'\x00' * 12 + b'\x08\x00' + packet_templates.build_ipv4_header(dst, '10.0.0.1', len(seg)) + seg)
+
+
+def test_syn_scan_hosts_shares_one_capture_and_overlaps_timeouts(monkeypatch):
+    import pytest
+    pytest.importorskip('scapy.all')
+    import scapy.interfaces
+    from scapy.all import conf
+    wire = _HostsWire(alive={'10.9.9.1'})
+
+    def listen(iface=None, filter=None):
+        wire.listens += 1
+        return wire
+    monkeypatch.setattr(conf, 'L2listen', listen)
+    monkeypatch.setattr(conf.route, 'route', lambda dst, **kw: ('fake0', '10.0.0.1', '0.0.0.0'))
+    monkeypatch.setattr(scapy.interfaces, 'resolve_iface', lambda name: wire)
+    hosts = [(ip, ip, socket.AF_INET) for ip in ('10.9.9.1', '10.9.9.2', '10.9.9.3', '10.9.9.4')]
+    rounds = {}
+    start = time.monotonic()
+    results, open_ports = scan_ports.syn_scan_hosts(hosts, range(22, 25), 0.5, chunk_size=4, round_stats=rounds)
+    # Três hosts filtrados em série custariam 3 timeouts; na mesma janela, um só
+    assert time.monotonic() - start < 1.3
+    assert wire.listens == 1
+    assert wire.sent_to[:4] == [('10.9.9.1', 22), ('10.9.9.2', 22), ('10.9.9.3', 22), ('10.9.9.4', 22)]
+    assert open_ports == {'10.9.9.1': [22], '10.9.9.2': [], '10.9.9.3': [], '10.9.9.4': []}
+    assert [results['10.9.9.1'][p]['state'] for p in range(22, 25)] == ['open', 'closed', 'closed']
+    assert {r['state'] for r in results['10.9.9.3'].values()} == {'filtered'}
+    assert rounds['10.9.9.1'][0]['recovered'] == 3 and rounds['10.9.9.2'][0]['recovered'] == 0
+
+
+class _NoisyWire(_LossyWire):
+    """O alvo nunca responde aos SYNs, mas a captura nunca fica ociosa: quadros
+    de outro tráfego e, depois do primeiro envio, segmentos perdidos do alvo
+    para o sport do scan (porta fora do scan)."""
+    def __init__(self, target):
+        super().__init__(target, ())
+        self.sport = None
+
+    def send(self, pkt):
+        from scapy.all import TCP
+        self.sent.append(pkt[TCP].dport)
+        self.sport = pkt[TCP].sport
+
+    def select(self, socks, timeout):
+        time.sleep(0.002)
+        return [self]
+
+    def recv_raw(self):
+        import struct
+        from scapy.all import Ether
+        stray = self.sport is not None and len(self.sent) % 2
+        src, dport = (self.target, self.sport) if stray else ('10.7.7.7', 5353)
+        seg = struct.pack('!HHIIBBHHH', 9999, dport, 1, 1, 5 << 4, 0x10, 0, 0, 0)
+        self.sent.append(None)
+        return Ether, b'\x00' * 12 + b'\x08\x00' + packet_templates.build_ipv4_header(src, '10.0.0.1', len(seg)) + seg, None
+
+
+def test_syn_scan_batches_expire_under_constant_capture_traffic(monkeypatch):
+    import pytest
+    pytest.importorskip('scapy.all')
+    import scapy.interfaces
+    from scapy.all import conf
+    wire = _NoisyWire('10.9.9.9')
+    monkeypatch.setattr(conf, 'L2listen', lambda iface=None, filter=None: wire)
+    monkeypatch.setattr(conf.route, 'route', lambda dst, **kw: ('fake0', '10.0.0.1', '0.0.0.0'))
+    monkeypatch.setattr(scapy.interfaces, 'resolve_iface', lambda name: wire)
+    monkeypatch.setattr(scan_ports, 'SYN_BATCH_GRACE', 0.3)
+    start = time.monotonic()
+    results, open_ports = scan_ports.syn_scan('10.9.9.9', socket.AF_INET, range(22, 26), 0.1, chunk_size=2)
+    # Sem o limite rígido a drenagem esperava a captura ficar ociosa para sempre
+    assert time.monotonic() - start < 2.0
+    assert open_ports == [] and {r['state'] for r in results.values()} == {'filtered'}
+
+
+def test_aimd_controller_halves_on_loss_and_grows_back():
+    cc = scan_ports.AimdController(batch=400, min_batch=50, max_batch=1000, min_rate=300, max_rate=None)
+    cc.update(400, 400, send_rate=5000)             # referência: 100% de respostas
+    assert cc.rate is None and cc.batch == 440       # sem teto até a 1ª perda
+    cc.update(440, 200, send_rate=5000)             # queda > 10% → perda
+    assert cc.decreases == 1 and cc.rate == 2500 and cc.batch == 220
+    for _ in range(3):
+        cc.update(cc.batch, cc.batch, send_rate=2500)
+    assert cc.rate == 2500 + 3 * 250 and cc.batch == 220 + 3 * 40
+    for _ in range(10):
+        cc.update(100, 0, send_rate=100)            # perdas seguidas não passam do piso
+    assert cc.rate == 300 and cc.batch == 50
+    capped = scan_ports.AimdController(batch=100, max_rate=1000)
+    capped.update(100, 100)
+    assert capped.rate == 1000
+
+
+def test_syn_cookie_is_keyed_and_deterministic():
+    k1, k2 = b'a' * 16, b'b' * 16
+    assert scan_ports.syn_cookie(k1, '10.0.0.1', 80, 40000) == scan_ports.syn_cookie(k1, '10.0.0.1', 80, 40000)
+    assert scan_ports.syn_cookie(k1, '10.0.0.1', 80, 40000) != scan_ports.syn_cookie(k2, '10.0.0.1', 80, 40000)
+    assert scan_ports.syn_cookie(k1, '10.0.0.1', 80, 40000) != scan_ports.syn_cookie(k1, '10.0.0.1', 81, 40000)
+
+
+def test_build_syn_segment_checksum_valid():
+    seg = packet_templates.build_syn_segment('10.0.0.1', '10.0.0.2', 40000, 80, 12345)
+    pseudo = packet_templates._tcp_pseudo_header('10.0.0.1', '10.0.0.2', socket.AF_INET, len(seg))
+    assert packet_templates.inet_checksum(pseudo + seg) == 0
+    assert scan_ports.parse_tcp_reply(seg) == (40000, 80, 12345, 0, 0x02)
+
+
+def test_stateless_syn_scanner_memory_transport():
+    transport = scan_ports.MemoryTransport(_fake_tcp_stack)
+    scanner = scan_ports.StatelessSynScanner(transport, '10.0.0.1', sport=40000)
+    statuses = scanner.scan(['10.0.0.2'], range(22, 25), timeout=0.1)
+    assert statuses == {
+        ('10.0.0.2', 22): 'open',
+        ('10.0.0.2', 23): 'closed',
+        ('10.0.0.2', 24): 'filtered',
+    }
+    assert transport.sent == 3
+    assert scanner.ignored == 1
@@ -0,0 +1,137 @@
+import json
+
+import pytest
+
+import send_log
+
+
+def test_ndjson_writer_rotates_and_reader_follows_segments(tmp_path):
+    path = str(tmp_path / 'log.ndjson')
+    (tmp_path / 'log.7.ndjson').write_text('{"type":"header"}\n')      # sobra de envio anterior
+    w = send_log.NdjsonLogWriter(path, header={'target': 'x'}, flush_records=10, flush_ms=10_000, max_bytes=500)
+    for i in range(100):
+        w.write({'ts': float(i), 'dport': 80})
+        if i == 4:
+            assert len(open(path).read().splitlines()) == 1            # só o header: 5 registros no buffer
+    w.close(summary={'sent': 100})
+
+    segs = send_log.segment_paths(path)
+    assert len(segs) > 2 and segs[-1] == path and not (tmp_path / 'log.7.ndjson').exists()
+    header, summary, entries = send_log.read_send_log(path)
+    assert header['target'] == 'x' and summary['sent'] == 100 and summary['segments'] == len(segs)
+    assert [e['ts'] for e in entries] == [float(i) for i in range(100)]
+
+
+def test_reader_tolerates_truncated_tail_and_reads_legacy_json(tmp_path):
+    path = tmp_path / 'crash.ndjson'
+    path.write_text('{"type":"header","port":80}\n{"ts":1.0}\n{"ts":2.0}\n{"ts":3')
+    header, summary, entries = send_log.read_send_log(str(path))
+    assert header['port'] == 80 and summary is None and [e['ts'] for e in entries] == [1.0, 2.0]
+
+    legacy = tmp_path / 'old.json'
+    legacy.write_text(json.dumps({'sent': 2, 'entries': [{'ts': 1.0}, {'ts': 2.0}]}, indent=2))
+    header, summary, entries = send_log.read_send_log(str(legacy))
+    assert summary['sent'] == 2 and len(list(entries)) == 2
+
+
+def _write_binary(path, n=50, summary=True, **kw):
+    w = send_log.BinaryLogWriter(path, header={'labels': ['10.0.0.1', 'h2'], 'ip_versions': [4, 4]},
+                                 flush_records=7, t0=1000.0, **kw)
+    for i in range(n):
+        w.write_packet(1000.0 + i * 0.001, i % 2, 40000 + i, 80, 0xFFFFFFF0 + i)
+    w.close(summary={'sent': n} if summary else None)
+
+
+def test_binary_log_roundtrip_with_and_without_numpy(tmp_path, monkeypatch):
+    path = str(tmp_path / 'log.pslog')
+    _write_binary(path)
+    assert send_log.is_binary_log(path)
+    header, summary, cols = send_log.read_binary_log(path)
+    assert summary['sent'] == 50 and header['labels'] == ['10.0.0.1', 'h2']
+    assert list(cols['sport'][:3]) == [40000, 40001, 40002]
+    assert int(cols['seq'][20]) == (0xFFFFFFF0 + 20) & 0xFFFFFFFF
+    assert abs(float(cols['ts'][49]) - 1000.049) < 1e-6
+
+    monkeypatch.setattr(send_log, 'np', None)
+    _, _, plain = send_log.read_binary_log(path)
+    assert plain['dport'] == [80] * 50 and abs(plain['ts'][49] - 1000.049) < 1e-6
+
+
+def test_destination_index_above_u16_and_v1_logs(tmp_path, monkeypatch):
+    labels = [f'10.{i >> 16}.{(i >> 8) & 255}.{i & 255}' for i in range(70000)]
+    path = str(tmp_path / 'many.pslog')
+    w = send_log.BinaryLogWriter(path, header={'labels': labels, 'ip_versions': [4] * len(labels)}, t0=1000.0)
+    for i, dst in enumerate((0, 65535, 65536, 69999)):
+        w.write_packet(1000.0 + i, dst, 40000, 80)
+    w.close(summary={'sent': 4})
+    assert [int(d) for d in send_log.read_binary_log(path)[2]['dst']] == [0, 65535, 65536, 69999]
+    assert [e['dst'] for e in send_log.read_send_log(path)[2]][2:] == ['10.1.0.0', '10.1.17.111']
+
+    ndjson = str(tmp_path / 'many.ndjson')
+    send_log.convert_log(path, ndjson)
+    header, _, cols = send_log.load_log_arrays(ndjson)
+    assert [header['labels'][d] for d in cols['dst']] == ['10.0.0.0', '10.0.255.255', '10.1.0.0', '10.1.17.111']
+
+    # Versão 1 (destino em u16, 14 bytes por registro): ainda legível
+    old = tmp_path / 'v1.pslog'
+    hdr = json.dumps({'type': 'header', 'labels': ['a', 'b'], 't0_us': 1_000_000}).encode()
+    old.write_bytes(send_log.MAGIC_V1 + len(hdr).to_bytes(4, 'little') + hdr
+                    + send_log.RECORD_V1.pack(0, 1, 40000, 80, 7) + send_log.RECORD_V1.pack(500, 0, 40001, 81, 8))
+    assert [(e['dst'], e['dport'], e['ts']) for e in send_log.read_send_log(str(old))[2]] == \
+        [('b', 80, 1.0), ('a', 81, 1.0005)]
+    monkeypatch.setattr(send_log, 'np', None)
+    assert send_log.read_binary_log(str(old))[2]['seq'] == [7, 8]
+
+
+def test_binary_log_without_trailer_and_conversion(tmp_path):
+    crashed = str(tmp_path / 'crash.pslog')
+    _write_binary(crashed, n=10, summary=False)
+    header, summary, entries = send_log.read_send_log(crashed)
+    entries = list(entries)
+    assert summary is None and len(entries) == 10 and entries[1]['dst'] == 'h2'
+
+    src = str(tmp_path / 'log.pslog')
+    _write_binary(src, n=30, max_bytes=200)                     # com rotação
+    assert len(send_log.segment_paths(src)) > 1
+    assert send_log.convert_log(src, str(tmp_path / 'log.ndjson')) == 30
+    assert send_log.convert_log(str(tmp_path / 'log.ndjson'), str(tmp_path / 'back.pslog')) == 30
+    a = list(send_log.read_send_log(src)[2])
+    b = list(send_log.read_send_log(str(tmp_path / 'back.pslog'))[2])
+    assert [(e['dst'], e['sport'], e['seq']) for e in a] == [(e['dst'], e['sport'], e['seq']) for e in b]
+    assert all(abs(x['ts'] - y['ts']) < 2e-6 for x, y in zip(a, b))
+
+
+def test_analyze_send_log_finds_bursts_stalls_and_capture_gap(tmp_path):
+    np = pytest.importorskip('numpy')
+    path = str(tmp_path / 'an.pslog')
+    w = send_log.BinaryLogWriter(path, header={'labels': ['a'], 'ip_versions': [4]}, t0=0.0)
+    ts = [i * 0.001 for i in range(1000)]                   # 1000 pps
+    ts += [1.5 + i * 0.001 for i in range(500)]             # pausa de ~0,5 s
+    ts += [2.0] * 10                                        # rajada de 10 no mesmo instante
+    for t in ts:
+        w.write_packet(t, 0, 1234, 80)
+    w.close(summary={'sent': len(ts), 'pacing': {'target_pps': 1000}, 'captured': {'syns': 1500}})
+
+    header, summary, cols = send_log.load_log_arrays(path)
+    assert cols['ts'].size == 1510 and np.all(np.diff(cols['ts']) >= 0)
+
+    r = send_log.analyze_send_log(path, window=0.5)
+    assert r['packets'] == 1510 and r['logged_sent'] == 1510
+    assert abs(r['gap_ms']['p50'] - 1.0) < 0.01
+    assert r['stalls']['count'] == 1 and abs(r['stalls']['longest'][0]['gap_ms'] - 501) < 0.01
+    assert r['bursts']['max_size'] == 10
+    assert r['window_pps']['max'] >= 1000 and r['window_pps']['min'] == 0
+    assert r['capture'] == {'sent': 1510, 'captured': 1500, 'missing': 10, 'ratio': 1500 / 1510}
+
+
+def test_load_log_arrays_merges_ndjson_worker_parts(tmp_path):
+    pytest.importorskip('numpy')
+    main = str(tmp_path / 'w.ndjson')
+    for wid, base in ((0, 0.0), (1, 0.0005)):
+        with send_log.NdjsonLogWriter(send_log.part_path(main, wid), {'worker': wid}) as w:
+            for i in range(5):
+                w.write({'ts': base + i * 0.001, 'dst': 'h', 'dport': 80, 'sport': 1000 + wid, 'seq': i})
+    with send_log.NdjsonLogWriter(main, {'target': 'h'}) as w:
+        w.close(summary={'sent': 10, 'parts': ['w.w0.ndjson', 'w.w1.ndjson']})
+    _, _, cols = send_log.load_log_arrays(main)
+    assert list(cols['sport']) == [1000, 1001] * 5
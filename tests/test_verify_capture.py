@@ -0,0 +1,171 @@
+import os
+import socket
+import threading
+import time
+
+import pytest
+from scapy.all import Ether, IP, IPv6, TCP, UDP, Dot1Q
+
+import verify_capture as vc
+
+MAC = dict(dst='02:00:00:00:00:01', src='02:00:00:00:00:02')
+
+
+def _quadros():
+    return {
+        'syn4': bytes(Ether(**MAC) / IP(dst='10.0.0.5') / TCP(dport=80, flags='S')),
+        'syn4_opts': bytes(Ether(**MAC) / IP(dst='10.0.0.5', options=b'\x01' * 4) / TCP(dport=81, flags='S')),
+        'synack4': bytes(Ether(**MAC) / IP(dst='10.0.0.5') / TCP(flags='SA')),
+        'other4': bytes(Ether(**MAC) / IP(dst='10.0.0.6') / TCP(flags='S')),
+        'frag4': bytes(Ether(**MAC) / IP(dst='10.0.0.5', frag=10) / TCP(flags='S')),
+        'udp4': bytes(Ether(**MAC) / IP(dst='10.0.0.5') / UDP()),
+        'syn6': bytes(Ether(**MAC) / IPv6(dst='fe80::5') / TCP(dport=443, flags='S')),
+        'other6': bytes(Ether(**MAC) / IPv6(dst='fe80::6') / TCP(flags='S')),
+    }
+
+
+def _passam(program, frames):
+    """Nomes dos quadros que o programa BPF aceita (filtro num socketpair, sem root)."""
+    a, b = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        vc.attach_bpf(b, program)
+        for frame in frames.values():
+            a.send(frame)
+        b.setblocking(False)
+        got = []
+        while True:
+            try:
+                data = b.recv(4096)
+            except BlockingIOError:
+                break
+            got.extend(n for n, f in frames.items() if f == data)
+        return sorted(got)
+    finally:
+        a.close()
+        b.close()
+
+
+def test_bpf_syn_program_filters_in_kernel():
+    frames = _quadros()
+    assert _passam(vc.bpf_syn_program(['10.0.0.5', 'fe80::5']), frames) == ['syn4', 'syn4_opts', 'syn6']
+    assert _passam(vc.bpf_syn_program(['10.0.0.5']), frames) == ['syn4', 'syn4_opts']
+    assert _passam(vc.bpf_syn_program(), frames) == ['other4', 'other6', 'syn4', 'syn4_opts', 'syn6']
+
+
+def test_bpf_syn_program_falls_back_when_jumps_overflow():
+    # 32 IPv6 (limite de BPF_MAX_HOSTS): a cadeia de comparação passa de 255
+    # instruções e não cabe no salto de 8 bits; o programa aceita qualquer destino
+    dests = [f'2001:db8::{i:x}' for i in range(vc.BPF_MAX_HOSTS - 1)] + ['fe80::5']
+    program = vc.bpf_syn_program(dests)
+    assert all(0 <= jt <= 255 and 0 <= jf <= 255 for _, jt, jf, _ in program)
+    assert program == vc.bpf_syn_program()
+    assert _passam(program, _quadros()) == ['other4', 'other6', 'syn4', 'syn4_opts', 'syn6']
+
+
+def test_syn_fields_reads_headers_in_place():
+    frames = _quadros()
+    buf = memoryview(b'\xff' * 7 + frames['syn4_opts'])
+    fam, dst, sport, dport, flags = vc.syn_fields(buf, 7, len(frames['syn4_opts']))
+    assert (fam, socket.inet_ntoa(dst), dport, flags) == (socket.AF_INET, '10.0.0.5', 81, 0x02)
+    vlan = bytes(Ether(**MAC) / Dot1Q(vlan=7) / IPv6(dst='fe80::5') / TCP(dport=443, flags='S'))
+    assert vc.syn_fields(vlan, 0, len(vlan))[3] == 443
+    assert vc.syn_fields(frames['udp4'], 0, len(frames['udp4'])) is None
+
+
+@pytest.mark.skipif(not hasattr(os, 'geteuid') or os.geteuid() != 0 or not vc.ring_available('lo'),
+                    reason='ring TPACKET_V3 requer Linux e root')
+def test_capture_ring_counts_syns_on_loopback_once():
+    frame = bytes(Ether(dst='00:00:00:00:00:00', src='00:00:00:00:00:00') / IP(src='127.0.0.1', dst='127.0.0.9')
+                  / TCP(sport=1234, dport=9, flags='S'))
+    other = frame.replace(bytes([127, 0, 0, 9]), bytes([127, 0, 0, 8]))
+
+    def _send():
+        time.sleep(0.3)
+        s = socket.socket(socket.AF_PACKET, socket.SOCK_RAW)
+        s.bind(('lo', 0))
+        for _ in range(50):
+            s.send(frame)
+            s.send(other)
+        s.close()
+
+    t = threading.Thread(target=_send)
+    t.start()
+    counter, (received, drops, _) = vc.capture_ring('lo', ['127.0.0.9'], timeout=1.5, ring_mb=4)
+    t.join()
+    assert counter.total == 50 and counter.per_port == {('127.0.0.9', 9): 50}
+    assert drops == 0
+
+
+def _pcap_misto(path):
+    from scapy.all import wrpcap
+    pkts = []
+    for i in range(300):
+        if i % 7 == 0:
+            p = Ether(**MAC) / IPv6(dst='fe80::5') / TCP(dport=443, flags='S')
+        elif i % 11 == 0:
+            p = Ether(**MAC) / Dot1Q(vlan=3) / IP(dst='10.0.0.5') / TCP(dport=22, flags='S')
+        elif i % 13 == 0:
+            p = Ether(**MAC) / IP(dst='10.0.0.5', frag=20) / TCP(flags='S')
+        elif i % 5 == 0:
+            p = Ether(**MAC) / IP(dst='10.0.0.5') / TCP(flags='SA')
+        elif i % 17 == 0:
+            p = Ether(**MAC) / IP(dst='10.0.0.5') / UDP()
+        else:
+            p = Ether(**MAC) / IP(dst='10.0.0.%d' % (5 + i % 2), options=b'\x01' * 4 * (i % 3)) / TCP(dport=80, flags='S')
+        p.time = 50 + (i // 100) * 2 + 0.5        # segundos 50, 52, 54: 51 e 53 vazios
+        pkts.append(p)
+    wrpcap(path, pkts)
+    return pkts
+
+
+@pytest.mark.parametrize('vectorized', [True, False])
+def test_read_pcap_counts_match_per_packet_path(tmp_path, monkeypatch, vectorized):
+    path = str(tmp_path / 'c.pcap')
+    pkts = _pcap_misto(path)
+    if not vectorized:
+        monkeypatch.setattr(vc, 'np', None)
+    elif vc.np is None:
+        pytest.skip('numpy não instalado')
+    counter, info = vc.read_pcap(path)
+    expected = vc.SynCounter()
+    for p in pkts:
+        f = vc.syn_fields(bytes(p), 0, len(p))
+        if f and f[4] & 0x12 == 0x02:
+            expected.add(socket.inet_ntop(f[0], f[1]), f[3], p.time)
+    assert counter.total == expected.total
+    assert counter.per_port == expected.per_port and counter.per_second == expected.per_second
+    assert info['records'] == 300 and info['skipped'] == sum(1 for i in range(300)
+                                                             if i % 7 and i % 11 and (i % 13 == 0 or (i % 5 and i % 17 == 0)))
+    assert [n for _, n in counter.timeline('fe80::5')][1::2] == [0, 0]
+    only = vc.read_pcap(path, ['10.0.0.6'])[0]
+    assert set(only.per_port) == {('10.0.0.6', 80)}
+
+
+def test_parse_watch_merges_dests_and_port_sets():
+    watch = dict(vc.parse_watch('10.0.0.1,10.0.0.2', '80,8000-8002', ['10.0.0.2/443', '10.0.0.3']))
+    assert watch == {'10.0.0.1': [80, 8000, 8001, 8002], '10.0.0.2': [80, 443, 8000, 8001, 8002],
+                     '10.0.0.3': None}
+    assert dict(vc.parse_watch(watch=['10.0.0.1/80', '10.0.0.1'])) == {'10.0.0.1': None}
+    with pytest.raises(ValueError):
+        vc.parse_watch('10.0.0.1', '0')
+
+
+def test_multi_monitor_demux_and_rolling_window():
+    q = _quadros()
+    mon = vc.MultiMonitor([('10.0.0.5', [80]), ('fe80::5', None)], history=2, start=0.0)
+    for name in ('syn4', 'syn4', 'syn4_opts', 'synack4', 'other4', 'udp4', 'syn6'):
+        mon.on_frame(q[name], 0, len(q[name]))
+    s = mon.rotate(1.0)
+    pairs = {(p['dst'], p['dport']): p for p in s['pairs']}
+    assert s['syns'] == 3 and s['other_ports'] == 1          # porta 81 fora do conjunto
+    assert pairs[('10.0.0.5', 80)]['syns'] == 2 and pairs[('fe80::5', 443)]['syns'] == 1
+    v4 = socket.inet_aton('10.0.0.5')
+    for t, n in ((2.0, 4), (3.0, 6), (5.0, 10)):
+        mon.add(v4, 80, n)
+        s = mon.rotate(t)
+    # Janela de 2 intervalos: só (3.0, 6) e (5.0, 10) ficam, em 1 s + 2 s
+    p80 = next(p for p in s['pairs'] if p['dport'] == 80)
+    assert p80['syns'] == 10 and p80['rate'] == 5.0 and p80['total'] == 22
+    assert s['window_s'] == 3.0 and p80['window_rate'] == pytest.approx(16 / 3)
+    assert mon.series('10.0.0.5', 80) == [6, 10] and mon.series('fe80::5', 443) == [0, 0]
+    assert mon.series('10.0.0.9', 80) == [0, 0]
@@ -1,25 +1,91 @@
 #!/usr/bin/env python3
-from scapy.all import conf, get_if_list, sniff, TCP, IP, IPv6
+"""
+verify_capture.py
+Captura e conta SYNs para um destino (verificação do PacketSend.py).
+
+Backends de captura:
+    ring   AF_PACKET com ring TPACKET_V3 mapeado em memória (Linux, root): o
+           filtro BPF roda no kernel (só SYN sem ACK para o destino chega ao
+           ring), flags e portas são lidos direto do ring sem dissecar e as
+           perdas do kernel vêm de PACKET_STATISTICS.
+    scapy  sniff() do Scapy com callback por pacote (portável, Npcap).
+`--backend auto` usa o ring quando disponível.
+
+`--monitor` vigia vários destinos/portas numa captura só, com resumo por
+intervalo; `--read` analisa um pcap/pcapng salvo e `--write-pcap` grava os
+quadros capturados (pcap_io.PcapWriter, com rotação).
+"""
 import argparse
-import sys
-import subprocess
+import collections
+import ctypes
+import json
+import mmap
+import os
 import platform
-import re
+import select
 import socket
+import struct
+import subprocess
+import sys
+import time
+
+from scapy.all import conf, get_if_list, sniff, TCP, IP, IPv6
+
+try:
+    import numpy as np
+except ImportError:     # numpy é opcional: sem ele o --read conta registro a registro
+    np = None
+
+import neighbor_cache
+from pcap_io import PcapReader, PcapWriter, ip_offset, LINKTYPE_ETHERNET
 
 conf.use_pcap = True
 
-parser = argparse.ArgumentParser(description='Captura e conta SYNs para um destino na interface especificada')
-parser.add_argument('--iface', '-i', help='Interface (ex: \\Device\\NPF_{...})', default=None)
-parser.add_argument('--dest', '-d', help='IP de destino a observar')
-parser.add_argument('--timeout', '-t', help='Segundos para capturar (default 5)', type=int, default=5)
-parser.add_argument('--count', '-c', help='Número máximo de pacotes a capturar (0 = usar timeout)', type=int, default=0)
-parser.add_argument('--mac', action='store_true', help='Tentar obter endereço MAC/LLA do destino (ARP para IPv4, NDP para IPv6)')
-parser.add_argument('--ping-only', action='store_true', help='Executar apenas pings para verificar alcançabilidade (não precisa de iface)')
-parser.add_argument('--ping-count', type=int, default=4, help='Número de pings a enviar em --ping-only (default 4)')
-
-# Modo interativo se nenhum argumento foi passado
-if len(sys.argv) == 1:
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Captura e conta SYNs para um destino na interface especificada')
+    parser.add_argument('--iface', '-i', help='Interface (ex: \\Device\\NPF_{...})', default=None)
+    parser.add_argument('--dest', '-d', help='IP de destino a observar (com --read/--monitor: lista com vírgulas)')
+    parser.add_argument('--timeout', '-t', type=int, default=None,
+                        help='Segundos para capturar (default 5; com --monitor, 0 = até Ctrl+C)')
+    parser.add_argument('--count', '-c', help='Número máximo de pacotes a capturar (0 = usar timeout)', type=int, default=0)
+    parser.add_argument('--mac', action='store_true', help='Tentar obter endereço MAC/LLA do destino (ARP para IPv4, NDP para IPv6)')
+    parser.add_argument('--neigh-cache', metavar='ARQUIVO',
+                        help='Com --mac: cache em disco (JSON) dos MACs resolvidos, reaproveitado entre execuções')
+    parser.add_argument('--ping-only', action='store_true', help='Executar apenas pings para verificar alcançabilidade (não precisa de iface)')
+    parser.add_argument('--ping-count', type=int, default=4, help='Número de pings a enviar em --ping-only (default 4)')
+    parser.add_argument('--backend', choices=['auto', 'ring', 'scapy'], default='auto',
+                        help='Captura: ring (AF_PACKET TPACKET_V3, Linux/root), scapy (sniff) ou auto (default)')
+    parser.add_argument('--ring-mb', type=int, default=64, help='Tamanho do ring TPACKET_V3 em MB (default 64)')
+    parser.add_argument('--read', '-r', metavar='PCAP',
+                        help='Analisa um pcap/pcapng salvo (streaming, só cabeçalhos) em vez de capturar')
+    parser.add_argument('--timeline', action='store_true',
+                        help='Com --read, imprime SYNs por segundo de cada destino')
+    parser.add_argument('--json', action='store_true',
+                        help='Com --read, imprime o relatório em JSON; com --monitor, um JSON por intervalo')
+    parser.add_argument('--monitor', action='store_true',
+                        help='Monitor contínuo de vários destinos/portas numa captura só, com resumo por intervalo')
+    parser.add_argument('--watch', action='append', metavar='DEST[/PORTAS]',
+                        help='Com --monitor: destino e portas (ex: 10.0.0.1/80,443,8000-8010); repetível')
+    parser.add_argument('--ports', help='Com --monitor: portas vigiadas dos destinos de --dest (default: todas)')
+    parser.add_argument('--interval', type=float, default=1.0, help='Com --monitor: segundos por intervalo (default 1)')
+    parser.add_argument('--history', type=int, default=60,
+                        help='Com --monitor: intervalos guardados no ring da janela móvel (default 60)')
+    parser.add_argument('--write-pcap', metavar='PCAP',
+                        help='Grava os quadros capturados (SYNs filtrados) em pcap, conforme chegam')
+    parser.add_argument('--pcap-rotate-mb', type=float, default=0,
+                        help='Com --write-pcap: novo arquivo ao passar de N MB (0 = sem limite)')
+    parser.add_argument('--pcap-rotate-s', type=float, default=0,
+                        help='Com --write-pcap: novo arquivo a cada N segundos (0 = sem limite)')
+    parser.add_argument('--pcap-keep', type=int, default=0,
+                        help='Com --write-pcap e rotação: mantém só os N arquivos mais recentes (0 = todos)')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help='No backend ring, imprime uma linha por SYN (o scapy sempre imprime)')
+    return parser
+
+
+def interactive_args():
+    """Modo interativo se nenhum argumento foi passado."""
     if_list = get_if_list()
     print('Interfaces disponíveis:')
     for i, it in enumerate(if_list):
@@ -34,28 +100,29 @@ if len(sys.argv) == 1:
     do_mac = input('Tentar obter MAC/NDP? (y/N): ').strip().lower() == 'y'
     ping_only = input('Fazer apenas ping para verificar alcance? (y/N): ').strip().lower() == 'y'
     ping_count = input('Ping count (default 4): ').strip() or '4'
-    args = argparse.Namespace(iface=iface, dest=dest, timeout=int(timeout), count=int(count), mac=do_mac, ping_only=ping_only, ping_count=int(ping_count))
-else:
-    args = parser.parse_args()
+    return argparse.Namespace(iface=iface, dest=dest, timeout=int(timeout), count=int(count), mac=do_mac,
+                              ping_only=ping_only, ping_count=int(ping_count), backend='auto', ring_mb=64,
+                              verbose=False, read=None, timeline=False, json=False, monitor=False,
+                              watch=None, ports=None, interval=1.0, history=60, write_pcap=None,
+                              pcap_rotate_mb=0, pcap_rotate_s=0, pcap_keep=0, neigh_cache=None)
 
-# Resolve destination and detect IPv4/IPv6
-family = socket.AF_INET
-try:
-    infos = socket.getaddrinfo(args.dest, None)
-    if infos:
-        family = infos[0][0]
-        resolved_dest = infos[0][4][0]
-except Exception:
+
+def resolve_dest(dest):
+    """(família, IP) do destino; sem resolução, assume o texto como IP."""
+    try:
+        infos = socket.getaddrinfo(dest, None)
+        if infos:
+            return infos[0][0], infos[0][4][0]
+    except Exception:
+        pass
     try:
-        socket.inet_pton(socket.AF_INET6, args.dest)
-        family = socket.AF_INET6
-        resolved_dest = args.dest
+        socket.inet_pton(socket.AF_INET6, dest)
+        return socket.AF_INET6, dest
     except Exception:
-        family = socket.AF_INET
-        resolved_dest = args.dest
+        return socket.AF_INET, dest
+
 
-# If ping-only requested, perform ping(s) and exit
-def ping_target(dest, count=4):
+def ping_target(dest, family, count=4):
     system = platform.system().lower()
     cmd = []
     if system == 'windows':
@@ -67,108 +134,886 @@ def ping_target(dest, count=4):
         # Unix ping: use ping for IPv4, ping -6 for IPv6 (some systems use ping6)
         if family == socket.AF_INET6:
             # try iputils ping -6
-            cmd = ['ping', '-6', '-c', str(count), args.dest]
+            cmd = ['ping', '-6', '-c', str(count), dest]
         else:
-            cmd = ['ping', '-c', str(count), args.dest]
+            cmd = ['ping', '-c', str(count), dest]
     try:
         print('Executando:', ' '.join(cmd))
         subprocess.run(cmd, check=False)
     except Exception as e:
         print('Falha ao executar ping:', e)
 
-if args.ping_only:
-    ping_target(resolved_dest, args.ping_count)
-    raise SystemExit(0)
 
-if_list = get_if_list()
-iface = args.iface or conf.iface or (if_list[0] if if_list else None)
-if iface is None:
-    print('Nenhuma interface disponível para captura. Verifique Npcap e privilégios.')
-    raise SystemExit(1)
+def get_link_layer_addr(ip, family=socket.AF_INET, timeout=0.5, cache_path=None):
+    """MAC do vizinho (ARP para IPv4, NDP para IPv6) pelo cache compartilhado
+    do neighbor_cache (tabela do kernel; sonda só em falta); None se não achar."""
+    return neighbor_cache.lookup(ip, family, timeout, path=cache_path)
 
-print(f'Capturando em iface: {iface} para destino: {resolved_dest} (timeout={args.timeout}s, count={args.count})')
 
-syn_count = 0
+# ---------------------------------------------------------------------------
+# Contagem de SYNs e parse só de cabeçalho
+# ---------------------------------------------------------------------------
 
-def get_link_layer_addr(ip, timeout=0.5):
-    system = platform.system().lower()
-    # Try IPv4 ARP
-    if family == socket.AF_INET:
+class SynCounter:
+    """SYNs (sem ACK) por (destino, porta de destino) e por segundo (linha do
+    tempo por destino). `add_batch` soma listas de chaves de uma vez com
+    Counter.update, bem mais barato que um incremento por pacote."""
+    def __init__(self):
+        self.total = 0
+        self.per_port = collections.Counter()
+        self.per_second = collections.Counter()      # (destino, segundo epoch) → SYNs
+
+    def add(self, dst, dport, ts=None):
+        self.total += 1
+        self.per_port[(dst, dport)] += 1
+        if ts is not None:
+            self.per_second[(dst, int(ts))] += 1
+
+    def add_batch(self, ports, seconds):
+        """`ports`: [(destino, porta)], `seconds`: [(destino, segundo)] dos mesmos SYNs."""
+        self.total += len(ports)
+        self.per_port.update(ports)
+        self.per_second.update(seconds)
+
+    def timeline(self, dst=None):
+        """[(segundo, SYNs)] do primeiro ao último segundo, com zeros nos buracos;
+        `dst` None soma todos os destinos."""
+        per = collections.Counter()
+        for (d, sec), n in self.per_second.items():
+            if dst is None or d == dst:
+                per[sec] += n
+        if not per:
+            return []
+        return [(sec, per.get(sec, 0)) for sec in range(min(per), max(per) + 1)]
+
+
+def syn_fields(buf, off, length):
+    """(família, ip_destino em bytes, sport, dport, flags) de um quadro Ethernet
+    em `buf[off:off + length]`, lendo só os bytes de cabeçalho necessários;
+    None se não for TCP. Aceita um `memoryview` do ring sem copiar o quadro.
+    """
+    if length < 14:
+        return None
+    ethertype = (buf[off + 12] << 8) | buf[off + 13]
+    ip = off + 14
+    while ethertype in (0x8100, 0x88A8) and length >= ip - off + 4:
+        ethertype = (buf[ip + 2] << 8) | buf[ip + 3]
+        ip += 4
+    if ethertype not in (0x0800, 0x86DD):
+        return None
+    return ip_tcp_fields(buf, ip, off + length)
+
+
+def ip_tcp_fields(buf, ip, end):
+    """Como syn_fields, a partir do cabeçalho IP em `buf[ip:end]`."""
+    version = buf[ip] >> 4 if end > ip else 0
+    if version == 4 and end >= ip + 20:
+        if buf[ip + 9] != socket.IPPROTO_TCP or ((buf[ip + 6] & 0x1F) << 8 | buf[ip + 7]):
+            return None             # não-TCP, ou fragmento sem o cabeçalho TCP
+        tcp = ip + (buf[ip] & 0x0F) * 4
+        if end < tcp + 14:
+            return None
+        sport, dport = struct.unpack_from('!HH', buf, tcp)
+        return socket.AF_INET, bytes(buf[ip + 16:ip + 20]), sport, dport, buf[tcp + 13]
+    if version == 6 and end >= ip + 54:
+        if buf[ip + 6] != socket.IPPROTO_TCP:
+            return None
+        tcp = ip + 40
+        sport, dport = struct.unpack_from('!HH', buf, tcp)
+        return socket.AF_INET6, bytes(buf[ip + 24:ip + 40]), sport, dport, buf[tcp + 13]
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Filtro BPF clássico (montado aqui: sem libpcap o Scapy não compila filtros)
+# ---------------------------------------------------------------------------
+
+SO_ATTACH_FILTER = 26
+BPF_LD_W_ABS, BPF_LD_H_ABS, BPF_LD_B_ABS = 0x20, 0x28, 0x30
+BPF_LD_B_IND, BPF_LDX_B_MSH = 0x50, 0xB1
+BPF_ALU_AND_K = 0x54
+BPF_JEQ_K, BPF_JSET_K = 0x15, 0x45
+BPF_RET_K = 0x06
+BPF_MAX_HOSTS = 32
+
+
+def bpf_syn_program(dests=(), snaplen=0x40000):
+    """Programa BPF clássico (lista de (code, jt, jf, k)) que aceita quadros
+    Ethernet com TCP SYN sem ACK para um dos `dests` (IPv4/IPv6, texto) e
+    descarta o resto: IPv4 sem fragmento e com IHL variável, IPv6 sem
+    cabeçalhos de extensão. Sem `dests`, com mais de BPF_MAX_HOSTS ou se os
+    saltos não couberem em 8 bits (muitos IPv6: 8 instruções cada), aceita
+    qualquer destino — quem chama já filtra os destinos no espaço de usuário.
+    """
+    try:
+        return _assemble_syn_program(dests, snaplen)
+    except ValueError:
+        return _assemble_syn_program((), snaplen)
+
+
+def _assemble_syn_program(dests, snaplen):
+    """Monta o programa de bpf_syn_program; ValueError se um salto passar de 255."""
+    v4, v6 = [], []
+    for d in dests if len(dests) <= BPF_MAX_HOSTS else ():
         try:
-            if system == 'windows':
-                subprocess.run(['ping', '-n', '1', ip], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout+1)
-                out = subprocess.check_output(['arp', '-a'], encoding='utf-8', errors='ignore')
-                m = re.search(rf'^{re.escape(ip)}\s+([0-9a-fA-F\-:]+)\s+', out, re.MULTILINE)
-                if m:
-                    return m.group(1)
-            else:
-                subprocess.run(['ping', '-c', '1', ip], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout+1)
-                try:
-                    out = subprocess.check_output(['ip', 'neigh'], encoding='utf-8', errors='ignore')
-                    m = re.search(rf'^{re.escape(ip)}\s+.*lladdr\s+([0-9a-fA-F:]+)', out, re.MULTILINE)
-                    if m:
-                        return m.group(1)
-                except Exception:
-                    out = subprocess.check_output(['arp', '-n', ip], encoding='utf-8', errors='ignore')
-                    m = re.search(r'(([0-9a-fA-F]{2}[:\-]){5}[0-9a-fA-F]{2})', out)
-                    if m:
-                        return m.group(1)
+            v4.append(struct.unpack('!I', socket.inet_aton(d))[0])
+        except OSError:
+            v6.append(struct.unpack('!4I', socket.inet_pton(socket.AF_INET6, d)))
+    prog = []                       # (code, rótulo jt, rótulo jf, k); rótulo None = próxima
+
+    def emit(code, k=0, jt=None, jf=None, label=None):
+        prog.append([code, jt, jf, k, label])
+
+    any_dst = not dests or len(dests) > BPF_MAX_HOSTS
+    emit(BPF_LD_H_ABS, 12)
+    emit(BPF_JEQ_K, 0x0800, jf='not4')
+    # IPv4: protocolo TCP, primeiro fragmento, destino, flags no offset do IHL
+    emit(BPF_LD_B_ABS, 23)
+    emit(BPF_JEQ_K, socket.IPPROTO_TCP, jf='drop')
+    emit(BPF_LD_H_ABS, 20)
+    emit(BPF_JSET_K, 0x1FFF, jt='drop')
+    if not any_dst:
+        emit(BPF_LD_W_ABS, 30)
+        for i, addr in enumerate(v4):
+            emit(BPF_JEQ_K, addr, jt='flags4', jf=None if i + 1 < len(v4) else 'drop')
+        if not v4:
+            emit(BPF_RET_K, 0)
+    emit(BPF_LDX_B_MSH, 14, label='flags4')
+    emit(BPF_LD_B_IND, 27)
+    emit(BPF_ALU_AND_K, 0x12)
+    emit(BPF_JEQ_K, 0x02, jt='accept', jf='drop')
+    # IPv6: next header TCP, destino (4 palavras), flags
+    emit(BPF_JEQ_K, 0x86DD, jf='drop', label='not4')
+    emit(BPF_LD_B_ABS, 20)
+    emit(BPF_JEQ_K, socket.IPPROTO_TCP, jf='drop')
+    if not any_dst:
+        for n, words in enumerate(v6):
+            miss = f'v6_{n + 1}' if n + 1 < len(v6) else 'drop'
+            for w, word in enumerate(words):
+                emit(BPF_LD_W_ABS, 38 + 4 * w, label=f'v6_{n}' if w == 0 else None)
+                emit(BPF_JEQ_K, word, jt='flags6' if w == 3 else None, jf=miss)
+        if not v6:
+            emit(BPF_RET_K, 0)
+    emit(BPF_LD_B_ABS, 67, label='flags6')
+    emit(BPF_ALU_AND_K, 0x12)
+    emit(BPF_JEQ_K, 0x02, jf='drop')
+    emit(BPF_RET_K, snaplen, label='accept')
+    emit(BPF_RET_K, 0, label='drop')
+
+    labels = {ins[4]: i for i, ins in enumerate(prog) if ins[4]}
+    out = []
+    for i, (code, jt, jf, k, _) in enumerate(prog):
+        if code in (BPF_JEQ_K, BPF_JSET_K):
+            jt = labels[jt] - i - 1 if jt else 0
+            jf = labels[jf] - i - 1 if jf else 0
+            if not (0 <= jt <= 255 and 0 <= jf <= 255):
+                raise ValueError('programa BPF grande demais')
+        else:
+            jt = jf = 0
+        out.append((code, jt, jf, k))
+    return out
+
+
+def attach_bpf(sock, program):
+    """Anexa um programa BPF clássico ao socket (SO_ATTACH_FILTER)."""
+    insns = (ctypes.c_uint8 * (8 * len(program)))()
+    for i, ins in enumerate(program):
+        struct.pack_into('HBBI', insns, 8 * i, *ins)
+
+    class sock_fprog(ctypes.Structure):
+        _fields_ = [('len', ctypes.c_ushort), ('filter', ctypes.c_void_p)]
+
+    fprog = sock_fprog(len(program), ctypes.addressof(insns))
+    sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, bytes(fprog))
+
+
+# ---------------------------------------------------------------------------
+# Captura AF_PACKET com ring TPACKET_V3
+# ---------------------------------------------------------------------------
+
+SOL_PACKET = 263
+PACKET_RX_RING = 5
+PACKET_STATISTICS = 6
+PACKET_VERSION = 10
+TPACKET_V3 = 2
+TP_STATUS_KERNEL, TP_STATUS_USER = 0, 1
+ETH_P_ALL = 0x0003
+PACKET_OUTGOING = 4
+TPACKET3_HDR = struct.Struct('IIIIIIHH')     # next_offset, sec, nsec, snaplen, len, status, mac, net
+TPACKET_ALIGNED_HDR = 48                     # TPACKET_ALIGN(sizeof(struct tpacket3_hdr))
+ARPHRD_ETHER, ARPHRD_LOOPBACK = 1, 772
+
+
+class RingCapture:
+    """Socket AF_PACKET com PACKET_RX_RING em modo bloco (TPACKET_V3).
+
+    O kernel preenche blocos de `block_size` bytes no mmap e os entrega quando
+    cheios ou após `retire_ms`; `poll()` percorre os pacotes de cada bloco
+    pronto e o devolve ao kernel. O filtro BPF fica no socket, então só o que
+    passar nele ocupa o ring. `stats()` soma PACKET_STATISTICS (recebidos,
+    descartados por ring cheio), que o kernel zera a cada leitura.
+    """
+    def __init__(self, iface, program=None, ring_mb=64, block_size=1 << 20, retire_ms=50):
+        self.iface = iface
+        self.loopback = _if_type(iface) == ARPHRD_LOOPBACK
+        self.block_size = block_size
+        self.block_nr = max(2, (ring_mb << 20) // block_size)
+        # Protocolo 0 até o bind: nada entra no socket antes do filtro e do ring
+        self.sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, 0)
+        try:
+            if program:
+                attach_bpf(self.sock, program)
+            self.sock.setsockopt(SOL_PACKET, PACKET_VERSION, TPACKET_V3)
+            frame_size = 2048
+            req = struct.pack('IIIIIII', block_size, self.block_nr, frame_size,
+                              block_size // frame_size * self.block_nr, retire_ms, 0, 0)
+            self.sock.setsockopt(SOL_PACKET, PACKET_RX_RING, req)
+            self.sock.bind((iface, ETH_P_ALL))
+            self.ring = mmap.mmap(self.sock.fileno(), block_size * self.block_nr,
+                                  mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
         except Exception:
-            return None
-    else:
-        # IPv6: try NDP/neighbors
+            self.sock.close()
+            raise
+        self.view = memoryview(self.ring)
+        self.current = 0
+        self.received = 0
+        self.drops = 0
+        self.freezes = 0
+
+    def poll(self, timeout, on_frame):
+        """Processa os blocos prontos (espera até `timeout` s pelo primeiro).
+        `on_frame(buf, off, snaplen, wirelen, ts, outgoing)` recebe cada quadro
+        como offset no mmap (sem cópia). Devolve o número de quadros."""
+        view, n, waited = self.view, 0, False
+        while True:
+            base = self.current * self.block_size
+            status = struct.unpack_from('I', view, base + 8)[0]
+            if not status & TP_STATUS_USER:
+                if n or waited:
+                    return n
+                waited = True
+                if not select.select([self.sock], [], [], timeout)[0]:
+                    return n
+                continue
+            num_pkts, first = struct.unpack_from('II', view, base + 12)
+            off = base + first
+            loopback = self.loopback
+            for _ in range(num_pkts):
+                nxt, sec, nsec, snaplen, wirelen, _, mac, _ = TPACKET3_HDR.unpack_from(view, off)
+                pkttype = view[off + TPACKET_ALIGNED_HDR + 10]
+                outgoing = pkttype == PACKET_OUTGOING
+                # Na loopback cada quadro aparece duas vezes (saída e entrada): só a saída conta
+                if not (loopback and not outgoing):
+                    on_frame(view, off + mac, snaplen, wirelen, sec + nsec * 1e-9, outgoing)
+                    n += 1
+                off += nxt
+            struct.pack_into('I', view, base + 8, TP_STATUS_KERNEL)
+            self.current = (self.current + 1) % self.block_nr
+
+    def stats(self):
+        """(recebidos, descartados, congelamentos) acumulados desde a abertura."""
+        raw = self.sock.getsockopt(SOL_PACKET, PACKET_STATISTICS, 12)
+        packets, drops, freezes = struct.unpack('III', raw)
+        self.received += packets
+        self.drops += drops
+        self.freezes += freezes
+        return self.received, self.drops, self.freezes
+
+    def close(self):
+        self.view.release()
+        self.ring.close()
+        self.sock.close()
+
+
+def _if_type(iface):
+    """ARPHRD_* da interface (Linux, via sysfs); None se desconhecido."""
+    try:
+        with open(f'/sys/class/net/{iface}/type') as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def ring_available(iface):
+    return (sys.platform.startswith('linux') and hasattr(socket, 'AF_PACKET')
+            and isinstance(iface, str) and _if_type(iface) in (ARPHRD_ETHER, ARPHRD_LOOPBACK))
+
+
+def capture_ring(iface, dests, timeout, count=0, ring_mb=64, verbose=False, writer=None):
+    """Conta SYNs para `dests` pelo ring TPACKET_V3 até `timeout` s ou `count`
+    SYNs; com `writer` (pcap_io.PcapWriter), cada quadro do ring também é
+    gravado. Devolve (SynCounter, (recebidos, descartados, congelamentos))."""
+    targets = {socket.inet_pton(socket.AF_INET6 if ':' in d else socket.AF_INET, d) for d in dests}
+    counter = SynCounter()
+    names = {}
+
+    def on_frame(buf, off, snaplen, wirelen, ts, outgoing):
+        if writer is not None:
+            writer.write(buf, off, snaplen, wirelen, ts)
+        f = syn_fields(buf, off, snaplen)
+        if f is None or not (f[4] & 0x02) or f[4] & 0x10:
+            return
+        family, dst, sport, dport, _ = f
+        if targets and dst not in targets:
+            return
+        name = names.get(dst) or names.setdefault(dst, socket.inet_ntop(family, dst))
+        counter.add(name, dport, ts)
+        if verbose:
+            print(f'[SYN] -> {name} : sport={sport} dport={dport}')
+
+    ring = RingCapture(iface, bpf_syn_program(list(dests)), ring_mb=ring_mb)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if (count and counter.total >= count) or (not count and remaining <= 0):
+                break
+            ring.poll(min(0.1, max(remaining, 0.0)) if not count else 0.1, on_frame)
+            if writer is not None:
+                writer.poll()
+        return counter, ring.stats()
+    finally:
+        ring.close()
+
+
+def capture_scapy(iface, family, resolved_dest, timeout, count=0, writer=None):
+    """Captura com sniff() do Scapy, uma linha por SYN; com `writer`, grava os SYNs contados."""
+    counter = SynCounter()
+
+    def keep(pkt):
+        if writer is not None:
+            frame = bytes(pkt)
+            writer.write(frame, 0, len(frame), len(frame), float(pkt.time))
+
+    def handle(pkt):
         try:
-            if system == 'windows':
-                subprocess.run(['ping', '-n', '1', '-6', ip], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout+1)
-                out = subprocess.check_output(['netsh', 'interface', 'ipv6', 'show', 'neighbors'], encoding='utf-8', errors='ignore')
-                m = re.search(rf'{re.escape(ip)}\s+([0-9a-fA-F\-:]+)', out)
-                if m:
-                    return m.group(1)
-            else:
-                subprocess.run(['ping', '-6', '-c', '1', ip], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout+1)
-                out = subprocess.check_output(['ip', '-6', 'neigh'], encoding='utf-8', errors='ignore')
-                m = re.search(rf'^{re.escape(ip)}\s+.*lladdr\s+([0-9a-fA-F:]+)', out, re.MULTILINE)
-                if m:
-                    return m.group(1)
+            if TCP in pkt:
+                flags = pkt[TCP].flags
+                if (flags & 0x02) and not (flags & 0x10):
+                    # IPv4
+                    if IP in pkt and getattr(pkt[IP], 'dst', None) == resolved_dest:
+                        counter.add(resolved_dest, pkt[TCP].dport, float(pkt.time))
+                        keep(pkt)
+                        print(f'[SYN] {pkt[IP].src} -> {pkt[IP].dst} : sport={pkt[TCP].sport} dport={pkt[TCP].dport}')
+                    # IPv6
+                    elif IPv6 in pkt and getattr(pkt[IPv6], 'dst', None) == resolved_dest:
+                        counter.add(resolved_dest, pkt[TCP].dport, float(pkt.time))
+                        keep(pkt)
+                        print(f'[SYN] {pkt[IPv6].src} -> {pkt[IPv6].dst} : sport={pkt[TCP].sport} dport={pkt[TCP].dport}')
         except Exception:
-            return None
-    return None
+            pass
+
+    # Use BPF filter to reduce carga; sniff will still call handle to confirmar flags
+    if family == socket.AF_INET6:
+        bpf = f'ip6 and tcp and dst host {resolved_dest}'
+    else:
+        bpf = f'tcp and dst host {resolved_dest}'
+
+    sniff_kwargs = dict(iface=iface, filter=bpf, prn=handle)
+    if count > 0:
+        sniff_kwargs['count'] = count
+    else:
+        sniff_kwargs['timeout'] = timeout
+    sniff(**sniff_kwargs)
+    return counter
+
+
+# ---------------------------------------------------------------------------
+# Monitor contínuo de vários destinos (--monitor)
+# ---------------------------------------------------------------------------
+
+def parse_ports(spec):
+    """Portas: '80', '80,443', '8000-8010' ou combinações (mesma sintaxe do
+    --port do PacketSend). Levanta ValueError para porta fora de 1-65535."""
+    ports = []
+    for item in str(spec).split(','):
+        item = item.strip()
+        if not item:
+            continue
+        if '-' in item:
+            first, last = (int(x) for x in item.split('-', 1))
+            if first > last:
+                raise ValueError(f'Intervalo de portas inválido: {item}')
+            ports.extend(range(first, last + 1))
+        else:
+            ports.append(int(item))
+    if not ports or any(not 1 <= p <= 65535 for p in ports):
+        raise ValueError(f'Porta(s) inválida(s): {spec}')
+    return ports
+
+
+def parse_watch(dests=None, ports=None, watch=()):
+    """[(IP, [portas] ou None)] a partir de --dest 'a,b' (todos com as portas
+    de --ports; sem elas, qualquer porta) e de cada --watch 'DEST/PORTAS'.
+    Um destino repetido junta os conjuntos de portas."""
+    default = parse_ports(ports) if ports else None
+    merged = {}
+    specs = [(d, default) for d in (dests or '').split(',') if d.strip()]
+    for item in watch or ():
+        dest, _, port_spec = item.partition('/')
+        specs.append((dest, parse_ports(port_spec) if port_spec else None))
+    for dest, dest_ports in specs:
+        ip = resolve_dest(dest.strip())[1]
+        if ip in merged and (merged[ip] is None or dest_ports is None):
+            merged[ip] = None
+        else:
+            merged[ip] = sorted(set(merged.get(ip) or ()) | set(dest_ports)) if dest_ports else None
+    return list(merged.items())
+
+
+class MultiMonitor:
+    """SYNs por (destino, porta) de vários destinos numa captura só.
+
+    Cada par vigiado tem uma posição fixa (dict (IP em bytes, porta) →
+    índice) e o intervalo corrente é uma linha de contadores num ring
+    pré-alocado de `history` intervalos: por quadro, um lookup e um
+    incremento. `rotate()` fecha o intervalo, atualiza totais e a soma da
+    janela (entra o novo, sai o mais antigo) e devolve o resumo. Destino sem
+    conjunto de portas ganha uma posição na primeira vez que cada porta
+    aparece; SYNs para portas fora do conjunto só somam em `other_ports`.
+    """
+    def __init__(self, watch, history=60, start=None):
+        self.history = max(1, int(history))
+        self.targets = {}               # IP em bytes → (texto, portas ou None)
+        self.index = {}                 # (IP em bytes, porta) → posição
+        self.keys = []                  # posição → (texto, porta)
+        self.totals = []
+        self.window = []                # soma das linhas fechadas no ring
+        self.rows = [[] for _ in range(self.history + 1)]   # + 1: o intervalo aberto
+        self.spans = [0.0] * (self.history + 1)
+        self.head = 0
+        self.closed = 0
+        self.window_span = 0.0
+        self.other_ports = 0
+        self.started = time.monotonic() if start is None else start
+        for ip, ports in watch:
+            key = socket.inet_pton(socket.AF_INET6 if ':' in ip else socket.AF_INET, ip)
+            self.targets[key] = (ip, frozenset(ports) if ports else None)
+            for port in ports or ():
+                self._slot(key, port)
+        self.row = self.rows[0]
+
+    def _slot(self, dst, dport):
+        slot = len(self.keys)
+        self.index[(dst, dport)] = slot
+        self.keys.append((self.targets[dst][0], dport))
+        self.totals.append(0)
+        self.window.append(0)
+        for row in self.rows:
+            row.append(0)
+        return slot
+
+    def add(self, dst, dport, n=1):
+        """Soma `n` SYNs para (IP em bytes, porta); ignora destinos não vigiados."""
+        slot = self.index.get((dst, dport))
+        if slot is None:
+            target = self.targets.get(dst)
+            if target is None:
+                return
+            if target[1] is not None:
+                self.other_ports += n
+                return
+            slot = self._slot(dst, dport)
+        self.row[slot] += n
+
+    def on_frame(self, buf, off, snaplen, wirelen=0, ts=0.0, outgoing=False):
+        """Callback do RingCapture.poll: só cabeçalhos, direto do ring."""
+        f = syn_fields(buf, off, snaplen)
+        if f is not None and f[4] & 0x12 == 0x02:
+            self.add(f[1], f[3])
+
+    def rotate(self, now=None):
+        """Fecha o intervalo aberto e abre o próximo no ring; devolve o resumo
+        (contagem e taxa do intervalo, taxa média na janela e total por par)."""
+        now = time.monotonic() if now is None else now
+        span = max(now - self.started, 1e-9)
+        row = self.row
+        self.spans[self.head] = span
+        self.window_span += span
+        for i, n in enumerate(row):
+            self.totals[i] += n
+            self.window[i] += n
+        self.closed += 1
+        nxt = (self.head + 1) % len(self.rows)
+        if self.closed > self.history:
+            # A próxima linha do ring é a mais antiga da janela: sai da soma
+            self.window_span -= self.spans[nxt]
+            for i, n in enumerate(self.rows[nxt]):
+                self.window[i] -= n
+        summary = {
+            'interval_s': round(span, 3),
+            'window_s': round(self.window_span, 3),
+            'syns': sum(row),
+            'other_ports': self.other_ports,
+            'pairs': [{'dst': dst, 'dport': dport, 'syns': row[i], 'rate': row[i] / span,
+                       'window_rate': self.window[i] / self.window_span, 'total': self.totals[i]}
+                      for i, (dst, dport) in enumerate(self.keys)],
+        }
+        self.other_ports = 0
+        self.head = nxt
+        self.row = self.rows[nxt]
+        for i in range(len(self.row)):
+            self.row[i] = 0
+        self.started = now
+        return summary
 
-def handle(pkt):
-    global syn_count
+    def series(self, dst, dport):
+        """Contagens dos intervalos fechados na janela, do mais antigo ao mais novo."""
+        key = socket.inet_pton(socket.AF_INET6 if ':' in dst else socket.AF_INET, dst)
+        slot = self.index.get((key, dport))
+        count = min(self.closed, self.history)
+        size = len(self.rows)
+        if slot is None:
+            return [0] * count
+        return [self.rows[(self.head - count + k) % size][slot] for k in range(count)]
+
+
+def print_summary(summary, top=20):
+    """Resumo de um intervalo do monitor: pares ativos na janela, mais ativos primeiro."""
+    kernel = summary.get('kernel')
+    extra = f', kernel: {kernel["drops"]} descartados' if kernel else ''
+    other = f', {summary["other_ports"]} fora das portas vigiadas' if summary['other_ports'] else ''
+    print(f'[{time.strftime("%H:%M:%S")}] {summary["interval_s"]:.2f}s: {summary["syns"]} SYNs{other}{extra}')
+    active = sorted((p for p in summary['pairs'] if p['total']), key=lambda p: (-p['syns'], -p['total']))
+    for p in active[:top]:
+        print(f'  {p["dst"]}:{p["dport"]:<5}  {p["rate"]:>9.1f}/s  janela {p["window_rate"]:>9.1f}/s  '
+              f'total {p["total"]}')
+    if len(active) > top:
+        print(f'  ... e mais {len(active) - top} pares')
+
+
+def monitor_ring(iface, watch, interval=1.0, history=60, duration=0, ring_mb=64, on_summary=print_summary,
+                 writer=None):
+    """Monitor pelo ring TPACKET_V3: um filtro BPF com todos os destinos e um
+    resumo a cada `interval` s até `duration` s (0 = até Ctrl+C); com
+    `writer`, cada quadro do ring também é gravado.
+    Devolve (MultiMonitor, (recebidos, descartados, congelamentos))."""
+    monitor = MultiMonitor(watch, history)
+    count = monitor.on_frame
+    if writer is None:
+        on_frame = count
+    else:
+        write = writer.write
+
+        def count_and_write(buf, off, snaplen, wirelen, ts, outgoing):
+            write(buf, off, snaplen, wirelen, ts)
+            count(buf, off, snaplen)
+        on_frame = count_and_write
+    ring = RingCapture(iface, bpf_syn_program([ip for ip, _ in watch]), ring_mb=ring_mb)
     try:
-        if TCP in pkt:
-            flags = pkt[TCP].flags
-            if (flags & 0x02) and not (flags & 0x10):
-                # IPv4
-                if IP in pkt and getattr(pkt[IP], 'dst', None) == resolved_dest:
-                    syn_count += 1
-                    print(f'[SYN] {pkt[IP].src} -> {pkt[IP].dst} : sport={pkt[TCP].sport} dport={pkt[TCP].dport}')
-                # IPv6
-                elif IPv6 in pkt and getattr(pkt[IPv6], 'dst', None) == resolved_dest:
-                    syn_count += 1
-                    print(f'[SYN] {pkt[IPv6].src} -> {pkt[IPv6].dst} : sport={pkt[TCP].sport} dport={pkt[TCP].dport}')
-    except Exception:
+        start = monitor.started
+        next_tick = start + interval
+        last_drops = 0
+        try:
+            while True:
+                now = time.monotonic()
+                if duration and now - start >= duration:
+                    break
+                if now >= next_tick:
+                    summary = monitor.rotate(now)
+                    _, drops, _ = ring.stats()
+                    summary['kernel'] = {'drops': drops - last_drops}
+                    last_drops = drops
+                    on_summary(summary)
+                    next_tick = max(next_tick + interval, now + interval / 10)
+                    continue
+                ring.poll(min(0.1, next_tick - now), on_frame)
+                if writer is not None:
+                    writer.poll()
+        except KeyboardInterrupt:
+            pass
+        # Intervalo final, parcial: só entra nos totais (e no resumo se teve SYN)
+        ring.poll(0, on_frame)
+        summary = monitor.rotate()
+        if summary['syns']:
+            on_summary(summary)
+        return monitor, ring.stats()
+    finally:
+        ring.close()
+
+
+def monitor_scapy(iface, watch, interval=1.0, history=60, duration=0, on_summary=print_summary, writer=None):
+    """Monitor com sniff() do Scapy (portável): um sniff por intervalo."""
+    monitor = MultiMonitor(watch, history)
+    families = {ip: socket.AF_INET6 if ':' in ip else socket.AF_INET for ip, _ in watch}
+
+    def handle(pkt):
+        layer = IP if IP in pkt else IPv6 if IPv6 in pkt else None
+        if layer is None or TCP not in pkt or int(pkt[TCP].flags) & 0x12 != 0x02:
+            return
+        dst = pkt[layer].dst
+        if dst in families:
+            monitor.add(socket.inet_pton(families[dst], dst), pkt[TCP].dport)
+            if writer is not None:
+                frame = bytes(pkt)
+                writer.write(frame, 0, len(frame), len(frame), float(pkt.time))
+
+    bpf = 'tcp and (' + ' or '.join(f'dst host {ip}' for ip in families) + ')'
+    start = monitor.started
+    try:
+        while not duration or time.monotonic() - start < duration:
+            remaining = duration - (time.monotonic() - start) if duration else interval
+            sniff(iface=iface, filter=bpf, prn=handle, store=False, timeout=min(interval, remaining))
+            on_summary(monitor.rotate())
+    except KeyboardInterrupt:
         pass
+    return monitor
+
+
+# ---------------------------------------------------------------------------
+# Análise offline (--read)
+# ---------------------------------------------------------------------------
+
+def read_pcap(path, dests=(), batch=65536):
+    """Conta SYNs (sem ACK) de um pcap/pcapng em streaming (pcap_io.PcapReader):
+    só os cabeçalhos IP/TCP de cada registro são lidos, e as chaves vão para
+    o SynCounter em lotes de `batch`. Em pcap clássico Ethernet com NumPy, os
+    campos de um bloco inteiro são lidos de uma vez (_count_block). `dests`
+    vazio = todos os destinos.
+    Devolve (SynCounter, {'format', 'linktype', 'records', 'skipped'})."""
+    targets = {socket.inet_pton(socket.AF_INET6 if ':' in d else socket.AF_INET, d) for d in dests}
+    counter = SynCounter()
+    names = {}
+    state = {'ports': [], 'seconds': [], 'skipped': 0}
+
+    def scalar(frame, ts, linktype):
+        found = ip_offset(frame, linktype)
+        f = ip_tcp_fields(frame, found[0], len(frame)) if found else None
+        if f is None:
+            state['skipped'] += 1
+            return
+        family, dst, _, dport, flags = f
+        if flags & 0x12 != 0x02 or (targets and dst not in targets):
+            return
+        name = names.get(dst) or names.setdefault(dst, socket.inet_ntop(family, dst))
+        state['ports'].append((name, dport))
+        state['seconds'].append((name, int(ts)))
+        if len(state['ports']) >= batch:
+            counter.add_batch(state['ports'], state['seconds'])
+            state['ports'], state['seconds'] = [], []
+
+    with PcapReader(path) as reader:
+        if np is not None and reader.format == 'pcap' and reader.linktype == LINKTYPE_ETHERNET:
+            for buf, starts, caplens, secs in reader.blocks():
+                for i in _count_block(buf, starts, caplens, secs, targets, counter, names, state):
+                    scalar(memoryview(buf)[starts[i]:starts[i] + caplens[i]], secs[i], LINKTYPE_ETHERNET)
+        else:
+            for ts, frame, _, linktype in reader:
+                scalar(frame, ts, linktype)
+        counter.add_batch(state['ports'], state['seconds'])
+        info = {'format': reader.format, 'linktype': reader.linktype,
+                'records': reader.records, 'skipped': state['skipped']}
+    return counter, info
 
-# Use BPF filter to reduce carga; sniff will still call handle to confirmar flags
-if family == socket.AF_INET6:
-    bpf = f'ip6 and tcp and dst host {resolved_dest}'
-else:
-    bpf = f'tcp and dst host {resolved_dest}'
-
-sniff_kwargs = dict(iface=iface, filter=bpf, prn=handle)
-if args.count > 0:
-    sniff_kwargs['count'] = args.count
-else:
-    sniff_kwargs['timeout'] = args.timeout
-
-sniff(**sniff_kwargs)
-print('Captura finalizada. SYNs capturados:', syn_count)
-
-if args.mac:
-    mac = get_link_layer_addr(resolved_dest)
-    if mac:
-        print('Endereço link-layer (MAC/NDP):', mac)
+
+def _count_block(buf, starts, caplens, secs, targets, counter, names, state):
+    """Conta com NumPy os SYNs IPv4 sem VLAN de um bloco (ethertype, IHL,
+    protocolo, fragmento, flags, destino e porta lidos por indexação
+    vetorizada) e devolve os índices dos registros que ficam para o caminho
+    escalar (IPv6, VLAN). Registros não-TCP vão para state['skipped']."""
+    if not starts:
+        return []
+    a = np.frombuffer(buf, dtype=np.uint8)
+    st = np.asarray(starts, dtype=np.int64)
+    cl = np.asarray(caplens, dtype=np.int64)
+    et = np.zeros(st.size, dtype=np.int64)
+    has_eth = cl >= 14
+    et[has_eth] = (a[st[has_eth] + 12].astype(np.int64) << 8) | a[st[has_eth] + 13]
+    v4 = np.flatnonzero((et == 0x0800) & (cl >= 34))
+    rest = np.flatnonzero(((et == 0x86DD) | (et == 0x8100) | (et == 0x88A8)) & has_eth)
+    state['skipped'] += int(st.size - v4.size - rest.size)
+    s4 = st[v4]
+    ihl = (a[s4 + 14] & 0x0F).astype(np.int64) * 4
+    frag = ((a[s4 + 20].astype(np.int64) & 0x1F) << 8) | a[s4 + 21]
+    tcp_ok = (a[s4 + 23] == socket.IPPROTO_TCP) & (frag == 0) & (cl[v4] >= 14 + ihl + 14)
+    state['skipped'] += int(v4.size - np.count_nonzero(tcp_ok))
+    s4, ihl, rows = s4[tcp_ok], ihl[tcp_ok], v4[tcp_ok]
+    tcp = s4 + 14 + ihl
+    syn = (a[tcp + 13] & 0x12) == 0x02
+    s4, tcp, rows = s4[syn], tcp[syn], rows[syn]
+    dst = ((a[s4 + 30].astype(np.int64) << 24) | (a[s4 + 31].astype(np.int64) << 16)
+           | (a[s4 + 32].astype(np.int64) << 8) | a[s4 + 33])
+    if targets:
+        keep = np.isin(dst, [struct.unpack('!I', t)[0] for t in targets if len(t) == 4])
+        dst, tcp, rows = dst[keep], tcp[keep], rows[keep]
+    dport = (a[tcp + 2].astype(np.int64) << 8) | a[tcp + 3]
+    sec = np.asarray(secs, dtype=np.int64)[rows]
+
+    def _name(d):
+        key = struct.pack('!I', d)
+        return names.get(key) or names.setdefault(key, socket.inet_ntoa(key))
+
+    keys, counts = np.unique((dst << 16) | dport, return_counts=True)
+    counter.total += int(counts.sum())
+    for k, n in zip(keys.tolist(), counts.tolist()):
+        counter.per_port[(_name(k >> 16), k & 0xFFFF)] += n
+    keys, counts = np.unique((dst << 32) | sec, return_counts=True)
+    for k, n in zip(keys.tolist(), counts.tolist()):
+        counter.per_second[(_name(k >> 32), k & 0xFFFFFFFF)] += n
+    return rest.tolist()
+
+
+def report(counter):
+    """Contagens por destino/porta e linhas do tempo por segundo (dict, para --json)."""
+    dsts = sorted({d for d, _ in counter.per_port})
+    return {
+        'syns': counter.total,
+        'per_port': [{'dst': d, 'dport': p, 'syns': n}
+                     for (d, p), n in sorted(counter.per_port.items(), key=lambda kv: (-kv[1], kv[0]))],
+        'timeline': {d: counter.timeline(d) for d in dsts},
+    }
+
+
+def print_counts(counter, timeline=False):
+    for (dst, dport), n in sorted(counter.per_port.items(), key=lambda kv: (-kv[1], kv[0])):
+        print(f'  {dst}:{dport}  {n}')
+    if not timeline:
+        return
+    for dst in sorted({d for d, _ in counter.per_port}):
+        tl = counter.timeline(dst)
+        rates = [n for _, n in tl]
+        print(f'  {dst}: {len(tl)} s, SYN/s mín {min(rates)} / média {sum(rates) / len(rates):.1f} / máx {max(rates)}')
+        t0 = tl[0][0]
+        for sec, n in tl:
+            print(f'    +{sec - t0:>5}s  {n}')
+
+
+def pick_capture(args):
+    """(iface, backend) efetivos a partir de --iface/--backend."""
+    if_list = get_if_list()
+    iface = args.iface or conf.iface or (if_list[0] if if_list else None)
+    if iface is None:
+        print('Nenhuma interface disponível para captura. Verifique Npcap e privilégios.')
+        raise SystemExit(1)
+    iface = iface if isinstance(iface, str) else getattr(iface, 'name', str(iface))
+    backend = args.backend
+    if backend == 'auto':
+        backend = 'ring' if ring_available(iface) and os.geteuid() == 0 else 'scapy'
+    return iface, backend
+
+
+def open_pcap_writer(args):
+    """PcapWriter de --write-pcap (ou None)."""
+    if not args.write_pcap:
+        return None
+    return PcapWriter(args.write_pcap, max_bytes=int(args.pcap_rotate_mb * (1 << 20)),
+                      max_seconds=args.pcap_rotate_s, keep=args.pcap_keep)
+
+
+def close_pcap_writer(writer, quiet=False):
+    if writer is None:
+        return
+    writer.close()
+    if not quiet:
+        files = writer.files()
+        extra = f', {writer.deleted} antigos apagados' if writer.deleted else ''
+        print(f'pcap: {writer.packets} quadros em {len(files)} arquivo(s){extra}: '
+              f'{files[0] if len(files) == 1 else f"{files[0]} ... {files[-1]}"}')
+
+
+def run_monitor(args):
+    try:
+        watch = parse_watch(args.dest, args.ports, args.watch)
+    except ValueError as e:
+        print(e)
+        raise SystemExit(1)
+    if not watch:
+        print('Informe ao menos um destino (--dest ou --watch).')
+        raise SystemExit(1)
+    if args.interval <= 0 or args.history < 1:
+        print('--interval deve ser > 0 e --history >= 1.')
+        raise SystemExit(1)
+    iface, backend = pick_capture(args)
+    duration = args.timeout or 0
+    if args.json:
+        on_summary = lambda summary: print(json.dumps(dict(summary, ts=time.time())), flush=True)
     else:
-        print('MAC/NDP não encontrado (pode estar fora da rede local ou cache vazia).')
+        on_summary = print_summary
+        desc = ', '.join(f'{ip}:{",".join(map(str, ports)) if len(ports) <= 8 else f"{len(ports)} portas"}'
+                         if ports else f'{ip}:*' for ip, ports in watch)
+        print(f'Monitorando em iface: {iface} ({backend}), intervalo {args.interval}s, '
+              f'janela {args.history} intervalos, {"até Ctrl+C" if not duration else f"{duration}s"}: {desc}')
+    writer = open_pcap_writer(args)
+    try:
+        if backend == 'ring':
+            monitor, (received, drops, freezes) = monitor_ring(
+                iface, watch, args.interval, args.history, duration, args.ring_mb, on_summary, writer)
+        else:
+            monitor = monitor_scapy(iface, watch, args.interval, args.history, duration, on_summary, writer)
+            drops = None
+    finally:
+        close_pcap_writer(writer, quiet=args.json)
+    if args.json:
+        return
+    print(f'Monitor finalizado. SYNs por par: {sum(monitor.totals)}')
+    for (dst, dport), n in sorted(zip(monitor.keys, monitor.totals), key=lambda kv: (-kv[1], kv[0])):
+        if n:
+            print(f'  {dst}:{dport}  {n}')
+    if drops is not None:
+        print(f'Kernel: {received} pacotes no ring, {drops} descartados (ring cheio), {freezes} congelamentos')
+
+
+def main(argv=None):
+    if argv is None and len(sys.argv) == 1:
+        args = interactive_args()
+    else:
+        args = build_parser().parse_args(argv)
+    if args.read:
+        dests = [resolve_dest(d.strip())[1] for d in (args.dest or '').split(',') if d.strip()]
+        start = time.perf_counter()
+        counter, info = read_pcap(args.read, dests)
+        elapsed = time.perf_counter() - start
+        if args.json:
+            print(json.dumps(dict(report(counter), file=args.read, **info), indent=2))
+            return
+        print(f'{args.read} ({info["format"]}, linktype {info["linktype"]}): {info["records"]} pacotes '
+              f'em {elapsed:.2f}s ({info["records"] / max(elapsed, 1e-9):.0f} pacotes/s), '
+              f'{info["skipped"]} não-TCP')
+        print('SYNs capturados:', counter.total)
+        print_counts(counter, timeline=args.timeline)
+        return
+    if args.monitor:
+        run_monitor(args)
+        return
+    if not args.dest:
+        print('IP de destino é obrigatório (--dest).')
+        raise SystemExit(1)
+    if args.timeout is None:
+        args.timeout = 5
+
+    # Resolve destination and detect IPv4/IPv6
+    family, resolved_dest = resolve_dest(args.dest)
+
+    # If ping-only requested, perform ping(s) and exit
+    if args.ping_only:
+        ping_target(resolved_dest, family, args.ping_count)
+        raise SystemExit(0)
+
+    iface, backend = pick_capture(args)
+    print(f'Capturando em iface: {iface} para destino: {resolved_dest} '
+          f'(timeout={args.timeout}s, count={args.count}, backend={backend})')
+
+    writer = open_pcap_writer(args)
+    try:
+        if backend == 'ring':
+            counter, (received, drops, freezes) = capture_ring(
+                iface, [resolved_dest], args.timeout, args.count, args.ring_mb, args.verbose, writer)
+            print('Captura finalizada. SYNs capturados:', counter.total)
+            print_counts(counter)
+            print(f'Kernel: {received} pacotes no ring, {drops} descartados (ring cheio), {freezes} congelamentos')
+        else:
+            counter = capture_scapy(iface, family, resolved_dest, args.timeout, args.count, writer)
+            print('Captura finalizada. SYNs capturados:', counter.total)
+    finally:
+        close_pcap_writer(writer)
+
+    if args.mac:
+        mac = get_link_layer_addr(resolved_dest, family, cache_path=args.neigh_cache)
+        if mac:
+            print('Endereço link-layer (MAC/NDP):', mac)
+        else:
+            print('MAC/NDP não encontrado (pode estar fora da rede local ou cache vazia).')
+
+
+if __name__ == '__main__':
+    main()